@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+构建精简的AWS Lambda部署包。
+
+容器镜像安装了 pyproject.toml 中的全部主依赖，其中 boto3（Lambda运行时自带）、
+gitpython、paramiko、requests、uvicorn 在Lambda中都用不到。本脚本只打包
+Lambda运行需要的依赖：
+
+1. 从 poetry.lock 导出主依赖（排除上述依赖）及其传递依赖，版本和文件哈希
+   与容器镜像一致，用pip的 --require-hashes 模式安装到临时目录
+2. 复制 src/calculator
+3. 删除测试、文档、类型存根和pip安装记录等运行时不需要的文件
+4. 预编译.pyc（Lambda的代码目录只读，运行时无法写入字节码缓存，
+   不预编译时每次冷启动都要重新编译）。使用不校验时间戳的.pyc，
+   解压后文件时间变化也不会失效
+5. 打成zip（可重复构建：文件按路径排序，时间戳固定），并输出报告：
+   部署包大小、各顶层模块占用的空间，以及导入 calculator.lambda_handler
+   时各顶层模块的导入耗时
+
+报告同时写成JSON文件，可以在CI中保存并对比，发现冷启动耗时的退化。
+
+用法：
+    python scripts/build_lambda.py                 # 生成 dist/lambda.zip
+    python scripts/build_lambda.py --layer         # 生成Lambda层（python/目录）
+    python scripts/build_lambda.py --platform manylinux2014_x86_64 \\
+        --python-version 3.11                      # 在非Linux环境下交叉构建
+
+导入耗时在本机测量，只有本机Python版本和平台与Lambda运行时一致时
+才能代表冷启动的实际情况。
+"""
+
+import argparse
+import compileall
+import json
+import os
+import platform
+import py_compile
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    import tomllib
+except ImportError:  # Python 3.11以下
+    import tomli as tomllib
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Lambda中用不到的主依赖（boto3由Lambda运行时提供），不打包
+EXCLUDED_DEPENDENCIES = {"boto3", "gitpython", "paramiko", "requests", "uvicorn"}
+
+ENTRY_MODULE = "calculator.lambda_handler"
+
+# 运行时不需要的目录和文件
+STRIP_DIRS = {"__pycache__", "tests", "test", "testing", "docs", "examples"}
+STRIP_SUFFIXES = (".pyi", ".pyx", ".pxd", ".c", ".h", ".md", ".rst")
+STRIP_DIST_INFO = {"RECORD", "INSTALLER", "REQUESTED", "direct_url.json"}
+
+# zip内文件的固定时间戳，保证相同输入生成相同的部署包
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+_IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+_REQUIREMENT_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*")
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _and_marker(first: Optional[str], second: Optional[str]) -> Optional[str]:
+    if first is None or first == second:
+        return second
+    if second is None:
+        return first
+    return f"({first}) and ({second})"
+
+
+def _edge(spec: Any) -> Tuple[Optional[str], List[str], bool]:
+    """
+    解析依赖声明。
+
+    Returns:
+        (环境标记，None表示无条件, 要求的extras, 是否为可选依赖)
+    """
+    if isinstance(spec, str):
+        return None, [], False
+    if isinstance(spec, list):
+        # 同一依赖按环境分别约束时，任一环境需要即安装
+        markers = [entry.get("markers") for entry in spec]
+        extras = sorted({extra for entry in spec for extra in entry.get("extras", [])})
+        optional = all(entry.get("optional", False) for entry in spec)
+        if None in markers:
+            return None, extras, optional
+        return " or ".join(f"({m})" for m in markers), extras, optional
+    return (
+        spec.get("markers"),
+        list(spec.get("extras", [])),
+        spec.get("optional", False),
+    )
+
+
+def export_requirements(
+    pyproject_path: str, lock_path: str, excluded: Set[str] = EXCLUDED_DEPENDENCIES
+) -> List[str]:
+    """
+    从 poetry.lock 导出Lambda运行需要的依赖，相当于 poetry export 的 main 组，
+    但排除 excluded 中的依赖及只被它们使用的传递依赖。
+
+    Args:
+        pyproject_path: pyproject.toml 路径
+        lock_path: poetry.lock 路径
+        excluded: 不打包的主依赖
+
+    Returns:
+        pip requirements文件的各行，形如 name==version ; 标记 --hash=sha256:...，
+        按名称排序
+
+    Raises:
+        RuntimeError: poetry.lock 中缺少依赖或文件哈希时抛出
+    """
+    with open(pyproject_path, "rb") as f:
+        declared = tomllib.load(f)["tool"]["poetry"]["dependencies"]
+    with open(lock_path, "rb") as f:
+        locked = {_normalize(p["name"]): p for p in tomllib.load(f)["package"]}
+    excluded = {_normalize(name) for name in excluded}
+
+    # 每个包在各条依赖路径上的环境标记，任一路径满足即安装
+    markers: Dict[str, Set[Optional[str]]] = {}
+
+    def visit(name: str, marker: Optional[str], extras: List[str], path: Tuple):
+        package = locked.get(name)
+        if package is None:
+            raise RuntimeError(f"poetry.lock 中缺少依赖 {name}，请重新执行 poetry lock")
+        seen = markers.setdefault(name, set())
+        seen.add(marker)
+        path = path + (name,)
+        children = []
+        for child, spec in package.get("dependencies", {}).items():
+            edge_marker, child_extras, optional = _edge(spec)
+            if not optional:
+                children.append((child, edge_marker, child_extras))
+        for extra in extras:
+            for requirement in package.get("extras", {}).get(extra, []):
+                match = _REQUIREMENT_NAME.match(requirement)
+                if match is not None:
+                    children.append((match.group(0), None, []))
+        for child, edge_marker, child_extras in children:
+            child = _normalize(child)
+            if child not in path:
+                visit(child, _and_marker(marker, edge_marker), child_extras, path)
+
+    for name, spec in declared.items():
+        name = _normalize(name)
+        if name == "python" or name in excluded:
+            continue
+        marker, extras, _ = _edge(spec)
+        visit(name, marker, extras, ())
+
+    lines = []
+    for name in sorted(markers):
+        package = locked[name]
+        hashes = [entry["hash"] for entry in package.get("files", [])]
+        if not hashes:
+            raise RuntimeError(f"poetry.lock 中缺少 {name} 的文件哈希")
+        line = f"{name}=={package['version']}"
+        conditions = sorted(markers[name]) if None not in markers[name] else []
+        if len(conditions) == 1:
+            line += f" ; {conditions[0]}"
+        elif conditions:
+            line += " ; " + " or ".join(f"({m})" for m in conditions)
+        lines.append(line + "".join(f" --hash={h}" for h in hashes))
+    return lines
+
+
+def install_requirements(
+    requirements: List[str],
+    target: str,
+    platform_tag: Optional[str],
+    python_version: Optional[str],
+) -> None:
+    """用pip按文件哈希把运行时依赖安装到目标目录"""
+    command = [
+        sys.executable,
+        "-m",
+        "pip",
+        "install",
+        "--quiet",
+        "--no-compile",
+        "--disable-pip-version-check",
+        "--require-hashes",
+        "--target",
+        target,
+    ]
+    if platform_tag or python_version:
+        # 交叉构建只能使用预编译的wheel
+        command += ["--only-binary=:all:", "--implementation", "cp"]
+        if platform_tag:
+            command += ["--platform", platform_tag]
+        if python_version:
+            command += ["--python-version", python_version]
+    with tempfile.TemporaryDirectory(prefix="lambda-requirements-") as tmp:
+        requirements_path = os.path.join(tmp, "requirements.txt")
+        with open(requirements_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(requirements) + "\n")
+        subprocess.run(command + ["-r", requirements_path], check=True)
+
+
+def strip_tree(root: str) -> int:
+    """删除运行时不需要的文件，返回删除的字节数"""
+    removed = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in [d for d in dirnames if d in STRIP_DIRS]:
+            path = os.path.join(dirpath, name)
+            removed += tree_size(path)
+            shutil.rmtree(path)
+            dirnames.remove(name)
+        dist_info = dirpath.endswith(".dist-info")
+        for name in filenames:
+            if name.endswith(STRIP_SUFFIXES) or (dist_info and name in STRIP_DIST_INFO):
+                path = os.path.join(dirpath, name)
+                removed += os.path.getsize(path)
+                os.remove(path)
+    # 删除bin等可执行脚本目录，Lambda不会调用
+    bin_dir = os.path.join(root, "bin")
+    if os.path.isdir(bin_dir):
+        removed += tree_size(bin_dir)
+        shutil.rmtree(bin_dir)
+    return removed
+
+
+def tree_size(path: str) -> int:
+    """目录下所有文件的总字节数"""
+    return sum(
+        os.path.getsize(os.path.join(dirpath, name))
+        for dirpath, _, filenames in os.walk(path)
+        for name in filenames
+    )
+
+
+def byte_compile(root: str) -> None:
+    """预编译目录下的全部模块"""
+    ok = compileall.compile_dir(
+        root,
+        quiet=1,
+        optimize=0,
+        invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+    )
+    if not ok:
+        raise RuntimeError("部分模块编译失败")
+
+
+def write_zip(root: str, path: str) -> None:
+    """把目录打包成zip，文件按路径排序，时间戳固定"""
+    files = sorted(
+        os.path.relpath(os.path.join(dirpath, name), root)
+        for dirpath, _, filenames in os.walk(root)
+        for name in filenames
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+        for name in files:
+            info = zipfile.ZipInfo(name.replace(os.sep, "/"), ZIP_DATE)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            with open(os.path.join(root, name), "rb") as f:
+                archive.writestr(info, f.read())
+
+
+def module_sizes(root: str) -> Dict[str, int]:
+    """各顶层模块（包目录或单文件模块）占用的字节数，按从大到小排列"""
+    sizes: Dict[str, int] = {}
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name == "__pycache__":
+            # 单文件模块的字节码计入对应的模块
+            for pyc in os.listdir(path):
+                key = pyc.split(".", 1)[0]
+                sizes[key] = sizes.get(key, 0) + os.path.getsize(
+                    os.path.join(path, pyc)
+                )
+            continue
+        key = "(dist-info)" if name.endswith(".dist-info") else name.split(".", 1)[0]
+        size = tree_size(path) if os.path.isdir(path) else os.path.getsize(path)
+        sizes[key] = sizes.get(key, 0) + size
+    return dict(sorted(sizes.items(), key=lambda item: -item[1]))
+
+
+def parse_import_time(output: str) -> Dict[str, int]:
+    """
+    汇总 python -X importtime 的输出。
+
+    Args:
+        output: importtime写到stderr的内容
+
+    Returns:
+        顶层模块名到导入耗时（微秒，该模块及其子模块自身耗时之和）的映射，
+        按耗时从高到低排列
+    """
+    totals: Dict[str, int] = {}
+    for line in output.splitlines():
+        match = _IMPORT_TIME.match(line)
+        if match is None:
+            continue
+        top = match.group(4).split(".", 1)[0]
+        totals[top] = totals.get(top, 0) + int(match.group(1))
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+def measure_import_time(root: str, runs: int) -> Dict[str, Any]:
+    """
+    在新的解释器中导入Lambda入口模块，测量各顶层模块的导入耗时。
+
+    取多次运行中总耗时最短的一次，减少磁盘缓存等因素的干扰。
+    """
+    env = dict(os.environ, PYTHONPATH=root, PYTHONDONTWRITEBYTECODE="1")
+    best: Optional[Dict[str, Any]] = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {ENTRY_MODULE}"],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        wall = time.perf_counter() - start
+        modules = parse_import_time(result.stderr)
+        total = sum(modules.values())
+        if best is None or total < best["total_us"]:
+            best = {"total_us": total, "process_ms": wall * 1000, "modules": modules}
+    assert best is not None
+    return best
+
+
+def build(args: argparse.Namespace) -> Dict[str, Any]:
+    """构建部署包并返回报告"""
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    requirements = export_requirements(
+        os.path.join(ROOT, "pyproject.toml"), os.path.join(ROOT, "poetry.lock")
+    )
+    logger.info(
+        "安装运行时依赖: %s", ", ".join(line.split(" ", 1)[0] for line in requirements)
+    )
+    with tempfile.TemporaryDirectory(prefix="lambda-build-") as workdir:
+        staging = os.path.join(workdir, "python") if args.layer else workdir
+        install_requirements(requirements, staging, args.platform, args.python_version)
+        shutil.copytree(
+            os.path.join(ROOT, "src", "calculator"),
+            os.path.join(staging, "calculator"),
+            ignore=shutil.ignore_patterns("__pycache__", "*.py[cod]"),
+        )
+        stripped = strip_tree(staging)
+        logger.info("删除运行时不需要的文件 %.1f KB", stripped / 1024)
+        byte_compile(staging)
+        sizes = module_sizes(staging)
+        unpacked = sum(sizes.values())
+        write_zip(workdir, args.output)
+
+        if _matches_local(args.platform, args.python_version):
+            imports = measure_import_time(staging, args.runs)
+        else:
+            logger.warning("目标平台或Python版本与本机不同，跳过导入耗时测量")
+            imports = None
+
+    return {
+        "artifact": args.output,
+        "layer": args.layer,
+        "python": "%d.%d.%d" % sys.version_info[:3],
+        "zip_bytes": os.path.getsize(args.output),
+        "unpacked_bytes": unpacked,
+        "stripped_bytes": stripped,
+        "module_bytes": sizes,
+        "import_time": imports,
+    }
+
+
+def _matches_local(platform_tag: Optional[str], python_version: Optional[str]) -> bool:
+    """目标平台和Python版本是否与本机一致（一致时才能在本机测量导入耗时）"""
+    if python_version and python_version != "%d.%d" % sys.version_info[:2]:
+        return False
+    if platform_tag:
+        return sys.platform == "linux" and platform_tag.endswith(platform.machine())
+    return True
+
+
+def print_report(report: Dict[str, Any], top: int) -> None:
+    """输出部署包大小和导入耗时"""
+    print(f"部署包: {report['artifact']}")
+    print(f"  压缩后: {report['zip_bytes'] / 1024 / 1024:.2f} MB")
+    print(f"  解压后: {report['unpacked_bytes'] / 1024 / 1024:.2f} MB")
+    print(f"  已删除: {report['stripped_bytes'] / 1024 / 1024:.2f} MB")
+    print("各模块大小:")
+    for name, size in list(report["module_bytes"].items())[:top]:
+        print(f"  {name:<32} {size / 1024:>10.1f} KB")
+    imports = report["import_time"]
+    if imports is None:
+        return
+    print(
+        f"导入 {ENTRY_MODULE}: {imports['total_us'] / 1000:.1f} ms"
+        f"（含解释器启动的进程耗时 {imports['process_ms']:.1f} ms）"
+    )
+    for name, micros in list(imports["modules"].items())[:top]:
+        print(f"  {name:<32} {micros / 1000:>10.1f} ms")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="构建精简的AWS Lambda部署包")
+    parser.add_argument(
+        "--output", default=os.path.join(ROOT, "dist", "lambda.zip"), help="zip文件路径"
+    )
+    parser.add_argument(
+        "--layer", action="store_true", help="生成Lambda层（文件放在python/目录下）"
+    )
+    parser.add_argument(
+        "--platform", help="目标平台，如manylinux2014_x86_64、manylinux2014_aarch64"
+    )
+    parser.add_argument("--python-version", help="目标Python版本，如3.11")
+    parser.add_argument(
+        "--report",
+        default=os.path.join(ROOT, "dist", "lambda-report.json"),
+        help="JSON报告路径",
+    )
+    parser.add_argument("--runs", type=int, default=5, help="导入耗时测量次数")
+    parser.add_argument("--top", type=int, default=15, help="报告中列出的模块数")
+    args = parser.parse_args(argv)
+
+    try:
+        report = build(args)
+    except (subprocess.CalledProcessError, RuntimeError) as e:
+        logger.error("构建失败: %s", str(e))
+        return 1
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print_report(report, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,9 +6,10 @@
 import json
 import os
 import sys
-import paramiko
 import logging
 
+from ssh_session import SSHSessionManager, load_hosts
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -36,44 +37,25 @@ def load_config():
 
 
 def test_ssh_connection(config):
-    """测试SSH连接"""
-    host = config["tencent_host"]["host"]
-    username = config["tencent_host"]["username"]
-    password = config["tencent_host"]["password"]
-    
-    try:
-        # 创建SSH客户端
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
-        # 尝试连接
-        logger.info("正在连接服务器 %s...", host)
-        ssh.connect(
-            hostname=host,
-            username=username,
-            password=password,
-            timeout=10
+    """测试SSH连接，多台主机并发检查"""
+    hosts = load_hosts(config)
+
+    def check_host(host):
+        # 两条检查命令互不依赖，在同一连接的两个channel上并发执行
+        whoami, docker = sessions.run_parallel(
+            host, ["whoami", "docker --version"], check_error=False
         )
-        
-        # 测试执行命令
-        logger.info("执行测试命令...")
-        stdin, stdout, stderr = ssh.exec_command("whoami")
-        result = stdout.read().decode().strip()
-        logger.info("当前用户: %s", result)
-        
-        # 检查Docker
-        logger.info("检查Docker状态...")
-        stdin, stdout, stderr = ssh.exec_command("docker --version")
-        result = stdout.read().decode().strip()
-        logger.info("Docker版本: %s", result)
-        
-        # 关闭连接
-        ssh.close()
-        logger.info("连接测试成功!")
-        
-    except Exception as e:
-        logger.error("连接失败: %s", str(e))
+        logger.info("[%s] 当前用户: %s", host["host"], whoami.stdout)
+        logger.info("[%s] Docker版本: %s", host["host"], docker.stdout or "未安装")
+
+    with SSHSessionManager() as sessions:
+        results = sessions.fan_out(hosts, check_host)
+
+    failed = [name for name, result in results.items() if isinstance(result, Exception)]
+    if failed:
+        logger.error("连接失败: %s", ", ".join(failed))
         sys.exit(1)
+    logger.info("连接测试成功!")
 
 
 def main():
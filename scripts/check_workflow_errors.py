@@ -3,11 +3,15 @@
 检查GitHub Actions工作流错误的脚本
 """
 
+import argparse
+import codecs
 import json
 import os
+import re
 import sys
 import logging
-from typing import Dict, Any, List
+from collections import deque
+from typing import Dict, Any, List, Optional
 import requests
 
 # 配置日志
@@ -18,6 +22,33 @@
 )
 logger = logging.getLogger(__name__)
 
+# 日志流式下载的块大小
+LOG_CHUNK_SIZE = 64 * 1024
+# 单行最大保留长度，防止超长行（如压缩输出）撑大内存
+MAX_LINE_LENGTH = 4096
+# 单个失败片段最多保留的行数，连续命中失败特征的长输出会截断
+MAX_WINDOW_LINES = 200
+# 片段被截断时追加的标记
+WINDOW_TRUNCATED_MARKER = "...（片段过长，省略后续内容）"
+# GitHub日志每行开头的时间戳，例如 2024-01-28T10:00:00.1234567Z
+TIMESTAMP_PREFIX = re.compile(r"^\d{4}-\d{2}-\d{2}T[\d:.]+Z ")
+# 常见失败特征
+FAILURE_PATTERNS = [
+    # pytest
+    re.compile(r"^(FAILED|ERROR) \S+"),
+    re.compile(r"^=+ (FAILURES|ERRORS) =+$"),
+    re.compile(r"^E\s{3}"),
+    # Python异常
+    re.compile(r"^Traceback \(most recent call last\):"),
+    # flake8
+    re.compile(r"^\S+\.py:\d+:\d+: [EFWC]\d{3} "),
+    # black
+    re.compile(r"^would reformat "),
+    re.compile(r"^error: cannot format "),
+    # GitHub Actions错误标记
+    re.compile(r"^##\[error\]"),
+]
+
 
 def load_config() -> Dict[str, Any]:
     """加载配置文件"""
@@ -109,12 +140,111 @@ def get_run_details(config: Dict[str, Any], run_id: int) -> Dict[str, Any]:
         return None
 
 
-def get_job_logs(config: Dict[str, Any], job_id: int) -> str:
-    """获取作业的详细日志"""
+class FailureScanner:
+    """
+    逐行扫描日志，只保留命中失败特征的上下文窗口。
+
+    内存占用只与上下文行数、单个窗口行数和窗口数量上限有关，与日志总大小无关。
+    """
+
+    def __init__(
+        self,
+        context_before: int = 5,
+        context_after: int = 20,
+        max_windows: int = 50,
+        max_window_lines: int = MAX_WINDOW_LINES,
+    ):
+        self.context_after = context_after
+        self.max_windows = max_windows
+        self.max_window_lines = max_window_lines
+        self.windows: List[List[str]] = []
+        self.truncated = False
+        self.line_count = 0
+        self._before = deque(maxlen=context_before)
+        self._current: Optional[List[str]] = None
+        self._remaining_after = 0
+
+    def feed(self, line: str) -> None:
+        """处理一行日志"""
+        self.line_count += 1
+        text = TIMESTAMP_PREFIX.sub("", line)
+
+        if any(pattern.search(text) for pattern in FAILURE_PATTERNS):
+            if self._current is None:
+                if len(self.windows) >= self.max_windows:
+                    self.truncated = True
+                    self._before.append(text)
+                    return
+                # 新窗口带上之前的若干行作为上下文
+                self._current = list(self._before)
+                self.windows.append(self._current)
+                self._before.clear()
+            self._append(text)
+            self._remaining_after = self.context_after
+        elif self._current is not None and self._remaining_after > 0:
+            self._append(text)
+            self._remaining_after -= 1
+        else:
+            self._current = None
+            self._before.append(text)
+
+    def _append(self, text: str) -> None:
+        """向当前窗口追加一行，超过行数上限时只追加一次截断标记"""
+        if len(self._current) < self.max_window_lines:
+            self._current.append(text)
+        elif len(self._current) == self.max_window_lines:
+            self._current.append(WINDOW_TRUNCATED_MARKER)
+
+
+def iter_log_lines(chunks, max_line_length: int = MAX_LINE_LENGTH):
+    """
+    把字节块序列切分成文本行。
+
+    Args:
+        chunks: 字节块迭代器
+        max_line_length: 单行最大保留长度，超出部分丢弃
+
+    Yields:
+        不含换行符的日志行
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")[:max_line_length]
+        # 没有换行的超长行只保留开头部分
+        if len(pending) > max_line_length:
+            pending = pending[:max_line_length]
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")[:max_line_length]
+
+
+def get_job_logs(
+    config: Dict[str, Any],
+    job_id: int,
+    scanner: FailureScanner,
+    save_path: Optional[str] = None,
+) -> bool:
+    """
+    流式获取作业日志，边下载边提取失败信息。
+
+    Args:
+        config: 配置
+        job_id: 作业ID
+        scanner: 失败特征扫描器，提取结果保存在其windows中
+        save_path: 原始日志保存路径，为None时不落盘
+
+    Returns:
+        是否成功获取日志
+    """
     token = config["github"]["token"]
     repo = config["github"]["repository"]
     api_url = f"https://api.github.com/repos/{repo}/actions/jobs/{job_id}/logs"
-    
+
     headers = {
         "Authorization": f"Bearer {token}",
         "Accept": "application/vnd.github.v3+json",
@@ -123,12 +253,26 @@ def get_job_logs(config: Dict[str, Any], job_id: int) -> str:
     try:
         session = requests.Session()
         session.trust_env = False
-        response = session.get(api_url, headers=headers, timeout=30)
-        response.raise_for_status()
-        return response.text
+        response = session.get(api_url, headers=headers, timeout=30, stream=True)
+        with response:
+            response.raise_for_status()
+            chunks = response.iter_content(chunk_size=LOG_CHUNK_SIZE)
+            if save_path:
+                chunks = _tee_to_file(chunks, save_path)
+            for line in iter_log_lines(chunks):
+                scanner.feed(line)
+        return True
     except Exception as e:
         logger.error("获取作业日志失败: %s", str(e))
-        return None
+        return False
+
+
+def _tee_to_file(chunks, path: str):
+    """把原始字节块写入文件的同时继续向下游传递"""
+    with open(path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+            yield chunk
 
 
 def print_workflow_status(run: Dict[str, Any], logs: Dict[str, Any] = None) -> None:
@@ -162,9 +306,37 @@ def print_workflow_status(run: Dict[str, Any], logs: Dict[str, Any] = None) -> N
     print("=" * 80 + "\n")
 
 
-def main():
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="检查最新工作流运行的失败信息")
+    parser.add_argument(
+        "--save-logs", metavar="DIR", help="把失败作业的原始日志保存到该目录"
+    )
+    parser.add_argument(
+        "--context", type=int, default=20, help="每个失败位置之后保留的行数"
+    )
+    return parser.parse_args(argv)
+
+
+def print_failure_windows(scanner: FailureScanner) -> None:
+    """打印提取出的失败片段"""
+    if not scanner.windows:
+        print(f"未发现已知的失败特征（共扫描 {scanner.line_count} 行）")
+        return
+
+    print(f"发现 {len(scanner.windows)} 处失败（共扫描 {scanner.line_count} 行）:")
+    for window in scanner.windows:
+        print("-" * 80)
+        print("\n".join(window))
+    print("-" * 80)
+    if scanner.truncated:
+        print(f"失败片段过多，只显示前 {scanner.max_windows} 处")
+
+
+def main(argv=None):
     """主函数"""
     try:
+        args = parse_args(argv)
         config = load_config()
         runs = get_workflow_runs(config)
         
@@ -174,11 +346,14 @@ def main():
         
         # 只获取最新的一次运行
         latest_run = runs[0]
-        print(f"\n最新的工作流运行:")
+        print("\n最新的工作流运行:")
         print(f"提交: {latest_run['head_commit']['message']}")
         print(f"状态: {latest_run['status']}")
         print(f"结论: {latest_run['conclusion']}")
         
+        if args.save_logs:
+            os.makedirs(args.save_logs, exist_ok=True)
+
         # 获取作业信息
         jobs = get_workflow_logs(config, latest_run["id"])
         if jobs and "jobs" in jobs:
@@ -187,12 +362,19 @@ def main():
                 print(f"状态: {job['status']}")
                 print(f"结论: {job['conclusion']}")
                 
-                # 如果作业失败了，获取详细日志
+                # 如果作业失败了，流式扫描详细日志
                 if job['conclusion'] == 'failure':
-                    print("\n详细日志:")
-                    logs = get_job_logs(config, job['id'])
-                    if logs:
-                        print(logs)
+                    save_path = None
+                    if args.save_logs:
+                        save_path = os.path.join(
+                            args.save_logs, f"job-{job['id']}.log"
+                        )
+                    scanner = FailureScanner(context_after=args.context)
+                    if get_job_logs(config, job['id'], scanner, save_path):
+                        print("\n失败信息:")
+                        print_failure_windows(scanner)
+                        if save_path:
+                            print(f"原始日志已保存到: {save_path}")
                     
     except KeyboardInterrupt:
         logger.info("操作已取消")
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+滚动部署容器镜像到多台服务器的脚本。
+
+部署流程：
+1. 所有主机并发预拉取新镜像（不影响线上服务）
+2. 按批次替换容器，同一批次内的主机并发处理
+3. 每台主机通过 /health 接口确认健康后才进入下一批次
+4. 任意主机失败时中止部署，并把已替换的主机回滚到原镜像（按部署前记录的镜像ID）
+5. 输出每台主机各阶段的耗时
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+from ssh_session import SSHSessionManager, load_hosts
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+# 默认部署参数，可以在配置文件的 deploy 节点中覆盖
+DEFAULT_DEPLOY_CONFIG = {
+    "image": "python-serverless-demo",
+    "container": "python-demo",
+    "port": 8000,
+    "batch_size": 1,
+    "health_timeout": 60,
+    "health_interval": 2,
+}
+
+
+class DeployError(Exception):
+    """部署失败"""
+
+
+class HostDeployment:
+    """单台主机的部署状态和各阶段耗时"""
+
+    def __init__(self, host: Dict[str, Any]):
+        self.host = host
+        self.name = host["host"]
+        self.previous_image: Optional[str] = None
+        self.switched = False
+        self.timings: Dict[str, float] = {}
+        self.error: Optional[str] = None
+
+    def timed(self, phase: str, func, *args, **kwargs):
+        """执行一个阶段并记录耗时"""
+        start = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.timings[phase] = self.timings.get(phase, 0.0) + (
+                time.monotonic() - start
+            )
+
+
+def load_config() -> Dict[str, Any]:
+    """加载配置文件"""
+    config_path = os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), "config.local.json"
+    )
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.error("配置文件未找到: %s", config_path)
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        logger.error("配置文件格式错误: %s", str(e))
+        sys.exit(1)
+
+
+def container_command(image: str, settings: Dict[str, Any]) -> str:
+    """生成替换容器的命令，与CI部署步骤保持一致"""
+    container = settings["container"]
+    port = settings["port"]
+    return (
+        f"docker stop {container} || true && "
+        f"docker rm {container} || true && "
+        f"docker run -d --name {container} -p {port}:8000 "
+        f"--restart unless-stopped {image}"
+    )
+
+
+def wait_healthy(
+    sessions: SSHSessionManager, host: Dict[str, Any], settings: Dict[str, Any]
+) -> None:
+    """在主机上轮询 /health 接口，直到返回健康状态或超时"""
+    url = f"http://localhost:{settings['port']}/health"
+    deadline = time.monotonic() + settings["health_timeout"]
+    while True:
+        result = sessions.run(host, f"curl -fsS {url}", check_error=False)
+        if result.exit_status == 0 and '"healthy"' in result.stdout:
+            return
+        if time.monotonic() >= deadline:
+            raise DeployError(f"健康检查超时: {url}")
+        time.sleep(settings["health_interval"])
+
+
+def prepare_host(
+    sessions: SSHSessionManager,
+    deployment: HostDeployment,
+    image: str,
+    settings: Dict[str, Any],
+) -> None:
+    """
+    记录当前容器的镜像ID并预拉取新镜像。
+
+    记录镜像ID而不是容器创建时使用的镜像名：新镜像与原镜像同名（如都是latest）
+    时，拉取后镜像名已经指向新镜像，按镜像名回滚会重新部署新镜像。
+    """
+    result = deployment.timed(
+        "inspect",
+        sessions.run,
+        deployment.host,
+        "docker inspect --format '{{.Image}}' " + settings["container"],
+        check_error=False,
+    )
+    if result.exit_status == 0 and result.stdout:
+        deployment.previous_image = result.stdout.splitlines()[-1]
+    deployment.timed("pull", sessions.run, deployment.host, f"docker pull {image}")
+
+
+def switch_host(
+    sessions: SSHSessionManager,
+    deployment: HostDeployment,
+    image: str,
+    settings: Dict[str, Any],
+) -> None:
+    """替换容器并等待健康检查通过"""
+    deployment.switched = True
+    deployment.timed(
+        "switch", sessions.run, deployment.host, container_command(image, settings)
+    )
+    deployment.timed("health", wait_healthy, sessions, deployment.host, settings)
+
+
+def rollback_host(
+    sessions: SSHSessionManager,
+    deployment: HostDeployment,
+    settings: Dict[str, Any],
+) -> None:
+    """按部署前记录的镜像ID恢复主机上的容器"""
+    if not deployment.previous_image:
+        logger.warning("[%s] 没有可回滚的镜像，停止新容器", deployment.name)
+        sessions.run(
+            deployment.host, f"docker stop {settings['container']}", check_error=False
+        )
+        return
+    logger.info("[%s] 回滚到镜像: %s", deployment.name, deployment.previous_image)
+    deployment.timed(
+        "rollback",
+        sessions.run,
+        deployment.host,
+        container_command(deployment.previous_image, settings),
+    )
+    wait_healthy(sessions, deployment.host, settings)
+
+
+def collect_errors(deployments: List[HostDeployment], results: Dict[str, Any]) -> bool:
+    """把 fan_out 的异常结果记录到对应主机上，返回是否全部成功"""
+    ok = True
+    for deployment in deployments:
+        result = results.get(deployment.name)
+        if isinstance(result, Exception):
+            deployment.error = str(result)
+            ok = False
+    return ok
+
+
+def rolling_deploy(
+    sessions: SSHSessionManager,
+    deployments: List[HostDeployment],
+    image: str,
+    settings: Dict[str, Any],
+) -> None:
+    """
+    按批次滚动部署，各阶段耗时和错误记录在 deployments 中。
+
+    Args:
+        sessions: SSH会话管理器
+        deployments: 每台主机的部署记录
+        image: 要部署的完整镜像名（含标签）
+        settings: 部署参数
+
+    Raises:
+        DeployError: 任意主机失败时抛出，抛出前已完成回滚
+    """
+    hosts = [d.host for d in deployments]
+    by_name = {d.name: d for d in deployments}
+    max_hosts = max(len(deployments), 1)
+
+    # 预拉取阶段不影响线上服务，所有主机并发执行
+    logger.info("预拉取镜像 %s 到 %d 台主机...", image, len(deployments))
+    results = sessions.fan_out(
+        hosts,
+        lambda host: prepare_host(sessions, by_name[host["host"]], image, settings),
+        max_hosts=max_hosts,
+    )
+    if not collect_errors(deployments, results):
+        raise DeployError("预拉取镜像失败，未替换任何容器")
+
+    batch_size = max(int(settings["batch_size"]), 1)
+    for index in range(0, len(deployments), batch_size):
+        batch = deployments[index : index + batch_size]
+        logger.info(
+            "部署第 %d 批: %s",
+            index // batch_size + 1,
+            ", ".join(d.name for d in batch),
+        )
+        results = sessions.fan_out(
+            [d.host for d in batch],
+            lambda host: switch_host(sessions, by_name[host["host"]], image, settings),
+            max_hosts=batch_size,
+        )
+        if not collect_errors(batch, results):
+            switched = [d for d in deployments if d.switched]
+            logger.error("部署失败，回滚 %d 台主机", len(switched))
+            sessions.fan_out(
+                [d.host for d in switched],
+                lambda host: rollback_host(sessions, by_name[host["host"]], settings),
+                max_hosts=max_hosts,
+            )
+            raise DeployError("部署已中止并回滚")
+
+
+def print_report(deployments: List[HostDeployment], elapsed: float) -> None:
+    """打印每台主机的部署耗时"""
+    phases = ["inspect", "pull", "switch", "health", "rollback"]
+    print("=" * 80)
+    print(f"{'主机':<20}" + "".join(f"{p:>10}" for p in phases) + f"{'合计':>10}")
+    for d in deployments:
+        cells = "".join(
+            f"{d.timings[p]:>10.1f}" if p in d.timings else f"{'-':>10}" for p in phases
+        )
+        total = sum(d.timings.values())
+        print(f"{d.name:<20}{cells}{total:>10.1f}")
+        if d.error:
+            print(f"  ❌ {d.error}")
+    print("=" * 80)
+    print(f"总耗时: {elapsed:.1f} 秒")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="滚动部署容器镜像")
+    parser.add_argument("tag", help="要部署的镜像标签，例如提交SHA")
+    parser.add_argument("--batch-size", type=int, help="每批同时部署的主机数量")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """主函数"""
+    args = parse_args(argv)
+    config = load_config()
+    settings = dict(DEFAULT_DEPLOY_CONFIG, **config.get("deploy", {}))
+    if args.batch_size:
+        settings["batch_size"] = args.batch_size
+    image = f"{settings['image']}:{args.tag}"
+
+    start = time.monotonic()
+    deployments = [HostDeployment(host) for host in load_hosts(config)]
+    with SSHSessionManager() as sessions:
+        try:
+            rolling_deploy(sessions, deployments, image, settings)
+            logger.info("部署成功: %s", image)
+            return 0
+        except DeployError as e:
+            logger.error("%s", str(e))
+            return 1
+        finally:
+            print_report(deployments, time.monotonic() - start)
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        logger.info("操作已取消")
+        sys.exit(0)
@@ -6,10 +6,10 @@
 import json
 import os
 import sys
-import time
-import paramiko
 import logging
 
+from ssh_session import SSHSessionManager, load_hosts
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -36,135 +36,104 @@ def load_config():
         sys.exit(1)
 
 
-def execute_command(ssh, command, check_error=True):
-    """执行命令并返回结果"""
-    logger.info("执行命令: %s", command)
-    stdin, stdout, stderr = ssh.exec_command(command)
-    exit_status = stdout.channel.recv_exit_status()
+def execute_command(sessions, host, command, check_error=True):
+    """执行命令并返回结果，输出在执行过程中逐行打印"""
+    result = sessions.run(host, command, check_error=check_error)
+    return result.stdout, result.stderr, result.exit_status
+
+
+def install_docker(sessions, host):
+    """在远程服务器上安装Docker，所有步骤复用同一个SSH连接"""
+    # 检查是否已安装Docker
+    _, _, exit_status = execute_command(
+        sessions, host, "docker --version", check_error=False
+    )
+    if exit_status == 0:
+        logger.info("[%s] Docker已安装，跳过安装步骤", host["host"])
+        return
     
-    output = stdout.read().decode().strip()
-    error = stderr.read().decode().strip()
+    # 更新包索引
+    logger.info("更新包索引...")
+    execute_command(sessions, host, "sudo apt-get update")
     
-    if output:
-        logger.info("输出: %s", output)
-    if error:
-        logger.warning("错误: %s", error)
+    # 安装必要的依赖
+    logger.info("安装依赖包...")
+    execute_command(sessions, host, """
+        sudo apt-get install -y \\
+            apt-transport-https \\
+            ca-certificates \\
+            curl \\
+            gnupg \\
+            lsb-release
+    """)
     
-    if check_error and exit_status != 0:
-        raise Exception(f"命令执行失败: {error}")
+    # 使用腾讯云镜像源安装Docker
+    logger.info("安装Docker...")
+    execute_command(sessions, host, """
+        curl -fsSL https://mirrors.cloud.tencent.com/docker-ce/linux/ubuntu/gpg | sudo apt-key add -
+    """)
     
-    return output, error, exit_status
-
-
-def install_docker(config):
-    """在远程服务器上安装Docker"""
-    host = config["tencent_host"]["host"]
-    username = config["tencent_host"]["username"]
-    password = config["tencent_host"]["password"]
+    # 添加Docker软件源
+    logger.info("添加Docker软件源...")
+    execute_command(sessions, host, """
+        sudo add-apt-repository "deb [arch=amd64] https://mirrors.cloud.tencent.com/docker-ce/linux/ubuntu $(lsb_release -cs) stable"
+    """)
     
-    try:
-        # 创建SSH客户端
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
-        # 连接服务器
-        logger.info("正在连接服务器 %s...", host)
-        ssh.connect(
-            hostname=host,
-            username=username,
-            password=password,
-            timeout=10
-        )
-        
-        # 检查是否已安装Docker
-        _, _, exit_status = execute_command(ssh, "docker --version", check_error=False)
-        if exit_status == 0:
-            logger.info("Docker已安装，跳过安装步骤")
-            return
-        
-        # 更新包索引
-        logger.info("更新包索引...")
-        execute_command(ssh, "sudo apt-get update")
-        
-        # 安装必要的依赖
-        logger.info("安装依赖包...")
-        execute_command(ssh, """
-            sudo apt-get install -y \\
-                apt-transport-https \\
-                ca-certificates \\
-                curl \\
-                gnupg \\
-                lsb-release
-        """)
-        
-        # 使用腾讯云镜像源安装Docker
-        logger.info("安装Docker...")
-        execute_command(ssh, """
-            curl -fsSL https://mirrors.cloud.tencent.com/docker-ce/linux/ubuntu/gpg | sudo apt-key add -
-        """)
-        
-        # 添加Docker软件源
-        logger.info("添加Docker软件源...")
-        execute_command(ssh, """
-            sudo add-apt-repository "deb [arch=amd64] https://mirrors.cloud.tencent.com/docker-ce/linux/ubuntu $(lsb_release -cs) stable"
-        """)
-        
-        # 再次更新包索引
-        logger.info("更新包索引...")
-        execute_command(ssh, "sudo apt-get update")
-        
-        # 安装Docker
-        logger.info("安装Docker...")
-        execute_command(ssh, "sudo apt-get install -y docker-ce docker-ce-cli containerd.io")
-        
-        # 将当前用户添加到docker组
-        logger.info("将当前用户添加到docker组...")
-        execute_command(ssh, "sudo usermod -aG docker $USER")
-        
-        # 启动Docker服务
-        logger.info("启动Docker服务...")
-        execute_command(ssh, "sudo systemctl start docker")
-        execute_command(ssh, "sudo systemctl enable docker")
-        
-        # 配置Docker镜像加速
-        logger.info("配置Docker镜像加速...")
-        execute_command(ssh, """
-            sudo mkdir -p /etc/docker
-            sudo tee /etc/docker/daemon.json <<-'EOF'
+    # 再次更新包索引
+    logger.info("更新包索引...")
+    execute_command(sessions, host, "sudo apt-get update")
+    
+    # 安装Docker
+    logger.info("安装Docker...")
+    execute_command(sessions, host, "sudo apt-get install -y docker-ce docker-ce-cli containerd.io")
+    
+    # 将当前用户添加到docker组
+    logger.info("将当前用户添加到docker组...")
+    execute_command(sessions, host, "sudo usermod -aG docker $USER")
+    
+    # 启动Docker服务（enable会让systemd重新加载配置，与start并发时可能互相干扰，按顺序执行）
+    logger.info("启动Docker服务...")
+    execute_command(sessions, host, "sudo systemctl start docker")
+    execute_command(sessions, host, "sudo systemctl enable docker")
+    
+    # 配置Docker镜像加速
+    logger.info("配置Docker镜像加速...")
+    execute_command(sessions, host, """
+        sudo mkdir -p /etc/docker
+        sudo tee /etc/docker/daemon.json <<-'EOF'
 {
   "registry-mirrors": ["https://mirror.ccs.tencentyun.com"]
 }
 EOF
-        """)
-        
-        # 重启Docker服务
-        logger.info("重启Docker服务...")
-        execute_command(ssh, "sudo systemctl daemon-reload")
-        execute_command(ssh, "sudo systemctl restart docker")
-        
-        # 验证安装
-        logger.info("验证Docker安装...")
-        output, _, _ = execute_command(ssh, "docker --version")
-        logger.info("Docker安装成功: %s", output)
-        
-        # 测试Docker运行
-        logger.info("测试Docker运行...")
-        execute_command(ssh, "sudo docker run hello-world")
-        
-        # 关闭连接
-        ssh.close()
-        logger.info("Docker安装和配置完成!")
-        
-    except Exception as e:
-        logger.error("安装失败: %s", str(e))
-        sys.exit(1)
+    """)
+    
+    # 重启Docker服务
+    logger.info("重启Docker服务...")
+    execute_command(sessions, host, "sudo systemctl daemon-reload")
+    execute_command(sessions, host, "sudo systemctl restart docker")
+    
+    # 验证安装并测试Docker运行
+    logger.info("验证Docker安装...")
+    version, _ = sessions.run_parallel(
+        host, ["docker --version", "sudo docker run hello-world"]
+    )
+    logger.info("Docker安装成功: %s", version.stdout)
+
+    logger.info("[%s] Docker安装和配置完成!", host["host"])
 
 
 def main():
     """主函数"""
     try:
         config = load_config()
-        install_docker(config)
+        with SSHSessionManager() as sessions:
+            results = sessions.fan_out(
+                load_hosts(config), lambda host: install_docker(sessions, host)
+            )
+        failed = [name for name, r in results.items() if isinstance(r, Exception)]
+        if failed:
+            logger.error("安装失败: %s", ", ".join(failed))
+            sys.exit(1)
     except KeyboardInterrupt:
         logger.info("操作已取消")
         sys.exit(0)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+SSH会话管理模块，供部署相关脚本共用。
+
+- 同一主机的连接在多个步骤之间复用，并开启keep-alive
+- 独立命令可以在同一连接的多个channel上并发执行
+- 标准输出和错误输出按行流式读取，不会一次性读入整个输出
+- 支持把命令分发到多台主机并发执行
+"""
+
+import codecs
+import logging
+import select
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import paramiko
+
+logger = logging.getLogger(__name__)
+
+# 每个命令最多保留的输出行数，超出部分只保留末尾
+MAX_OUTPUT_LINES = 200
+RECV_SIZE = 32 * 1024
+
+
+class CommandError(Exception):
+    """远程命令返回非零退出码"""
+
+    def __init__(self, result: "CommandResult"):
+        self.result = result
+        super().__init__(
+            f"命令执行失败 [{result.host}] (退出码: {result.exit_status}): {result.stderr}"
+        )
+
+
+class CommandResult(NamedTuple):
+    """远程命令的执行结果"""
+
+    host: str
+    command: str
+    exit_status: int
+    stdout: str
+    stderr: str
+    duration: float
+
+
+def load_hosts(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    从配置中读取主机列表。
+
+    优先使用 hosts 列表，没有时退回到单台 tencent_host。
+    """
+    hosts = config.get("hosts")
+    if hosts:
+        return hosts
+    return [config["tencent_host"]]
+
+
+class _LineStream:
+    """把字节块增量解码为行，并只保留最后若干行"""
+
+    def __init__(self, on_line: Callable[[str], None]):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = ""
+        self._on_line = on_line
+        self.lines = deque(maxlen=MAX_OUTPUT_LINES)
+
+    def feed(self, data: bytes, final: bool = False) -> None:
+        self._pending += self._decoder.decode(data, final=final)
+        *complete, self._pending = self._pending.split("\n")
+        if final and self._pending:
+            complete.append(self._pending)
+            self._pending = ""
+        for line in complete:
+            line = line.rstrip("\r")
+            self.lines.append(line)
+            self._on_line(line)
+
+    def text(self) -> str:
+        return "\n".join(self.lines).strip()
+
+
+class SSHSessionManager:
+    """
+    管理到多台主机的SSH连接。
+
+    Args:
+        keepalive: keep-alive包的发送间隔（秒）
+        connect_timeout: 连接超时时间（秒）
+        max_channels: 单台主机上同时打开的channel数量上限
+        client_factory: 创建SSH客户端的工厂，测试时可以替换为本地替身
+    """
+
+    def __init__(
+        self,
+        keepalive: int = 30,
+        connect_timeout: int = 10,
+        max_channels: int = 4,
+        client_factory: Callable[[], Any] = paramiko.SSHClient,
+    ):
+        self.keepalive = keepalive
+        self.connect_timeout = connect_timeout
+        self.max_channels = max_channels
+        self.client_factory = client_factory
+        self._clients: Dict[tuple, Any] = {}
+        # 每台主机一把锁：同一主机只建立一个连接，不同主机的连接互不等待
+        self._host_locks: Dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "SSHSessionManager":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @staticmethod
+    def _key(host: Dict[str, Any]) -> tuple:
+        return (host["host"], host.get("port", 22), host["username"])
+
+    def get_client(self, host: Dict[str, Any]):
+        """获取主机对应的SSH客户端，已有可用连接时直接复用"""
+        key = self._key(host)
+        with self._lock:
+            host_lock = self._host_locks.setdefault(key, threading.Lock())
+        with host_lock:
+            with self._lock:
+                client = self._clients.get(key)
+            transport = client.get_transport() if client else None
+            if transport is not None and transport.is_active():
+                return client
+
+            logger.info("正在连接服务器 %s...", host["host"])
+            client = self.client_factory()
+            try:
+                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+                client.connect(
+                    hostname=host["host"],
+                    port=host.get("port", 22),
+                    username=host["username"],
+                    password=host.get("password"),
+                    key_filename=host.get("key_filename"),
+                    timeout=self.connect_timeout,
+                )
+                client.get_transport().set_keepalive(self.keepalive)
+            except Exception:
+                client.close()
+                raise
+            with self._lock:
+                self._clients[key] = client
+            return client
+
+    def run(
+        self,
+        host: Dict[str, Any],
+        command: str,
+        check_error: bool = True,
+        timeout: Optional[float] = None,
+    ) -> CommandResult:
+        """
+        在主机上执行命令，边执行边按行输出日志。
+
+        Args:
+            host: 主机配置
+            command: 要执行的命令
+            check_error: 退出码非零时是否抛出CommandError
+            timeout: 命令最长执行时间（秒）
+
+        Returns:
+            执行结果，输出只保留最后 MAX_OUTPUT_LINES 行
+        """
+        name = host["host"]
+        logger.info("[%s] 执行命令: %s", name, command.strip())
+        start = time.monotonic()
+        deadline = start + timeout if timeout else None
+
+        channel = self.get_client(host).get_transport().open_session()
+        try:
+            channel.exec_command(command)
+            stdout = _LineStream(lambda line: logger.info("[%s] 输出: %s", name, line))
+            stderr = _LineStream(lambda line: logger.warning("[%s] 错误: %s", name, line))
+
+            while True:
+                select.select([channel], [], [], 0.5)
+                while channel.recv_ready():
+                    stdout.feed(channel.recv(RECV_SIZE))
+                while channel.recv_stderr_ready():
+                    stderr.feed(channel.recv_stderr(RECV_SIZE))
+                if (
+                    channel.exit_status_ready()
+                    and not channel.recv_ready()
+                    and not channel.recv_stderr_ready()
+                ):
+                    break
+                if deadline and time.monotonic() > deadline:
+                    raise TimeoutError(f"[{name}] 命令执行超时: {command.strip()}")
+
+            stdout.feed(b"", final=True)
+            stderr.feed(b"", final=True)
+            exit_status = channel.recv_exit_status()
+        finally:
+            channel.close()
+
+        result = CommandResult(
+            host=name,
+            command=command,
+            exit_status=exit_status,
+            stdout=stdout.text(),
+            stderr=stderr.text(),
+            duration=time.monotonic() - start,
+        )
+        if check_error and exit_status != 0:
+            raise CommandError(result)
+        return result
+
+    def run_parallel(
+        self,
+        host: Dict[str, Any],
+        commands: Iterable[str],
+        check_error: bool = True,
+    ) -> List[CommandResult]:
+        """
+        在同一连接的多个channel上并发执行互不依赖的命令。
+
+        Returns:
+            与 commands 顺序一致的执行结果
+        """
+        commands = list(commands)
+        # 先建立连接，避免多个线程同时发起连接
+        self.get_client(host)
+        workers = min(self.max_channels, len(commands)) or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self.run, host, command, check_error)
+                for command in commands
+            ]
+            return [future.result() for future in futures]
+
+    def fan_out(
+        self,
+        hosts: Iterable[Dict[str, Any]],
+        task: Callable[[Dict[str, Any]], Any],
+        max_hosts: int = 10,
+    ) -> Dict[str, Any]:
+        """
+        在多台主机上并发执行同一个任务。
+
+        Args:
+            hosts: 主机配置列表
+            task: 以主机配置为参数的任务函数
+            max_hosts: 同时处理的主机数量上限
+
+        Returns:
+            主机名到任务结果的映射；任务失败时值为对应的异常
+        """
+        hosts = list(hosts)
+        results: Dict[str, Any] = {}
+        with ThreadPoolExecutor(max_workers=min(max_hosts, len(hosts)) or 1) as pool:
+            futures = {host["host"]: pool.submit(task, host) for host in hosts}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logger.error("[%s] 执行失败: %s", name, str(e))
+                    results[name] = e
+        return results
+
+    def close(self) -> None:
+        """关闭所有连接"""
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+持续监听GitHub Actions工作流运行状态的脚本。
+
+与 check_ci.py 一次性查询不同，本脚本会长时间运行：
+- 使用 ETag 条件请求轮询，未变化时服务端返回 304，不消耗 API 配额
+- 状态未变化时轮询间隔按指数退避，发生变化后立即恢复到最小间隔
+- 只有运行状态发生变化时才拉取作业详情
+- 被限流（403/429）时按 Retry-After 等响应头等待后重试
+- 实时输出工作流、作业和步骤的状态变化，运行结束后退出
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Tuple
+
+import requests
+from requests.exceptions import (
+    RequestException,
+    HTTPError,
+    ConnectionError,
+    Timeout,
+)
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+# 轮询间隔（秒）
+MIN_INTERVAL = 5.0
+MAX_INTERVAL = 60.0
+BACKOFF_FACTOR = 1.5
+# 被限流（403/429）时最多重试的次数
+MAX_RATE_LIMIT_RETRIES = 3
+# 限流响应没有给出等待时间时的等待秒数（GitHub文档建议至少等待1分钟）
+DEFAULT_RATE_LIMIT_WAIT = 60.0
+
+
+def load_config() -> Dict[str, Any]:
+    """加载配置文件"""
+    config_path = os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), "config.local.json"
+    )
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.error("配置文件未找到: %s", config_path)
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        logger.error("配置文件格式错误: %s", str(e))
+        sys.exit(1)
+
+
+class ConditionalClient:
+    """带 ETag 缓存的 GitHub API 客户端，复用同一个 HTTP 连接"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.repo = config["github"]["repository"]
+        self.session = requests.Session()
+        self.session.headers.update(
+            {
+                "Authorization": f"Bearer {config['github']['token']}",
+                "Accept": "application/vnd.github.v3+json",
+            }
+        )
+        # url -> (etag, 上次的响应数据)
+        self._cache: Dict[str, Tuple[str, Any]] = {}
+        # 下一次请求前至少需要等待的秒数（由限流响应头决定）
+        self.wait_hint = 0.0
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None):
+        """
+        发送条件请求，被限流时按服务端要求的时间等待后重试。
+
+        Returns:
+            (数据, 是否发生变化)。返回304时数据取自本地缓存。
+
+        Raises:
+            HTTPError: 请求失败，或限流重试 MAX_RATE_LIMIT_RETRIES 次后仍被限流
+        """
+        url = f"https://api.github.com/repos/{self.repo}/{path}"
+        cache_key = url + json.dumps(params or {}, sort_keys=True)
+        headers = {}
+        cached = self._cache.get(cache_key)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            response = self.session.get(url, headers=headers, params=params, timeout=30)
+            self._update_wait_hint(response)
+            if not _is_rate_limited(response) or attempt == MAX_RATE_LIMIT_RETRIES:
+                break
+            wait = self.wait_hint or DEFAULT_RATE_LIMIT_WAIT
+            logger.warning("请求被限流 (状态码: %d)，%.1f 秒后重试", response.status_code, wait)
+            time.sleep(wait)
+
+        if response.status_code == 304 and cached:
+            logger.debug("资源未变化: %s", url)
+            return cached[1], False
+
+        response.raise_for_status()
+        data = response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            self._cache[cache_key] = (etag, data)
+        return data, True
+
+    def _update_wait_hint(self, response: requests.Response) -> None:
+        """根据限流相关响应头计算下一次请求前的最短等待时间"""
+        self.wait_hint = 0.0
+        poll_interval = response.headers.get("X-Poll-Interval")
+        if poll_interval:
+            self.wait_hint = float(poll_interval)
+
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            self.wait_hint = max(self.wait_hint, parse_retry_after(retry_after))
+
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining == "0" and reset:
+            self.wait_hint = max(self.wait_hint, float(reset) - time.time())
+
+
+def _is_rate_limited(response: requests.Response) -> bool:
+    """是否为限流响应：429，或带有限流响应头的403（403也可能是权限不足）"""
+    if response.status_code == 429:
+        return True
+    return response.status_code == 403 and (
+        "Retry-After" in response.headers
+        or response.headers.get("X-RateLimit-Remaining") == "0"
+    )
+
+
+def parse_retry_after(value: str) -> float:
+    """
+    解析Retry-After响应头。
+
+    Args:
+        value: 秒数或HTTP日期（如 "Wed, 21 Oct 2015 07:28:00 GMT"）
+
+    Returns:
+        需要等待的秒数，无法解析或日期已过时返回0
+    """
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        logger.debug("无法解析Retry-After: %s", value)
+        return 0.0
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def next_interval(current: float, changed: bool, wait_hint: float = 0.0) -> float:
+    """
+    计算下一次轮询间隔。
+
+    Args:
+        current: 当前间隔
+        changed: 本轮是否观察到状态变化
+        wait_hint: 服务端要求的最短等待时间
+
+    Returns:
+        下一次轮询前等待的秒数
+    """
+    if changed:
+        interval = MIN_INTERVAL
+    else:
+        interval = min(current * BACKOFF_FACTOR, MAX_INTERVAL)
+    return max(interval, wait_hint)
+
+
+def get_latest_run_id(client: ConditionalClient, branch: str) -> int:
+    """获取指定分支最新的工作流运行ID"""
+    runs, _ = client.get("actions/runs", params={"branch": branch, "per_page": 1})
+    if not runs["workflow_runs"]:
+        logger.error("没有找到%s分支的工作流运行记录", branch)
+        sys.exit(1)
+    return runs["workflow_runs"][0]["id"]
+
+
+def describe_state(status: str, conclusion: Optional[str]) -> str:
+    """把 status/conclusion 组合成可读的状态描述"""
+    if status == "completed":
+        return f"completed ({conclusion})"
+    return status
+
+
+def step_icon(conclusion: Optional[str]) -> str:
+    """步骤结论对应的图标"""
+    return {
+        "success": "✅",
+        "failure": "❌",
+        "skipped": "⏭️",
+    }.get(conclusion, "⏳")
+
+
+def diff_jobs(previous: Dict[Any, str], jobs_data: Dict[str, Any]) -> Dict[Any, str]:
+    """
+    对比作业和步骤状态，打印发生的变化。
+
+    Args:
+        previous: 上一轮的状态快照，键为作业ID或(作业ID, 步骤序号)
+        jobs_data: 本轮获取的作业数据
+
+    Returns:
+        本轮的状态快照
+    """
+    current: Dict[Any, str] = {}
+    for job in jobs_data["jobs"]:
+        state = describe_state(job["status"], job["conclusion"])
+        current[job["id"]] = state
+        old = previous.get(job["id"])
+        if old != state:
+            print_transition(f"作业 {job['name']}", old, state)
+
+        for step in job.get("steps", []):
+            key = (job["id"], step["number"])
+            step_state = describe_state(step["status"], step["conclusion"])
+            current[key] = step_state
+            if previous.get(key) != step_state:
+                print(
+                    f"    {step_icon(step['conclusion'])} "
+                    f"{step['name']}: {step_state}",
+                    flush=True,
+                )
+    return current
+
+
+def print_transition(subject: str, old: Optional[str], new: str) -> None:
+    """输出一条状态变化记录"""
+    now = datetime.now().strftime("%H:%M:%S")
+    if old is None:
+        print(f"[{now}] {subject}: {new}", flush=True)
+    else:
+        print(f"[{now}] {subject}: {old} -> {new}", flush=True)
+
+
+def watch_run(
+    client: ConditionalClient, run_id: int, timeout: Optional[float] = None
+) -> Optional[str]:
+    """
+    持续监听一次工作流运行，直到运行结束。
+
+    Args:
+        client: GitHub API 客户端
+        run_id: 工作流运行ID
+        timeout: 最长监听时间（秒），为None时不限制
+
+    Returns:
+        运行结论（success、failure等），超时返回None
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    interval = MIN_INTERVAL
+    run_state: Optional[str] = None
+    job_states: Dict[Any, str] = {}
+
+    while True:
+        run, changed = client.get(f"actions/runs/{run_id}")
+        state = describe_state(run["status"], run["conclusion"])
+        if state != run_state:
+            subject = f"工作流 {run['name']} #{run['run_number']}"
+            print_transition(subject, run_state, state)
+            run_state = state
+
+        # 运行记录未变化（304）时作业也不会变化，跳过作业详情请求
+        if changed:
+            jobs_data, _ = client.get(f"actions/runs/{run_id}/jobs")
+            job_states = diff_jobs(job_states, jobs_data)
+
+        if run["status"] == "completed":
+            print(f"详情链接: {run['html_url']}")
+            return run["conclusion"]
+
+        if deadline and time.monotonic() >= deadline:
+            logger.warning("监听超时，运行仍未结束")
+            return None
+
+        interval = next_interval(interval, changed, client.wait_hint)
+        logger.debug("%.1f 秒后再次轮询", interval)
+        time.sleep(interval)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="持续监听GitHub Actions运行状态")
+    parser.add_argument("--run-id", type=int, help="要监听的运行ID，默认取最新一次")
+    parser.add_argument("--branch", default="main", help="查找最新运行时使用的分支")
+    parser.add_argument("--timeout", type=float, help="最长监听时间（秒）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """主函数，运行成功返回0，否则返回1"""
+    args = parse_args(argv)
+    config = load_config()
+    client = ConditionalClient(config)
+
+    try:
+        run_id = args.run_id or get_latest_run_id(client, args.branch)
+        logger.info("开始监听工作流运行: %d", run_id)
+        conclusion = watch_run(client, run_id, timeout=args.timeout)
+    except Timeout:
+        logger.error("请求超时，请检查网络连接")
+        return 1
+    except ConnectionError:
+        logger.error("网络连接错误，请检查网络状态")
+        return 1
+    except HTTPError as e:
+        logger.error("HTTP请求失败 (状态码: %d)", e.response.status_code)
+        logger.debug("响应内容: %s", e.response.text)
+        return 1
+    except RequestException as e:
+        logger.error("请求异常: %s", str(e))
+        return 1
+
+    logger.info("运行结论: %s", conclusion)
+    return 0 if conclusion == "success" else 1
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        logger.info("操作已取消")
+        sys.exit(0)
@@ -8,6 +8,17 @@
     multiply,
     divide,
     sqrt,
+    power,
+    log,
+    exp,
+    sin,
+    cos,
+    tan,
+    gcd,
+    factorial,
+    modpow,
+    OPERATIONS,
+    Operation,
 )
 
 __all__ = [
@@ -16,4 +27,15 @@
     "multiply",
     "divide",
     "sqrt",
+    "power",
+    "log",
+    "exp",
+    "sin",
+    "cos",
+    "tan",
+    "gcd",
+    "factorial",
+    "modpow",
+    "OPERATIONS",
+    "Operation",
 ]
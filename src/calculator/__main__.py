@@ -0,0 +1,9 @@
+"""
+命令行入口：python -m calculator
+"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
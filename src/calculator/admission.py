@@ -0,0 +1,260 @@
+"""
+准入控制与自适应并发限制。
+
+每个进程同时处理的请求数不超过并发上限，超出的请求短暂排队，
+队列已满或排队超时的请求直接返回503（或429）并带上Retry-After，
+避免突发流量下所有请求的延迟一起恶化。
+
+并发上限按AIMD自适应调整：以低负载时的处理耗时为基线，
+耗时未超过基线的tolerance倍且并发接近上限时加性增加，
+超过时乘性减少（每个基线耗时内最多减少一次）。
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# 不受准入控制的路径：健康检查被拒绝会导致负载均衡器误判实例故障
+EXEMPT_PATHS = frozenset({"/health", "/metrics"})
+
+# 内部预热请求在ASGI scope中带有此标记，不计入运行指标，也不受准入控制和限流。
+# 标记只能由进程内的预热程序设置（见 calculator.warmup），外部请求无法伪造
+WARMUP_SCOPE_KEY = "calculator.warmup"
+
+
+class AIMDLimit:
+    """
+    基于处理耗时的AIMD并发上限。
+
+    Args:
+        initial_limit: 初始并发上限
+        min_limit: 并发上限的下限
+        max_limit: 并发上限的上限
+        backoff: 乘性减少的系数
+        tolerance: 耗时超过基线的该倍数时视为过载
+        smoothing: 正常样本更新基线耗时的权重
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 32,
+        min_limit: int = 4,
+        max_limit: int = 256,
+        backoff: float = 0.9,
+        tolerance: float = 2.0,
+        smoothing: float = 0.05,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self._limit = float(initial_limit)
+        self.baseline: Optional[float] = None
+        self._last_decrease = -math.inf
+
+    @property
+    def limit(self) -> int:
+        """当前并发上限"""
+        return int(self._limit)
+
+    def update(
+        self,
+        latency: float,
+        inflight: int,
+        failed: bool = False,
+        now: Optional[float] = None,
+    ) -> None:
+        """
+        根据一次请求的处理结果调整并发上限。
+
+        Args:
+            latency: 处理耗时（秒），不含排队时间
+            inflight: 该请求开始时正在处理的请求数
+            failed: 请求是否异常结束
+            now: 当前时间，默认为time.monotonic()
+        """
+        now = time.monotonic() if now is None else now
+        if self.baseline is None:
+            self.baseline = latency
+
+        if failed or latency > self.baseline * self.tolerance:
+            # 过载样本也缓慢更新基线，适应处理耗时的长期变化
+            self.baseline += (latency - self.baseline) * self.smoothing / 10
+            if now - self._last_decrease >= self.baseline:
+                self._limit = max(self.min_limit, self._limit * self.backoff)
+                self._last_decrease = now
+            return
+
+        self.baseline += (latency - self.baseline) * self.smoothing
+        # 只有并发接近上限时才说明上限在约束吞吐，才需要增加
+        if inflight * 2 >= self._limit:
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+
+class AdmissionController:
+    """
+    管理并发许可和等待队列。
+
+    同一个事件循环内使用，不需要加锁。
+
+    Args:
+        limit: 并发上限策略
+        max_queue: 等待队列的最大长度
+        queue_timeout: 最长排队时间（秒）
+    """
+
+    def __init__(
+        self,
+        limit: Optional[AIMDLimit] = None,
+        max_queue: int = 64,
+        queue_timeout: float = 0.1,
+    ):
+        self.limit = limit or AIMDLimit()
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.inflight = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queue_depth(self) -> int:
+        """当前排队的请求数"""
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """
+        获取一个并发许可。
+
+        Returns:
+            获得许可返回True；队列已满或排队超时返回False
+        """
+        if self.inflight < self.limit.limit and not self.queue_depth:
+            self.inflight += 1
+            self.admitted += 1
+            return True
+        if self.queue_depth >= self.max_queue:
+            self.shed += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # 客户端断开时，已经转交的许可需要归还
+            if waiter.done():
+                self._release_slot()
+            else:
+                self._abandon(waiter)
+            raise
+        if waiter.done():
+            # release() 已经把许可转交给该请求
+            self.admitted += 1
+            return True
+        self._abandon(waiter)
+        self.shed += 1
+        return False
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        self._waiters.remove(waiter)
+
+    def release(self, latency: float, inflight: int, failed: bool = False) -> None:
+        """
+        归还许可并记录处理耗时。
+
+        Args:
+            latency: 处理耗时（秒）
+            inflight: 请求开始处理时的并发数
+            failed: 请求是否异常结束
+        """
+        self.limit.update(latency, inflight, failed)
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        self.inflight -= 1
+        # 队列中只有未完成的等待者，超时和取消的等待者已经被移除
+        while self._waiters and self.inflight < self.limit.limit:
+            self.inflight += 1
+            self._waiters.popleft().set_result(None)
+
+    def retry_after(self) -> int:
+        """估算排队请求处理完所需的秒数，至少1秒"""
+        baseline = self.limit.baseline or 0.0
+        backlog = self.queue_depth + self.inflight
+        return max(1, math.ceil(backlog * baseline / max(self.limit.limit, 1)))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前状态和累计计数，供 /metrics 接口使用"""
+        return {
+            "limit": self.limit.limit,
+            "inflight": self.inflight,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": self.shed,
+            "baseline_latency_ms": round((self.limit.baseline or 0.0) * 1000, 3),
+        }
+
+
+class AdmissionMiddleware:
+    """
+    准入控制中间件。
+
+    Args:
+        app: ASGI应用
+        controller: 准入控制器
+        shed_status: 拒绝请求时的状态码，503或429
+        exempt_paths: 不受准入控制的路径
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: Optional[AdmissionController] = None,
+        shed_status: int = 503,
+        exempt_paths: frozenset = EXEMPT_PATHS,
+    ):
+        self.app = app
+        self.controller = controller or AdmissionController()
+        self.shed_status = shed_status
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["path"] in self.exempt_paths
+            or scope.get(WARMUP_SCOPE_KEY)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        if not await controller.acquire():
+            response = JSONResponse(
+                {"detail": "服务繁忙，请稍后重试"},
+                status_code=self.shed_status,
+                headers={"Retry-After": str(controller.retry_after())},
+            )
+            await response(scope, receive, send)
+            return
+
+        inflight = controller.inflight
+        start = time.perf_counter()
+        failed = True
+        try:
+            await self.app(scope, receive, send)
+            failed = False
+        finally:
+            controller.release(time.perf_counter() - start, inflight, failed)
@@ -2,18 +2,42 @@
 计算器API模块，提供RESTful API接口。
 """
 
-from typing import Dict, Union
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+import inspect
+import math
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, Field, ValidationError, create_model
 from mangum import Mangum
 
-from . import add, subtract, multiply, divide, sqrt
+from . import integer, jobs, linalg
+from .accesslog import AccessLogMiddleware
+from .admission import AdmissionController, AdmissionMiddleware
+from .caching import cached_response
+from .compression import CompressionMiddleware
+from .core import OPERATIONS, Operation
+from .instrumentation import TracingMiddleware, TracingRoute
+from .ratelimit import RateLimitMiddleware
+from .websocket import CalculationSession
 
 app = FastAPI(
     title="Calculator API",
     description="一个基于FastAPI的无服务器计算器API",
     version="1.0.0",
 )
+# 路由处理（参数解析和校验、接口函数、响应序列化）的追踪span，须在注册路由之前设置
+app.router.route_class = TracingRoute
+app.add_middleware(CompressionMiddleware)
+# 最后添加的中间件最先执行：被拒绝的请求不经过压缩等后续处理
+admission = AdmissionController()
+app.add_middleware(AdmissionMiddleware, controller=admission)
+job_manager = jobs.JobManager()
+# 限流在准入控制之前执行，超额客户端的请求不占用并发许可和排队位置
+app.add_middleware(RateLimitMiddleware)
+# 访问日志最先执行，被限流和准入控制拒绝的请求也会记录
+app.add_middleware(AccessLogMiddleware)
+# 追踪span覆盖所有中间件和路由匹配
+app.add_middleware(TracingMiddleware)
 
 
 class CalculationRequest(BaseModel):
@@ -29,6 +53,79 @@ class SingleValueRequest(BaseModel):
     value: float = Field(..., description="输入值")
 
 
+class LogRequest(BaseModel):
+    """对数请求模型"""
+
+    value: float = Field(..., description="真数")
+    base: Optional[float] = Field(None, description="底数，默认为自然对数")
+
+
+class IntegerPairRequest(BaseModel):
+    """整数运算请求模型"""
+
+    a: int = Field(..., description="第一个整数")
+    b: int = Field(..., description="第二个整数")
+
+
+class IntegerValueRequest(BaseModel):
+    """单个整数请求模型"""
+
+    value: int = Field(..., description="输入整数")
+
+
+class ModPowRequest(BaseModel):
+    """模幂请求模型"""
+
+    base: int = Field(..., description="底数")
+    exponent: int = Field(..., description="指数")
+    modulus: int = Field(..., description="模数")
+
+
+# 大整数输入：数值或十进制字符串，超过JSON数值范围时请使用字符串
+IntegerInput = Union[int, str]
+
+
+class BigIntegerRequest(BaseModel):
+    """单个大整数请求模型"""
+
+    n: IntegerInput = Field(..., description="非负整数")
+
+
+class BinomialRequest(BaseModel):
+    """组合数请求模型"""
+
+    n: IntegerInput = Field(..., description="元素总数")
+    k: IntegerInput = Field(..., description="选取的元素数")
+
+
+class PowModRequest(BaseModel):
+    """大整数模幂请求模型"""
+
+    base: IntegerInput = Field(..., description="底数")
+    exponent: IntegerInput = Field(..., description="指数，负数表示模逆元的幂")
+    modulus: IntegerInput = Field(..., description="模数")
+
+
+class MatrixRequest(BaseModel):
+    """单矩阵请求模型"""
+
+    a: List[List[float]] = Field(..., description="矩阵（行列表）")
+
+
+class MatrixPairRequest(BaseModel):
+    """双矩阵请求模型"""
+
+    a: List[List[float]] = Field(..., description="左矩阵")
+    b: List[List[float]] = Field(..., description="右矩阵")
+
+
+class LinearSystemRequest(BaseModel):
+    """线性方程组请求模型"""
+
+    a: List[List[float]] = Field(..., description="系数矩阵")
+    b: List[float] = Field(..., description="常数向量")
+
+
 class CalculationResponse(BaseModel):
     """计算响应模型"""
 
@@ -36,68 +133,410 @@ class CalculationResponse(BaseModel):
     operation: str = Field(..., description="执行的操作")
 
 
-@app.post("/add", response_model=CalculationResponse)
-async def api_add(
-    request: CalculationRequest,
-) -> Dict[str, Union[float, str]]:
-    """加法API"""
+class IntegerResponse(BaseModel):
+    """整数计算响应模型"""
+
+    result: int = Field(..., description="计算结果")
+    operation: str = Field(..., description="执行的操作")
+
+
+class IntegerStringResponse(BaseModel):
+    """大整数计算响应模型，结果以十进制字符串返回"""
+
+    result: str = Field(..., description="计算结果（十进制字符串）")
+    digits: int = Field(..., description="结果的十进制位数")
+    operation: str = Field(..., description="执行的操作")
+
+
+class PrimalityResponse(BaseModel):
+    """素数判断响应模型"""
+
+    result: bool = Field(..., description="是否为素数")
+    operation: str = Field(..., description="执行的操作")
+
+
+class MatrixResponse(BaseModel):
+    """矩阵计算响应模型"""
+
+    result: List[List[float]] = Field(..., description="结果矩阵")
+    operation: str = Field(..., description="执行的操作")
+
+
+class VectorResponse(BaseModel):
+    """向量计算响应模型"""
+
+    result: List[float] = Field(..., description="结果向量")
+    operation: str = Field(..., description="执行的操作")
+
+
+class JobRequest(BaseModel):
+    """批量计算任务请求模型"""
+
+    operation: str = Field(..., description="运算名称，如 add、sqrt")
+    a: List[float] = Field(..., description="第一组操作数")
+    b: Optional[List[float]] = Field(None, description="第二组操作数，单操作数运算不传")
+
+
+class JobResponse(BaseModel):
+    """批量计算任务状态响应模型"""
+
+    job_id: str = Field(..., description="任务ID")
+    operation: str = Field(..., description="运算名称")
+    status: str = Field(..., description="queued、running、succeeded 或 failed")
+    total: int = Field(..., description="元素总数")
+    completed: int = Field(..., description="已完成的元素数量")
+    progress: float = Field(..., description="完成比例，0到1之间")
+    error: Optional[str] = Field(None, description="失败原因")
+
+
+class JobResultsResponse(BaseModel):
+    """批量计算任务结果分页响应模型"""
+
+    job_id: str = Field(..., description="任务ID")
+    status: str = Field(..., description="任务状态")
+    offset: int = Field(..., description="本页第一个结果的下标")
+    total: int = Field(..., description="元素总数")
+    completed: int = Field(..., description="已完成的元素数量")
+    results: List[Union[int, float]] = Field(..., description="本页结果")
+    next_offset: Optional[int] = Field(None, description="下一页的offset，没有更多结果时为空")
+
+
+def _parse_integer(value: Union[int, str]) -> int:
+    """把数值或十进制字符串形式的输入转换为整数"""
+    return integer.parse_integer(value) if isinstance(value, str) else value
+
+
+def _integer_result(value: int, operation: str) -> Dict[str, Union[int, str]]:
+    text = integer.to_decimal_string(value)
+    return {
+        "result": text,
+        "digits": len(text.lstrip("-")),
+        "operation": operation,
+    }
+
+
+# 标量运算的接口由 calculator.core.OPERATIONS 生成：
+# POST接口从请求体读取参数；GET接口从查询字符串读取参数，结果只取决于参数，
+# 带ETag和长期缓存头，客户端和CDN可以直接复用缓存，If-None-Match匹配时不执行计算
+
+# 参数名和类型相同的运算共用请求模型
+_REQUEST_MODELS: Dict[Tuple[Tuple[str, ...], bool], Type[BaseModel]] = {
+    (("a", "b"), False): CalculationRequest,
+    (("value",), False): SingleValueRequest,
+    (("value", "base"), False): LogRequest,
+    (("a", "b"), True): IntegerPairRequest,
+    (("value",), True): IntegerValueRequest,
+    (("base", "exponent", "modulus"), True): ModPowRequest,
+}
+
+
+def _request_model(op: Operation) -> Type[BaseModel]:
+    """运算的请求模型，没有现成模型时按参数生成"""
+    model = _REQUEST_MODELS.get((op.params + op.optional, op.integer))
+    if model is None:
+        number = int if op.integer else float
+        fields: Dict[str, Any] = {name: (number, ...) for name in op.params}
+        fields.update({name: (Optional[number], None) for name in op.optional})
+        model = create_model(f"{op.name.title()}Request", **fields)
+    return model
+
+
+class NonFiniteError(ValueError):
+    """输入或计算结果为inf或nan，JSON无法表示"""
+
+
+def _evaluate(op: Operation, args: List[Any]) -> Any:
+    """执行标量运算，输入和结果都必须是有限数值"""
+    for name, value in zip(op.params + op.optional, args):
+        if isinstance(value, float) and not math.isfinite(value):
+            raise NonFiniteError(f"参数 {name} 必须是有限数值（当前输入值: {value}）")
+    result = op.scalar(*args)
+    if isinstance(result, float) and not math.isfinite(result):
+        raise NonFiniteError(f"计算结果超出范围（当前结果: {result}）")
+    return result
+
+
+def _add_operation_routes(op: Operation) -> None:
+    """为一个注册的运算生成POST和GET接口"""
+    request_model = _request_model(op)
+    response_model = IntegerResponse if op.integer else CalculationResponse
+    names = op.params + op.optional
+    errors = (NonFiniteError, *op.errors)
+
+    async def post(request: request_model) -> Dict[str, Any]:  # type: ignore
+        try:
+            result = _evaluate(op, [getattr(request, name) for name in names])
+        except errors as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {"result": result, "operation": op.label}
+
+    async def get(request: Request, **values: Any) -> Response:
+        args = [values[name] for name in names]
+        return cached_response(
+            request,
+            lambda: {"result": _evaluate(op, args), "operation": op.label},
+            *args,
+            errors=errors,
+        )
+
+    # GET接口的查询参数由签名决定
+    number = int if op.integer else float
+    keyword = inspect.Parameter.KEYWORD_ONLY
+    get.__signature__ = inspect.Signature(  # type: ignore
+        [inspect.Parameter("request", keyword, annotation=Request)]
+        + [inspect.Parameter(name, keyword, annotation=number) for name in op.params]
+        + [
+            inspect.Parameter(name, keyword, default=None, annotation=Optional[number])
+            for name in op.optional
+        ]
+    )
+
+    post.__name__, post.__doc__ = f"api_{op.name}", f"{op.description}API"
+    get.__name__ = f"api_{op.name}_get"
+    get.__doc__ = f"{op.description}API（GET，可缓存）"
+    app.post(f"/{op.name}", response_model=response_model)(post)
+    app.get(f"/{op.name}", response_model=response_model)(get)
+
+
+for _op in OPERATIONS.values():
+    _add_operation_routes(_op)
+
+
+@app.post("/int/factorial", response_model=IntegerStringResponse)
+async def api_int_factorial(
+    request: BigIntegerRequest,
+) -> Dict[str, Union[int, str]]:
+    """大整数阶乘API"""
     try:
-        result = add(request.a, request.b)
-        return {"result": result, "operation": "addition"}
+        result = integer.factorial(_parse_integer(request.n))
+        return _integer_result(result, "factorial")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.post("/subtract", response_model=CalculationResponse)
-async def api_subtract(
-    request: CalculationRequest,
-) -> Dict[str, Union[float, str]]:
-    """减法API"""
+@app.post("/int/binomial", response_model=IntegerStringResponse)
+async def api_int_binomial(
+    request: BinomialRequest,
+) -> Dict[str, Union[int, str]]:
+    """组合数API"""
     try:
-        result = subtract(request.a, request.b)
-        return {"result": result, "operation": "subtraction"}
+        result = integer.binomial(_parse_integer(request.n), _parse_integer(request.k))
+        return _integer_result(result, "binomial")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.post("/multiply", response_model=CalculationResponse)
-async def api_multiply(
-    request: CalculationRequest,
-) -> Dict[str, Union[float, str]]:
-    """乘法API"""
+@app.post("/int/powmod", response_model=IntegerStringResponse)
+async def api_int_powmod(
+    request: PowModRequest,
+) -> Dict[str, Union[int, str]]:
+    """大整数模幂API"""
     try:
-        result = multiply(request.a, request.b)
-        return {"result": result, "operation": "multiplication"}
+        result = integer.pow_mod(
+            _parse_integer(request.base),
+            _parse_integer(request.exponent),
+            _parse_integer(request.modulus),
+        )
+        return _integer_result(result, "modular_power")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.post("/divide", response_model=CalculationResponse)
-async def api_divide(
-    request: CalculationRequest,
-) -> Dict[str, Union[float, str]]:
-    """除法API"""
+@app.post("/int/is_prime", response_model=PrimalityResponse)
+async def api_int_is_prime(
+    request: BigIntegerRequest,
+) -> Dict[str, Union[bool, str]]:
+    """素数判断API"""
     try:
-        result = divide(request.a, request.b)
-        return {"result": result, "operation": "division"}
-    except ZeroDivisionError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        result = integer.is_prime(_parse_integer(request.n))
+        return {"result": result, "operation": "is_prime"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.post("/sqrt", response_model=CalculationResponse)
-async def api_sqrt(
-    request: SingleValueRequest,
-) -> Dict[str, Union[float, str]]:
-    """平方根API"""
+# 矩阵接口的二进制格式，见 calculator.linalg
+BINARY_MEDIA_TYPE = "application/octet-stream"
+
+
+def _matrix_body(model: Type[BaseModel]) -> Dict[str, Any]:
+    """矩阵接口的OpenAPI请求体说明：JSON或二进制"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": model.model_json_schema()},
+                BINARY_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    }
+
+
+async def _read_matrices(
+    request: Request, model: Type[BaseModel]
+) -> Tuple[List[Any], bool]:
+    """
+    读取矩阵接口的请求体。
+
+    Returns:
+        (按模型字段顺序排列的操作数, 是否为二进制请求)
+
+    Raises:
+        NonFiniteError: 操作数中有inf或nan时抛出
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith(BINARY_MEDIA_TYPE):
+        matrices = linalg.unpack_matrices(body)
+        if len(matrices) != len(model.model_fields):
+            raise ValueError(f"需要 {len(model.model_fields)} 个矩阵（当前: {len(matrices)}）")
+        operands, binary = matrices, True
+    else:
+        try:
+            parsed = model.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+        operands = [getattr(parsed, name) for name in model.model_fields]
+        binary = False
+    for name, operand in zip(model.model_fields, operands):
+        value = _first_non_finite(operand)
+        if value is not None:
+            raise NonFiniteError(f"参数 {name} 必须是有限数值（当前输入值: {value}）")
+    return operands, binary
+
+
+def _first_non_finite(value: Any) -> Optional[float]:
+    """矩阵、向量或数值中的第一个inf或nan，都是有限数值时返回None"""
+    rows = value if isinstance(value, list) else [value]
+    for row in rows:
+        row = row if isinstance(row, list) else [row]
+        if not all(map(math.isfinite, row)):
+            return next(x for x in row if not math.isfinite(x))
+    return None
+
+
+def _matrix_result(result: Any, operation: str, binary: bool) -> Any:
+    """
+    二进制请求返回二进制矩阵，否则返回JSON。
+
+    Raises:
+        NonFiniteError: 结果中有inf或nan时抛出
+    """
+    value = _first_non_finite(result)
+    if value is not None:
+        raise NonFiniteError(f"计算结果超出范围（当前结果: {value}）")
+    if binary:
+        if not isinstance(result, list):
+            result = [[result]]
+        elif result and not isinstance(result[0], list):
+            result = [[x] for x in result]
+        return Response(linalg.pack_matrix(result), media_type=BINARY_MEDIA_TYPE)
+    return {"result": result, "operation": operation}
+
+
+@app.post(
+    "/matrix/multiply",
+    response_model=MatrixResponse,
+    openapi_extra=_matrix_body(MatrixPairRequest),
+)
+async def api_matrix_multiply(request: Request) -> Any:
+    """矩阵乘法API"""
     try:
-        result = sqrt(request.value)
-        return {"result": result, "operation": "square_root"}
+        (a, b), binary = await _read_matrices(request, MatrixPairRequest)
+        result = linalg.matmul(a, b)
+        return _matrix_result(result, "matrix_multiplication", binary)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
+
+
+@app.post(
+    "/matrix/transpose",
+    response_model=MatrixResponse,
+    openapi_extra=_matrix_body(MatrixRequest),
+)
+async def api_matrix_transpose(request: Request) -> Any:
+    """矩阵转置API"""
+    try:
+        (a,), binary = await _read_matrices(request, MatrixRequest)
+        result = linalg.transpose(a)
+        return _matrix_result(result, "transpose", binary)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post(
+    "/matrix/det",
+    response_model=CalculationResponse,
+    openapi_extra=_matrix_body(MatrixRequest),
+)
+async def api_matrix_det(request: Request) -> Any:
+    """行列式API"""
+    try:
+        (a,), binary = await _read_matrices(request, MatrixRequest)
+        result = linalg.det(a)
+        return _matrix_result(result, "determinant", binary)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post(
+    "/matrix/solve",
+    response_model=VectorResponse,
+    openapi_extra=_matrix_body(LinearSystemRequest),
+)
+async def api_matrix_solve(request: Request) -> Any:
+    """线性方程组求解API，二进制请求的常数向量以 n x 1 矩阵传递"""
+    try:
+        (a, b), binary = await _read_matrices(request, LinearSystemRequest)
+        if binary:
+            b = [x for row in b for x in row]
+        result = linalg.solve(a, b)
+        return _matrix_result(result, "linear_solve", binary)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/jobs", response_model=JobResponse, status_code=202)
+async def api_submit_job(request: JobRequest, response: Response) -> Dict[str, Any]:
+    """提交批量计算任务，立即返回任务ID"""
+    try:
+        job = job_manager.submit(request.operation, request.a, request.b)
+    except jobs.JobLimitError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "1"}
+        )
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job.summary()
+
+
+def _get_job(job_id: str) -> jobs.Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {job_id}")
+    return job
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def api_get_job(job_id: str) -> Dict[str, Any]:
+    """查询任务状态和进度"""
+    return _get_job(job_id).summary()
+
+
+@app.get("/jobs/{job_id}/results", response_model=JobResultsResponse)
+async def api_get_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0, description="第一个结果的下标"),
+    limit: int = Query(1000, ge=1, le=jobs.MAX_PAGE_SIZE, description="每页结果数量"),
+) -> Dict[str, Any]:
+    """分页读取任务结果，任务运行中也可以读取已完成的部分"""
+    return _get_job(job_id).page(offset, limit)
+
+
+@app.websocket("/ws")
+async def api_websocket(websocket: WebSocket) -> None:
+    """WebSocket计算接口：同一连接上流水线发送计算消息，按id匹配回复"""
+    await CalculationSession(websocket).run()
 
 
 @app.get("/health")
@@ -106,6 +545,12 @@ async def health_check() -> Dict[str, str]:
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+async def metrics() -> Dict[str, Any]:
+    """运行指标接口：并发上限、排队深度、拒绝次数和任务数量（当前进程）"""
+    return {"admission": admission.snapshot(), "jobs": job_manager.snapshot()}
+
+
 # AWS Lambda处理器
 handler = Mangum(app)
 
@@ -0,0 +1,84 @@
+"""
+HTTP缓存支持。
+
+计算结果只取决于运算和输入，GET接口的响应可以被客户端、
+API Gateway和CDN长期缓存。ETag由接口路径、规范化后的输入和
+API版本计算得到，不需要先执行计算；请求带有匹配的
+If-None-Match时直接返回304，不执行计算。
+"""
+
+import hashlib
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Type
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+
+# 结果不会变化，允许缓存一年
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def make_etag(path: str, inputs: Iterable[Any], version: str) -> str:
+    """
+    计算强ETag。
+
+    Args:
+        path: 接口路径
+        inputs: 解析后的输入值，1 和 1.0 等价的输入应先转换为相同类型
+        version: API版本，版本变化时所有ETag随之变化
+
+    Returns:
+        带引号的ETag
+    """
+    key = "\n".join([version, path, *(repr(value) for value in inputs)])
+    return '"' + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    判断If-None-Match请求头是否与ETag匹配。
+
+    按RFC 9110，If-None-Match使用弱比较，忽略 W/ 前缀。
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def cached_response(
+    request: Request,
+    compute: Callable[[], Dict[str, Any]],
+    *inputs: Any,
+    errors: Tuple[Type[Exception], ...],
+) -> Response:
+    """
+    返回带缓存头的计算结果。
+
+    Args:
+        request: 当前请求
+        compute: 计算响应内容的函数，仅在缓存未命中时调用
+        inputs: 决定计算结果的输入值
+        errors: 输入不合法时compute可能抛出的异常类型，其他异常按服务端错误处理
+
+    Returns:
+        304响应或带ETag的JSON响应
+
+    Raises:
+        HTTPException: compute抛出errors中的异常时返回400，错误响应不带缓存头
+    """
+    etag = make_etag(request.url.path, inputs, request.app.version)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    try:
+        content = compute()
+    except errors as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(content, headers=headers)
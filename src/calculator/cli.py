@@ -0,0 +1,247 @@
+"""
+离线批量计算命令行工具。
+
+用法::
+
+    python -m calculator input.csv -o output.csv
+
+输入文件需要包含 op、a、b 三列（单操作数运算的 b 列留空），
+按块读取、按运算分组后走向量化计算，结果逐块写出，
+内存占用只与块大小有关。安装了pyarrow时也可以读取Parquet文件。
+"""
+
+import argparse
+import contextlib
+import csv
+import sys
+import time
+from itertools import islice
+from operator import itemgetter
+from typing import IO, Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import parallel
+from .core import SCALAR_OPERATIONS, UNARY_OPERATIONS
+
+DEFAULT_CHUNK_SIZE = 50_000
+INPUT_COLUMNS = ("op", "a", "b")
+OUTPUT_COLUMNS = ("op", "a", "b", "result", "error")
+
+Row = Tuple[Any, Any, Any]
+
+
+class RunStats(NamedTuple):
+    """一次批量计算的统计信息"""
+
+    rows: int
+    errors: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def _read_csv_chunks(
+    f: IO[str], chunk_size: int, delimiter: str
+) -> Iterator[List[Row]]:
+    reader = csv.reader(f, delimiter=delimiter)
+    header = next(reader, None)
+    if header is None:
+        return
+    try:
+        indexes = [header.index(column) for column in INPUT_COLUMNS]
+    except ValueError:
+        raise ValueError(f"输入文件缺少必要的列: {', '.join(INPUT_COLUMNS)}")
+
+    width = max(indexes) + 1
+    getter = itemgetter(*indexes)
+    while True:
+        lines = list(islice(reader, chunk_size))
+        if not lines:
+            return
+        # 缺少的列（如单操作数运算省略的 b 列）按空值处理，空行直接跳过
+        yield [
+            getter(row) if len(row) >= width else getter(row + [""] * width)
+            for row in lines
+            if row
+        ]
+
+
+def _read_parquet_chunks(path: str, chunk_size: int) -> Iterator[List[Row]]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("读取Parquet文件需要安装pyarrow")
+
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(
+        batch_size=chunk_size, columns=list(INPUT_COLUMNS)
+    ):
+        columns = batch.to_pydict()
+        yield list(zip(*(columns[name] for name in INPUT_COLUMNS)))
+
+
+def read_chunks(
+    path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, delimiter: str = ","
+) -> Iterator[List[Row]]:
+    """
+    按块读取输入文件。
+
+    Args:
+        path: 输入文件路径，"-" 表示标准输入
+        chunk_size: 每块的行数
+        delimiter: CSV分隔符
+
+    Yields:
+        每块的 (op, a, b) 行列表
+    """
+    if path.endswith(".parquet"):
+        yield from _read_parquet_chunks(path, chunk_size)
+    elif path == "-":
+        yield from _read_csv_chunks(sys.stdin, chunk_size, delimiter)
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            yield from _read_csv_chunks(f, chunk_size, delimiter)
+
+
+def _parse_number(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def evaluate_chunk(
+    rows: List[Row], workers: Optional[int] = None
+) -> List[Tuple[Optional[float], Optional[str]]]:
+    """
+    计算一块数据。
+
+    同一运算的行合并成列后批量计算；批量计算出错时退回逐行计算，
+    以便定位每一行的错误。
+
+    Returns:
+        与输入顺序一致的 (结果, 错误信息) 列表
+    """
+    outputs: List[Tuple[Optional[float], Optional[str]]] = [(None, None)] * len(rows)
+    groups: Dict[str, Tuple[List[int], List[float], List[float]]] = {}
+
+    for index, (op, a, b) in enumerate(rows):
+        if op not in SCALAR_OPERATIONS:
+            outputs[index] = (None, f"不支持的运算: {op}")
+            continue
+        try:
+            a_value = _parse_number(a)
+            b_value = _parse_number(b)
+        except ValueError:
+            outputs[index] = (None, f"无效的数值: a={a}, b={b}")
+            continue
+        unary = op in UNARY_OPERATIONS
+        if a_value is None or (b_value is None) != unary:
+            outputs[index] = (None, f"运算 {op} 的操作数个数不正确")
+            continue
+        indexes, a_column, b_column = groups.setdefault(op, ([], [], []))
+        indexes.append(index)
+        a_column.append(a_value)
+        if not unary:
+            b_column.append(b_value)
+
+    for op, (indexes, a_column, b_column) in groups.items():
+        b_arg = None if op in UNARY_OPERATIONS else b_column
+        try:
+            results = parallel.evaluate(op, a_column, b_arg, workers=workers)
+            for index, result in zip(indexes, results):
+                outputs[index] = (result, None)
+        except (ValueError, ZeroDivisionError, OverflowError):
+            func = SCALAR_OPERATIONS[op]
+            for position, index in enumerate(indexes):
+                args = (a_column[position],)
+                if b_arg is not None:
+                    args += (b_column[position],)
+                try:
+                    outputs[index] = (func(*args), None)
+                except (ValueError, ZeroDivisionError, OverflowError) as e:
+                    outputs[index] = (None, str(e))
+    return outputs
+
+
+def run(
+    input_path: str,
+    output: IO[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: Optional[int] = None,
+    delimiter: str = ",",
+    progress: Optional[IO[str]] = None,
+) -> RunStats:
+    """
+    执行批量计算并逐块写出结果。
+
+    Args:
+        input_path: 输入文件路径
+        output: 结果输出流（CSV）
+        chunk_size: 每块的行数
+        workers: 批量计算使用的进程数
+        delimiter: 输入文件的CSV分隔符
+        progress: 进度输出流，为None时不输出
+
+    Returns:
+        统计信息
+    """
+    writer = csv.writer(output)
+    writer.writerow(OUTPUT_COLUMNS)
+    start = time.perf_counter()
+    rows = errors = 0
+
+    for chunk in read_chunks(input_path, chunk_size, delimiter):
+        results = evaluate_chunk(chunk, workers=workers)
+        writer.writerows(
+            (op, a, b, "" if result is None else repr(result), error or "")
+            for (op, a, b), (result, error) in zip(chunk, results)
+        )
+        rows += len(chunk)
+        errors += sum(1 for _, error in results if error)
+        if progress is not None:
+            elapsed = time.perf_counter() - start
+            progress.write(f"已处理 {rows} 行，{rows / elapsed:,.0f} 行/秒\n")
+
+    return RunStats(rows, errors, time.perf_counter() - start)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        prog="python -m calculator", description="离线批量计算 op,a,b 数据文件"
+    )
+    parser.add_argument("input", help="输入文件（CSV或Parquet），- 表示标准输入")
+    parser.add_argument("-o", "--output", default="-", help="输出CSV文件，默认标准输出")
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每块的行数"
+    )
+    parser.add_argument("--workers", type=int, help="批量计算使用的进程数")
+    parser.add_argument("--delimiter", default=",", help="输入CSV的分隔符")
+    parser.add_argument("--quiet", action="store_true", help="不输出进度信息")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """命令行入口，所有行计算成功返回0，否则返回1"""
+    args = parse_args(argv)
+    progress = None if args.quiet else sys.stderr
+
+    try:
+        if args.output == "-":
+            output = contextlib.nullcontext(sys.stdout)
+        else:
+            output = open(args.output, "w", encoding="utf-8", newline="")
+        with output as f:
+            stats = run(
+                args.input, f, args.chunk_size, args.workers, args.delimiter, progress
+            )
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"错误: {e}\n")
+        return 2
+
+    sys.stderr.write(
+        f"完成: {stats.rows} 行，{stats.errors} 行出错，"
+        f"耗时 {stats.seconds:.2f} 秒，{stats.rows_per_second:,.0f} 行/秒\n"
+    )
+    return 1 if stats.errors else 0
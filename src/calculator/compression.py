@@ -0,0 +1,386 @@
+"""
+HTTP压缩中间件。
+
+响应：按Accept-Encoding协商brotli（安装了brotli时）或gzip，
+小于阈值的响应不压缩，小响应的压缩收益抵不上CPU开销。
+请求：支持Content-Encoding为gzip/deflate/br（需要brotli 1.2及以上）的请求体，
+边解压边计数，解压后大小超过上限时返回413。
+
+压缩后的响应是不同的表示，强ETag会追加编码后缀（如 "abc-gzip"），
+请求中If-None-Match携带的后缀在交给应用前去掉，
+应用只需要处理未压缩表示的ETag。
+"""
+
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 取决于运行环境
+    brotli = None
+
+# 小于该字节数的响应不压缩
+MINIMUM_SIZE = 1024
+# gzip压缩级别。对数值JSON，级别1的压缩结果只比级别6大约5%，CPU开销约为1/5
+GZIP_LEVEL = 1
+# brotli质量参数，动态内容使用较低的质量
+BROTLI_QUALITY = 4
+# 请求体解压后的最大字节数，防止压缩炸弹
+MAX_REQUEST_SIZE = 10 * 1024 * 1024
+
+# 需要压缩的内容类型
+_COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/xml",
+    "application/javascript",
+)
+_COMPRESSIBLE_SUFFIXES = ("+json", "+xml")
+
+
+def supported_encodings() -> List[str]:
+    """当前环境支持的响应编码，按优先级排列"""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    weights = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    根据Accept-Encoding选择响应编码。
+
+    Args:
+        accept_encoding: Accept-Encoding请求头
+
+    Returns:
+        选中的编码，客户端不接受任何支持的编码时返回None
+    """
+    if not accept_encoding:
+        return None
+    weights = _parse_accept_encoding(accept_encoding)
+    default = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for coding in supported_encodings():
+        weight = weights.get(coding, default)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def process(self, data: bytes, final: bool) -> bytes:
+        if final:
+            return self._compressor.compress(data) + self._compressor.flush()
+        # 流式响应的每一块都立即输出，避免客户端等待
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def process(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.process(data)
+        if final:
+            return output + self._compressor.finish()
+        return output + self._compressor.flush()
+
+
+def _is_compressible(content_type: str) -> bool:
+    content_type = content_type.split(";")[0].strip().lower()
+    return content_type.startswith(_COMPRESSIBLE_TYPES) or content_type.endswith(
+        _COMPRESSIBLE_SUFFIXES
+    )
+
+
+def _etag_with_suffix(etag: str, suffix: str) -> str:
+    """强ETag追加编码后缀，弱ETag保持不变"""
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return etag[:-1] + "-" + suffix + '"'
+
+
+def _strip_etag_suffixes(if_none_match: str) -> Tuple[str, Optional[str]]:
+    """去掉If-None-Match中各ETag的编码后缀，返回新请求头和去掉的后缀"""
+    stripped = None
+    tags = []
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        for coding in ("gzip", "br"):
+            marker = "-" + coding + '"'
+            if tag.endswith(marker):
+                tag = tag[: -len(marker)] + '"'
+                stripped = coding
+                break
+        tags.append(tag)
+    return ", ".join(tags), stripped
+
+
+class _Decompressor:
+    """按块解压请求体，并限制解压后的总大小"""
+
+    def __init__(self, encoding: str, limit: int):
+        self.limit = limit
+        self.size = 0
+        if encoding == "gzip":
+            self._zlib = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            self._brotli = None
+        elif encoding == "deflate":
+            self._zlib = zlib.decompressobj()
+            self._brotli = None
+        else:
+            self._zlib = None
+            self._brotli = brotli.Decompressor()
+
+    def _count(self, data: bytes) -> bytes:
+        self.size += len(data)
+        if self.size > self.limit:
+            raise OverflowError(f"请求体解压后超过 {self.limit} 字节")
+        return data
+
+    def _room(self) -> int:
+        # 比剩余额度多一个字节，超出上限时才能被 _count 发现
+        return self.limit - self.size + 1
+
+    def process(self, chunk: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._process_brotli(chunk)
+        output = []
+        data = chunk
+        while data:
+            # max_length限制单次输出，避免一小块数据解压出巨大的结果
+            output.append(self._count(self._zlib.decompress(data, self._room())))
+            data = self._zlib.unconsumed_tail
+        return b"".join(output)
+
+    def _process_brotli(self, chunk: bytes) -> bytes:
+        # output_buffer_limit限制单次输出，未输出的部分留在解压器内部，
+        # 取完（can_accept_more_data为True）之前只能传入空数据
+        process = self._brotli.process
+        output = [self._count(process(chunk, output_buffer_limit=self._room()))]
+        while not self._brotli.can_accept_more_data():
+            output.append(self._count(process(b"", output_buffer_limit=self._room())))
+        return b"".join(output)
+
+    def finish(self) -> bytes:
+        if self._zlib is None:
+            if not self._brotli.is_finished():
+                raise brotli.error("压缩数据不完整")
+            return b""
+        output = self._count(self._zlib.flush())
+        if not self._zlib.eof:
+            raise zlib.error("压缩数据不完整")
+        return output
+
+
+def _brotli_decoding_supported() -> bool:
+    """brotli 1.2之前的解压器无法限制单次输出，不解压br编码的请求体"""
+    return brotli is not None and hasattr(brotli.Decompressor, "can_accept_more_data")
+
+
+def _decoded_encodings() -> Tuple[str, ...]:
+    if _brotli_decoding_supported():
+        return ("gzip", "deflate", "br")
+    return ("gzip", "deflate")
+
+
+_DECOMPRESS_ERRORS = (zlib.error,) + ((brotli.error,) if brotli is not None else ())
+
+
+class CompressionMiddleware:
+    """
+    响应压缩和请求体解压中间件。
+
+    Args:
+        app: ASGI应用
+        minimum_size: 响应压缩的最小字节数
+        gzip_level: gzip压缩级别
+        brotli_quality: brotli质量参数
+        max_request_size: 请求体解压后的最大字节数
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = MINIMUM_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+        max_request_size: int = MAX_REQUEST_SIZE,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.max_request_size = max_request_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        request_encoding = headers.get("content-encoding", "").strip().lower()
+        if request_encoding and request_encoding != "identity":
+            if request_encoding not in _decoded_encodings():
+                response = JSONResponse(
+                    {"detail": f"不支持的请求体编码: {request_encoding}"},
+                    status_code=415,
+                )
+                await response(scope, receive, send)
+                return
+            try:
+                body = await self._read_decompressed(receive, request_encoding)
+            except OverflowError as e:
+                await JSONResponse({"detail": str(e)}, 413)(scope, receive, send)
+                return
+            except _DECOMPRESS_ERRORS as e:
+                response = JSONResponse({"detail": f"请求体解压失败: {e}"}, 400)
+                await response(scope, receive, send)
+                return
+            scope, receive = self._replace_body(scope, receive, body)
+
+        encoding = choose_encoding(headers.get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        stripped_suffix = None
+        if_none_match = headers.get("if-none-match")
+        if if_none_match:
+            if_none_match, stripped_suffix = _strip_etag_suffixes(if_none_match)
+            scope = dict(scope)
+            mutable = MutableHeaders(scope=scope)
+            mutable["if-none-match"] = if_none_match
+
+        responder = _CompressionResponder(self, send, encoding, stripped_suffix)
+        await self.app(scope, receive, responder.send)
+
+    async def _read_decompressed(self, receive: Receive, encoding: str) -> bytes:
+        decompressor = _Decompressor(encoding, self.max_request_size)
+        parts = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            parts.append(decompressor.process(message.get("body", b"")))
+            more_body = message.get("more_body", False)
+        parts.append(decompressor.finish())
+        return b"".join(parts)
+
+    @staticmethod
+    def _replace_body(scope: Scope, receive: Receive, body: bytes):
+        """用解压后的请求体替换原请求体，并更新相关请求头"""
+        scope = dict(scope)
+        headers = MutableHeaders(scope=scope)
+        del headers["content-encoding"]
+        headers["content-length"] = str(len(body))
+        sent = False
+
+        async def replay() -> Message:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return scope, replay
+
+    def _encoder(self, encoding: str):
+        if encoding == "br":
+            return _BrotliEncoder(self.brotli_quality)
+        return _GzipEncoder(self.gzip_level)
+
+
+class _CompressionResponder:
+    """包装send，按需压缩响应体"""
+
+    def __init__(
+        self,
+        middleware: CompressionMiddleware,
+        send: Send,
+        encoding: str,
+        stripped_suffix: Optional[str],
+    ):
+        self.middleware = middleware
+        self._send = send
+        self.encoding = encoding
+        self.stripped_suffix = stripped_suffix
+        self.start_message: Optional[Message] = None
+        self.encoder = None
+        self.started = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+        if not self.started:
+            self.started = True
+            await self._start(message)
+            return
+        if self.encoder is not None:
+            more_body = message.get("more_body", False)
+            message["body"] = self.encoder.process(
+                message.get("body", b""), final=not more_body
+            )
+        await self._send(message)
+
+    async def _start(self, message: Message) -> None:
+        start = self.start_message
+        headers = MutableHeaders(raw=start["headers"])
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if start["status"] == 304 and self.stripped_suffix and "etag" in headers:
+            headers["etag"] = _etag_with_suffix(headers["etag"], self.stripped_suffix)
+
+        if (
+            "content-encoding" in headers
+            or start["status"] in (204, 304)
+            or not _is_compressible(headers.get("content-type", ""))
+            or (not more_body and len(body) < self.middleware.minimum_size)
+        ):
+            await self._send(start)
+            await self._send(message)
+            return
+
+        self.encoder = self.middleware._encoder(self.encoding)
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "etag" in headers:
+            headers["etag"] = _etag_with_suffix(headers["etag"], self.encoding)
+        message["body"] = self.encoder.process(body, final=not more_body)
+        if more_body:
+            del headers["content-length"]
+        else:
+            headers["content-length"] = str(len(message["body"]))
+        await self._send(start)
+        await self._send(message)
@@ -4,6 +4,11 @@
 """
 
 import math
+import operator
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+from . import integer, tracing
 
 
 def add(a: float, b: float) -> float:
@@ -83,3 +88,724 @@ def sqrt(x: float) -> float:
     if x < 0:
         raise ValueError(f"不能计算负数的平方根（当前输入值: {x}）")
     return math.sqrt(x)
+
+
+def power(a: float, b: float) -> float:
+    """
+    计算乘方。
+
+    Args:
+        a: 底数
+        b: 指数
+
+    Returns:
+        a的b次方
+
+    Raises:
+        ZeroDivisionError: 当底数为0且指数为负数时抛出
+        ValueError: 当底数为负数且指数不是整数时抛出
+        OverflowError: 当结果超出浮点数范围时抛出
+    """
+    if a == 0 and b < 0:
+        raise ZeroDivisionError(f"0不能做负数次幂（当前: 底数={a}, 指数={b}）")
+    if a < 0 and not float(b).is_integer():
+        raise ValueError(f"负数不能做非整数次幂（当前: 底数={a}, 指数={b}）")
+    try:
+        return math.pow(a, b)
+    except OverflowError:
+        raise OverflowError(f"计算结果超出范围（当前: 底数={a}, 指数={b}）")
+
+
+def log(x: float, base: Optional[float] = None) -> float:
+    """
+    计算对数。
+
+    Args:
+        x: 真数
+        base: 底数，为None时计算自然对数
+
+    Returns:
+        x的对数
+
+    Raises:
+        ValueError: 当x不是正数，或底数不是正数或等于1时抛出
+    """
+    if x <= 0:
+        raise ValueError(f"不能计算非正数的对数（当前输入值: {x}）")
+    if base is None:
+        return math.log(x)
+    if base <= 0 or base == 1:
+        raise ValueError(f"对数的底数必须是不等于1的正数（当前底数: {base}）")
+    return math.log(x, base)
+
+
+def exp(x: float) -> float:
+    """
+    计算e的x次方。
+
+    Args:
+        x: 指数
+
+    Returns:
+        e的x次方
+
+    Raises:
+        OverflowError: 当结果超出浮点数范围时抛出
+    """
+    try:
+        return math.exp(x)
+    except OverflowError:
+        raise OverflowError(f"计算结果超出范围（当前输入值: {x}）")
+
+
+def _check_finite(x: float) -> None:
+    if math.isinf(x) or math.isnan(x):
+        raise ValueError(f"三角函数的输入必须是有限值（当前输入值: {x}）")
+
+
+def sin(x: float) -> float:
+    """
+    计算正弦。
+
+    Args:
+        x: 弧度
+
+    Returns:
+        x的正弦值
+
+    Raises:
+        ValueError: 当x为无穷大或NaN时抛出
+    """
+    _check_finite(x)
+    return math.sin(x)
+
+
+def cos(x: float) -> float:
+    """
+    计算余弦。
+
+    Args:
+        x: 弧度
+
+    Returns:
+        x的余弦值
+
+    Raises:
+        ValueError: 当x为无穷大或NaN时抛出
+    """
+    _check_finite(x)
+    return math.cos(x)
+
+
+def tan(x: float) -> float:
+    """
+    计算正切。
+
+    Args:
+        x: 弧度
+
+    Returns:
+        x的正切值
+
+    Raises:
+        ValueError: 当x为无穷大或NaN时抛出
+    """
+    _check_finite(x)
+    return math.tan(x)
+
+
+def _as_integer(x: float, operation: str) -> int:
+    """把整数值的浮点数转换为int，非整数时抛出ValueError"""
+    if isinstance(x, int):
+        return x
+    if not float(x).is_integer():
+        raise ValueError(f"{operation}只接受整数（当前输入值: {x}）")
+    return int(x)
+
+
+def gcd(a: int, b: int) -> int:
+    """
+    计算最大公约数。
+
+    Args:
+        a: 第一个整数
+        b: 第二个整数
+
+    Returns:
+        两个数的最大公约数
+
+    Raises:
+        ValueError: 当输入不是整数时抛出
+    """
+    return math.gcd(_as_integer(a, "最大公约数"), _as_integer(b, "最大公约数"))
+
+
+# 阶乘结果能用浮点数表示的最大输入，更大的输入请使用任意精度整数运算
+MAX_FACTORIAL = 170
+_FACTORIALS = [math.factorial(n) for n in range(MAX_FACTORIAL + 1)]
+
+
+def factorial(n: int) -> int:
+    """
+    计算阶乘。
+
+    Args:
+        n: 非负整数
+
+    Returns:
+        n的阶乘
+
+    Raises:
+        ValueError: 当n不是非负整数时抛出
+        OverflowError: 当n大于MAX_FACTORIAL时抛出
+    """
+    n = _as_integer(n, "阶乘")
+    if n < 0:
+        raise ValueError(f"不能计算负数的阶乘（当前输入值: {n}）")
+    if n > MAX_FACTORIAL:
+        raise OverflowError(f"计算结果超出范围（当前输入值: {n}，最大支持: {MAX_FACTORIAL}）")
+    return _FACTORIALS[n]
+
+
+_MAX_INPUT_BITS = int(integer.MAX_INPUT_DIGITS / math.log10(2))
+
+
+def _check_digits(x: int, operation: str) -> None:
+    """与 calculator.integer 的大整数运算使用相同的输入位数上限"""
+    if x.bit_length() > _MAX_INPUT_BITS:
+        raise OverflowError(f"{operation}的输入过大（最多支持 {integer.MAX_INPUT_DIGITS} 位）")
+
+
+def modpow(base: int, exponent: int, modulus: int) -> int:
+    """
+    计算模幂 base ** exponent % modulus。
+
+    Args:
+        base: 底数
+        exponent: 非负整数指数
+        modulus: 模数
+
+    Returns:
+        模幂结果
+
+    Raises:
+        ValueError: 当输入不是整数或指数为负数时抛出
+        ZeroDivisionError: 当模数为0时抛出
+        OverflowError: 当输入超过 calculator.integer.MAX_INPUT_DIGITS 位时抛出
+    """
+    base = _as_integer(base, "模幂")
+    exponent = _as_integer(exponent, "模幂")
+    modulus = _as_integer(modulus, "模幂")
+    for value in (base, exponent, modulus):
+        _check_digits(value, "模幂")
+    if modulus == 0:
+        raise ZeroDivisionError(f"模数不能为0（当前: 底数={base}, 指数={exponent}, 模数={modulus}）")
+    if exponent < 0:
+        raise ValueError(f"指数不能为负数（当前: 底数={base}, 指数={exponent}, 模数={modulus}）")
+    return pow(base, exponent, modulus)
+
+
+def _check_lengths(a: Sequence[float], b: Sequence[float]) -> None:
+    if len(a) != len(b):
+        raise ValueError(f"操作数长度不一致（a: {len(a)}, b: {len(b)}）")
+
+
+def add_many(a: Sequence[float], b: Sequence[float]) -> List[float]:
+    """
+    逐元素执行加法运算。
+
+    Args:
+        a: 第一组数
+        b: 第二组数
+
+    Returns:
+        逐元素的和
+    """
+    _check_lengths(a, b)
+    return list(map(operator.add, a, b))
+
+
+def subtract_many(a: Sequence[float], b: Sequence[float]) -> List[float]:
+    """
+    逐元素执行减法运算。
+
+    Args:
+        a: 被减数
+        b: 减数
+
+    Returns:
+        逐元素的差
+    """
+    _check_lengths(a, b)
+    return list(map(operator.sub, a, b))
+
+
+def multiply_many(a: Sequence[float], b: Sequence[float]) -> List[float]:
+    """
+    逐元素执行乘法运算。
+
+    Args:
+        a: 第一组数
+        b: 第二组数
+
+    Returns:
+        逐元素的积
+    """
+    _check_lengths(a, b)
+    return list(map(operator.mul, a, b))
+
+
+def divide_many(a: Sequence[float], b: Sequence[float]) -> List[float]:
+    """
+    逐元素执行除法运算。
+
+    Args:
+        a: 被除数
+        b: 除数
+
+    Returns:
+        逐元素的商
+
+    Raises:
+        ZeroDivisionError: 任一除数为0时抛出，错误信息与divide一致
+    """
+    _check_lengths(a, b)
+    if 0 in b:
+        index = list(b).index(0)
+        divide(a[index], b[index])
+    return list(map(operator.truediv, a, b))
+
+
+def sqrt_many(values: Sequence[float]) -> List[float]:
+    """
+    逐元素计算平方根。
+
+    Args:
+        values: 要计算平方根的数
+
+    Returns:
+        逐元素的平方根
+
+    Raises:
+        ValueError: 任一输入为负数时抛出，错误信息与sqrt一致
+    """
+    if values and min(values) < 0:
+        sqrt(next(x for x in values if x < 0))
+    return list(map(math.sqrt, values))
+
+
+# 快速实现可能抛出的错误，出现时改用单次计算的实现定位出错的元素
+_DOMAIN_ERRORS = (ValueError, ZeroDivisionError, OverflowError, TypeError)
+
+
+def _map_checked(
+    fast: Callable[..., float], checked: Callable[..., float], *columns
+) -> List[float]:
+    """先用fast整体计算；出错时改用checked逐元素计算，抛出与单次计算一致的错误"""
+    try:
+        return list(map(fast, *columns))
+    except _DOMAIN_ERRORS:
+        return list(map(checked, *columns))
+
+
+def power_many(a: Sequence[float], b: Sequence[float]) -> List[float]:
+    """
+    逐元素计算乘方。
+
+    Args:
+        a: 底数
+        b: 指数
+
+    Returns:
+        逐元素的乘方结果
+
+    Raises:
+        与power相同，抛出第一个出错元素的错误
+    """
+    _check_lengths(a, b)
+    return _map_checked(math.pow, power, a, b)
+
+
+def log_many(values: Sequence[float]) -> List[float]:
+    """
+    逐元素计算自然对数。
+
+    Args:
+        values: 真数
+
+    Returns:
+        逐元素的自然对数
+
+    Raises:
+        ValueError: 任一输入不是正数时抛出，错误信息与log一致
+    """
+    if values and min(values) <= 0:
+        log(next(x for x in values if x <= 0))
+    return list(map(math.log, values))
+
+
+def exp_many(values: Sequence[float]) -> List[float]:
+    """
+    逐元素计算e的x次方。
+
+    Args:
+        values: 指数
+
+    Returns:
+        逐元素的计算结果
+
+    Raises:
+        OverflowError: 任一结果超出浮点数范围时抛出，错误信息与exp一致
+    """
+    return _map_checked(math.exp, exp, values)
+
+
+def _trig_many(
+    fast: Callable[[float], float], checked: Callable[[float], float], values
+) -> List[float]:
+    """三角函数的批量计算：math.sin等对nan返回nan而不报错，与单次计算一样拒绝"""
+    results = _map_checked(fast, checked, values)
+    # 有限输入的结果不会是nan，出现nan说明输入中有nan
+    if any(map(math.isnan, results)):
+        return list(map(checked, values))
+    return results
+
+
+def sin_many(values: Sequence[float]) -> List[float]:
+    """
+    逐元素计算正弦。
+
+    Args:
+        values: 弧度
+
+    Returns:
+        逐元素的正弦值
+
+    Raises:
+        ValueError: 任一输入为无穷大或NaN时抛出，错误信息与sin一致
+    """
+    return _trig_many(math.sin, sin, values)
+
+
+def cos_many(values: Sequence[float]) -> List[float]:
+    """
+    逐元素计算余弦。
+
+    Args:
+        values: 弧度
+
+    Returns:
+        逐元素的余弦值
+
+    Raises:
+        ValueError: 任一输入为无穷大或NaN时抛出，错误信息与cos一致
+    """
+    return _trig_many(math.cos, cos, values)
+
+
+def tan_many(values: Sequence[float]) -> List[float]:
+    """
+    逐元素计算正切。
+
+    Args:
+        values: 弧度
+
+    Returns:
+        逐元素的正切值
+
+    Raises:
+        ValueError: 任一输入为无穷大或NaN时抛出，错误信息与tan一致
+    """
+    return _trig_many(math.tan, tan, values)
+
+
+def gcd_many(a: Sequence[int], b: Sequence[int]) -> List[int]:
+    """
+    逐元素计算最大公约数。
+
+    Args:
+        a: 第一组整数
+        b: 第二组整数
+
+    Returns:
+        逐元素的最大公约数
+
+    Raises:
+        ValueError: 任一输入不是整数时抛出，错误信息与gcd一致
+    """
+    _check_lengths(a, b)
+    return _map_checked(math.gcd, gcd, a, b)
+
+
+def factorial_many(values: Sequence[int]) -> List[int]:
+    """
+    逐元素计算阶乘。
+
+    Args:
+        values: 非负整数
+
+    Returns:
+        逐元素的阶乘
+
+    Raises:
+        与factorial相同，抛出第一个出错元素的错误
+    """
+    if values and 0 <= min(values) and max(values) <= MAX_FACTORIAL:
+        try:
+            return list(map(_FACTORIALS.__getitem__, values))
+        except TypeError:
+            pass
+    return list(map(factorial, values))
+
+
+def modpow_many(
+    base: Sequence[int], exponent: Sequence[int], modulus: Sequence[int]
+) -> List[int]:
+    """
+    逐元素计算模幂。
+
+    Args:
+        base: 底数
+        exponent: 非负整数指数
+        modulus: 模数
+
+    Returns:
+        逐元素的模幂结果
+
+    Raises:
+        与modpow相同，抛出第一个出错元素的错误
+    """
+    _check_lengths(base, exponent)
+    _check_lengths(base, modulus)
+    # 内置pow接受负指数（求模逆元）和任意大的整数，因此先检查指数、模数和位数
+    if exponent and (
+        min(exponent) < 0
+        or 0 in modulus
+        or any(
+            isinstance(x, int) and x.bit_length() > _MAX_INPUT_BITS
+            for column in (base, exponent, modulus)
+            for x in column
+        )
+    ):
+        return list(map(modpow, base, exponent, modulus))
+    return _map_checked(pow, modpow, base, exponent, modulus)
+
+
+@dataclass
+class Operation:
+    """
+    运算注册信息。API路由、批量计算、Lambda快速路径、RPC和WebSocket接口
+    都从 OPERATIONS 生成，新增运算只需要在这里注册。
+
+    Attributes:
+        name: 运算名称，同时是API路由（/name）
+        label: 响应中的operation字段
+        description: 运算的中文名称，用于接口文档
+        params: 必需参数名，与REST请求体字段一致
+        scalar: 单次计算实现，参数顺序为params后接optional
+        vectorized: 向量化实现，参数为与params对应的各列；没有时为None
+        errors: 输入不合法时计算可能抛出的异常类型，API返回400
+        optional: 可选参数名，默认为None
+        integer: 参数和结果是否为整数
+        example: 示例参数，用于测试和性能测试
+    """
+
+    name: str
+    label: str
+    description: str
+    params: Tuple[str, ...]
+    scalar: Callable[..., Any]
+    vectorized: Optional[Callable[..., List[Any]]]
+    errors: Tuple[Type[Exception], ...]
+    optional: Tuple[str, ...] = ()
+    integer: bool = False
+    example: Tuple[float, ...] = ()
+
+    @property
+    def arity(self) -> int:
+        """必需参数个数"""
+        return len(self.params)
+
+
+_BINARY = ("a", "b")
+_UNARY = ("value",)
+
+OPERATIONS: Dict[str, Operation] = {
+    op.name: op
+    for op in (
+        Operation(
+            "add", "addition", "加法", _BINARY, add, add_many, (), example=(10.5, 5.2)
+        ),
+        Operation(
+            "subtract",
+            "subtraction",
+            "减法",
+            _BINARY,
+            subtract,
+            subtract_many,
+            (),
+            example=(10.5, 5.2),
+        ),
+        Operation(
+            "multiply",
+            "multiplication",
+            "乘法",
+            _BINARY,
+            multiply,
+            multiply_many,
+            (),
+            example=(10.5, 5.2),
+        ),
+        Operation(
+            "divide",
+            "division",
+            "除法",
+            _BINARY,
+            divide,
+            divide_many,
+            (ZeroDivisionError,),
+            example=(10.5, 5.2),
+        ),
+        Operation(
+            "sqrt",
+            "square_root",
+            "平方根",
+            _UNARY,
+            sqrt,
+            sqrt_many,
+            (ValueError,),
+            example=(16.0,),
+        ),
+        Operation(
+            "power",
+            "power",
+            "乘方",
+            _BINARY,
+            power,
+            power_many,
+            (ValueError, ZeroDivisionError, OverflowError),
+            example=(2.0, 10.0),
+        ),
+        Operation(
+            "log",
+            "logarithm",
+            "对数",
+            _UNARY,
+            log,
+            log_many,
+            (ValueError,),
+            optional=("base",),
+            example=(8.0, 2.0),
+        ),
+        Operation(
+            "exp",
+            "exponential",
+            "指数",
+            _UNARY,
+            exp,
+            exp_many,
+            (OverflowError,),
+            example=(1.0,),
+        ),
+        Operation(
+            "sin", "sine", "正弦", _UNARY, sin, sin_many, (ValueError,), example=(0.5,)
+        ),
+        Operation(
+            "cos", "cosine", "余弦", _UNARY, cos, cos_many, (ValueError,), example=(0.5,)
+        ),
+        Operation(
+            "tan",
+            "tangent",
+            "正切",
+            _UNARY,
+            tan,
+            tan_many,
+            (ValueError,),
+            example=(0.5,),
+        ),
+        Operation(
+            "gcd",
+            "gcd",
+            "最大公约数",
+            _BINARY,
+            gcd,
+            gcd_many,
+            (ValueError,),
+            integer=True,
+            example=(48, 18),
+        ),
+        Operation(
+            "factorial",
+            "factorial",
+            "阶乘",
+            _UNARY,
+            factorial,
+            factorial_many,
+            (ValueError, OverflowError),
+            integer=True,
+            example=(10,),
+        ),
+        Operation(
+            "modpow",
+            "modular_power",
+            "模幂",
+            ("base", "exponent", "modulus"),
+            modpow,
+            modpow_many,
+            (ValueError, ZeroDivisionError, OverflowError),
+            integer=True,
+            example=(4, 13, 497),
+        ),
+    )
+}
+
+# 以下运算表由 OPERATIONS 派生，只包含一到两个操作数的运算；
+# modpow需要三个操作数，请直接调用modpow_many
+
+# 只接受一个操作数的运算
+UNARY_OPERATIONS = frozenset(name for name, op in OPERATIONS.items() if op.arity == 1)
+
+# 运算名称到单次计算实现的映射，名称与API路由一致
+SCALAR_OPERATIONS: Dict[str, Callable[..., float]] = {
+    name: op.scalar for name, op in OPERATIONS.items() if op.arity <= 2
+}
+
+# 运算名称到向量化实现的映射
+BATCH_OPERATIONS: Dict[str, Callable[..., List[float]]] = {
+    name: op.vectorized
+    for name, op in OPERATIONS.items()
+    if op.arity <= 2 and op.vectorized is not None
+}
+
+
+def evaluate_many(
+    operation: str, a: Sequence[float], b: Optional[Sequence[float]] = None
+) -> List[float]:
+    """
+    按运算名称批量计算。
+
+    Args:
+        operation: 运算名称，见BATCH_OPERATIONS
+        a: 第一组操作数
+        b: 第二组操作数，单操作数运算时为None
+
+    Returns:
+        逐元素的计算结果
+
+    Raises:
+        ValueError: 运算名称不支持或参数个数不匹配时抛出
+    """
+    func = BATCH_OPERATIONS.get(operation)
+    if func is None:
+        raise ValueError(f"不支持的运算: {operation}")
+    if operation in UNARY_OPERATIONS:
+        if b is not None:
+            raise ValueError(f"运算 {operation} 只接受一个操作数")
+        args: Tuple[Sequence[float], ...] = (a,)
+    elif b is None:
+        raise ValueError(f"运算 {operation} 需要两个操作数")
+    else:
+        args = (a, b)
+    attributes = {"calculator.operation": operation, "calculator.count": len(a)}
+    with tracing.start_span("evaluate_many", attributes):
+        return func(*args)
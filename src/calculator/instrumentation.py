@@ -0,0 +1,106 @@
+"""
+ASGI和FastAPI的追踪埋点，追踪的实现见 calculator.tracing。
+
+TracingMiddleware 为每个HTTP请求创建server span，覆盖中间件和路由匹配；
+TracingRoute 为路由处理（请求参数解析和校验、接口函数、响应序列化）创建
+子span。未配置导出器时和预热请求都直接调用原来的处理函数。
+"""
+
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import tracing
+from .accesslog import resolve_route
+from .admission import WARMUP_SCOPE_KEY
+
+
+def _traceparent(scope: Scope) -> Optional[tracing.SpanContext]:
+    for name, value in scope["headers"]:
+        if name == b"traceparent":
+            return tracing.parse_traceparent(value.decode("latin-1"))
+    return None
+
+
+class TracingMiddleware:
+    """
+    为每个HTTP请求创建server span。
+
+    有当前span（Lambda中由 lambda_handler 创建）时作为它的子span，
+    否则从traceparent请求头延续上游的追踪。预热请求不追踪。
+
+    Args:
+        app: ASGI应用
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            not tracing.is_enabled()
+            or scope["type"] != "http"
+            or scope.get(WARMUP_SCOPE_KEY)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        span = tracing.start_span(
+            method,
+            {"http.method": method, "http.target": scope["path"]},
+            parent=tracing.current_context() or _traceparent(scope),
+            kind=tracing.SERVER,
+        )
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                span.set_attribute("http.status_code", status)
+                if status >= 500:
+                    span.set_status(tracing.ERROR)
+            await send(message)
+
+        with span:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # 路由匹配后才知道路由模板
+                route, _ = resolve_route(scope)
+                if route is not None:
+                    span.name = f"{method} {route}"
+                    span.set_attribute("http.route", route)
+
+
+class TracingRoute(APIRoute):
+    """为请求参数解析和校验、接口函数和响应序列化创建span的路由"""
+
+    def get_route_handler(self) -> Callable[[Request], Any]:
+        handler = super().get_route_handler()
+        name = f"route {self.path}"
+        attributes: Dict[str, Any] = {"http.route": self.path}
+
+        async def traced_handler(request: Request) -> Response:
+            if not tracing.is_enabled() or request.scope.get(WARMUP_SCOPE_KEY):
+                return await handler(request)
+            with tracing.start_span(name, attributes) as span:
+                # 客户端错误（4xx、参数校验失败）记录为事件，不把span标记为出错
+                try:
+                    return await handler(request)
+                except HTTPException as e:
+                    if e.status_code >= 500:
+                        raise
+                    span.set_attribute("http.status_code", e.status_code)
+                    client_error: Exception = e
+                except RequestValidationError as e:
+                    span.set_attribute("http.status_code", 422)
+                    client_error = e
+                span.record_exception(client_error)
+            raise client_error
+
+        return traced_handler
@@ -0,0 +1,270 @@
+"""
+任意精度整数运算模块。
+
+calculator.core 的运算基于浮点数，大整数会溢出或丢失精度。
+本模块的运算全部使用Python整数，结果精确；为了保护Lambda的内存和
+执行时间，计算前会估算结果位数，超过上限时直接拒绝。
+
+阶乘和组合数使用标准库 math.factorial / math.comb，二者在C中
+以二分乘积（binary splitting）实现，比Python层的实现更快；
+小输入的结果缓存在表中。
+"""
+
+import math
+from functools import lru_cache
+from typing import List
+
+# 结果的最大十进制位数
+MAX_RESULT_DIGITS = 100_000
+# 输入整数的最大十进制位数
+MAX_INPUT_DIGITS = 1_000
+# 结果缓存表覆盖的最大阶乘输入
+SMALL_FACTORIAL_LIMIT = 1_000
+# 小于该值的数直接查素数表
+SMALL_PRIME_LIMIT = 10_000
+
+# Miller–Rabin检验的底数：前13个素数，n < 3.3e24 时检验结果是确定的
+_WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+# 超过该位数（二进制）的整数分段转换为字符串
+_STR_CHUNK_BITS = 8_000
+_LOG10_2 = math.log10(2)
+# 超过该位数（十进制）的字符串分段解析为整数
+_PARSE_CHUNK_DIGITS = 2_000
+
+
+@lru_cache(maxsize=None)
+def _factorial_table() -> List[int]:
+    table = [1] * (SMALL_FACTORIAL_LIMIT + 1)
+    for n in range(2, SMALL_FACTORIAL_LIMIT + 1):
+        table[n] = table[n - 1] * n
+    return table
+
+
+@lru_cache(maxsize=None)
+def _small_primes() -> bytearray:
+    """埃拉托斯特尼筛，sieve[n] 为1表示n是素数"""
+    sieve = bytearray([1]) * SMALL_PRIME_LIMIT
+    sieve[0] = sieve[1] = 0
+    for p in range(2, math.isqrt(SMALL_PRIME_LIMIT - 1) + 1):
+        if sieve[p]:
+            sieve[p * p :: p] = bytes(len(range(p * p, SMALL_PRIME_LIMIT, p)))
+    return sieve
+
+
+def _check_digits(digits: float, max_digits: int) -> None:
+    if digits > max_digits:
+        raise OverflowError(f"计算结果过大（超过 {max_digits} 位）")
+
+
+def _factorial_digits(n: int) -> float:
+    """估算n!的十进制位数"""
+    if n.bit_length() > 64:
+        return math.inf
+    return math.lgamma(n + 1) / math.log(10)
+
+
+def _binomial_digits(n: int, k: int) -> float:
+    """估算C(n, k)的十进制位数（k <= n/2），n过大时使用下界 (n/k)^k"""
+    if k.bit_length() > 64:
+        return math.inf
+    if n.bit_length() < 1000:
+        log_result = math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+        return log_result / math.log(10)
+    return k * (math.log10(n) - math.log10(k))
+
+
+def _check_input(value: int, name: str) -> None:
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError(f"{name}必须是整数（当前输入值: {value!r}）")
+    if value.bit_length() * _LOG10_2 > MAX_INPUT_DIGITS:
+        raise OverflowError(f"{name}过大（最多支持 {MAX_INPUT_DIGITS} 位）")
+
+
+def factorial(n: int, max_digits: int = MAX_RESULT_DIGITS) -> int:
+    """
+    计算精确的阶乘。
+
+    Args:
+        n: 非负整数
+        max_digits: 结果的最大位数
+
+    Returns:
+        n的阶乘
+
+    Raises:
+        ValueError: 当n为负数时抛出
+        OverflowError: 当结果位数超过max_digits时抛出
+    """
+    _check_input(n, "阶乘的输入")
+    if n < 0:
+        raise ValueError(f"不能计算负数的阶乘（当前输入值: {n}）")
+    if n <= SMALL_FACTORIAL_LIMIT:
+        return _factorial_table()[n]
+    _check_digits(_factorial_digits(n), max_digits)
+    return math.factorial(n)
+
+
+def binomial(n: int, k: int, max_digits: int = MAX_RESULT_DIGITS) -> int:
+    """
+    计算组合数 C(n, k)。
+
+    Args:
+        n: 非负整数
+        k: 非负整数，大于n时结果为0
+        max_digits: 结果的最大位数
+
+    Returns:
+        从n个元素中取k个的组合数
+
+    Raises:
+        ValueError: 当n或k为负数时抛出
+        OverflowError: 当结果位数超过max_digits时抛出
+    """
+    _check_input(n, "组合数的n")
+    _check_input(k, "组合数的k")
+    if n < 0 or k < 0:
+        raise ValueError(f"组合数的参数不能为负数（当前: n={n}, k={k}）")
+    if k > n:
+        return 0
+    k = min(k, n - k)
+    if n <= SMALL_FACTORIAL_LIMIT:
+        table = _factorial_table()
+        return table[n] // (table[k] * table[n - k])
+    _check_digits(_binomial_digits(n, k), max_digits)
+    return math.comb(n, k)
+
+
+def pow_mod(base: int, exponent: int, modulus: int) -> int:
+    """
+    计算模幂 base ** exponent mod modulus。
+
+    指数为负数时计算模逆元的幂。
+
+    Args:
+        base: 底数
+        exponent: 指数
+        modulus: 模数
+
+    Returns:
+        模幂结果，取值范围与内置pow一致
+
+    Raises:
+        ZeroDivisionError: 当模数为0时抛出
+        ValueError: 当指数为负数且底数在该模数下不可逆时抛出
+    """
+    for value, name in ((base, "底数"), (exponent, "指数"), (modulus, "模数")):
+        _check_input(value, name)
+    if modulus == 0:
+        raise ZeroDivisionError("模数不能为0")
+    try:
+        return pow(base, exponent, modulus)
+    except ValueError:
+        raise ValueError(f"底数在模 {modulus} 下不可逆，不能使用负数指数")
+
+
+def is_prime(n: int) -> bool:
+    """
+    判断素数。
+
+    小于SMALL_PRIME_LIMIT的数查表；更大的数先用小素数试除，
+    再做Miller–Rabin检验。n小于3.3e24时结果是确定的，
+    更大的n为强概率素数判断，合数被误判的概率低于4^-13。
+
+    Args:
+        n: 整数
+
+    Returns:
+        n是否为素数
+    """
+    _check_input(n, "输入")
+    if n < SMALL_PRIME_LIMIT:
+        return n >= 2 and bool(_small_primes()[n])
+    for p in _WITNESSES:
+        if n % p == 0:
+            return False
+
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in _WITNESSES:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+@lru_cache(maxsize=64)
+def _pow10(exponent: int) -> int:
+    return 10**exponent
+
+
+def _to_decimal(value: int, width: int) -> str:
+    """value为非负数；width大于0时左侧补零到width位"""
+    if value.bit_length() <= _STR_CHUNK_BITS:
+        text = str(value)
+        return text.zfill(width) if width else text
+    half = int(value.bit_length() * _LOG10_2) // 2
+    high, low = divmod(value, _pow10(half))
+    return _to_decimal(high, width - half if width else 0) + _to_decimal(low, half)
+
+
+def _from_decimal(digits: str) -> int:
+    """digits为不带正负号的十进制数字"""
+    if len(digits) <= _PARSE_CHUNK_DIGITS:
+        return int(digits)
+    half = len(digits) // 2
+    return _from_decimal(digits[:-half]) * _pow10(half) + _from_decimal(digits[-half:])
+
+
+def to_decimal_string(value: int) -> str:
+    """
+    把整数转换为十进制字符串。
+
+    Python 3.11起 str() 默认拒绝转换超过4300位的整数，
+    这里分段转换，不受该限制，也不需要修改全局设置。
+
+    Args:
+        value: 整数
+
+    Returns:
+        十进制字符串
+    """
+    if value < 0:
+        return "-" + _to_decimal(-value, 0)
+    return _to_decimal(value, 0)
+
+
+def parse_integer(text: str, max_digits: int = MAX_INPUT_DIGITS) -> int:
+    """
+    把十进制字符串解析为整数。
+
+    与 to_decimal_string 一样分段解析，max_digits超过4300时也不受
+    解释器整数转换位数限制的影响。
+
+    Args:
+        text: 十进制字符串，可以带正负号
+        max_digits: 最大位数
+
+    Returns:
+        解析后的整数
+
+    Raises:
+        ValueError: 当字符串不是合法的整数时抛出
+        OverflowError: 当位数超过max_digits时抛出
+    """
+    text = text.strip()
+    digits = text.lstrip("+-")
+    if not digits.isdigit() or not digits.isascii() or len(text) - len(digits) > 1:
+        raise ValueError(f"无效的整数: {text[:50]}")
+    if len(digits) > max_digits:
+        raise OverflowError(f"整数过大（最多支持 {max_digits} 位）")
+    value = _from_decimal(digits)
+    return -value if text.startswith("-") else value
@@ -0,0 +1,410 @@
+"""
+异步批量计算任务。
+
+超大批量计算无法在API Gateway的29秒超时内完成：提交任务后立即返回
+任务ID，由后台工作线程按块计算，每完成一块就更新进度并追加结果，
+客户端轮询任务状态并分页读取已经完成的结果。
+
+任务ID通过JobQueue交给工作线程，任务状态和结果保存在JobStore中。默认的
+LocalJobQueue和LocalJobStore都在进程内，适合常驻进程（容器部署）。
+
+Lambda返回响应后执行环境会被冻结，后台线程无法继续计算，之后的轮询也可能
+到达其他实例，因此Lambda部署需要替换为托管的实现：JobQueue使用托管队列
+（如SQS），JobStore使用共享存储（如DynamoDB）。处理API请求的函数使用
+JobManager(workers=0, ...) 只提交任务，由队列触发的函数对每条消息调用
+JobManager.run(job_id) 执行计算。
+"""
+
+import abc
+import math
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from . import tracing
+from .core import BATCH_OPERATIONS, evaluate_many
+
+# 每块计算的元素数量，决定进度和结果的更新粒度
+JOB_CHUNK_SIZE = 10_000
+# 单个任务的最大元素数量
+MAX_JOB_ELEMENTS = 5_000_000
+# 分页读取结果时每页的最大元素数量
+MAX_PAGE_SIZE = 10_000
+# 已结束任务的保留时间（秒）
+JOB_TTL = 3600.0
+# 同时保存的最大任务数量
+MAX_JOBS = 1000
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobLimitError(RuntimeError):
+    """保存的任务数量达到上限"""
+
+
+@dataclass
+class Job:
+    """批量计算任务"""
+
+    id: str
+    operation: str
+    total: int
+    a: Optional[Sequence[float]] = field(default=None, repr=False)
+    b: Optional[Sequence[float]] = field(default=None, repr=False)
+    status: str = QUEUED
+    results: List[float] = field(default_factory=list, repr=False)
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+    # 提交任务的请求的span标识，任务在工作线程中执行时延续同一追踪
+    trace_context: Optional[tracing.SpanContext] = field(default=None, repr=False)
+
+    @property
+    def completed(self) -> int:
+        """已完成的元素数量"""
+        return len(self.results)
+
+    def summary(self) -> Dict[str, Any]:
+        """任务状态和进度"""
+        return {
+            "job_id": self.id,
+            "operation": self.operation,
+            "status": self.status,
+            "total": self.total,
+            "completed": self.completed,
+            "progress": self.completed / self.total if self.total else 1.0,
+            "error": self.error,
+        }
+
+    def page(self, offset: int, limit: int) -> Dict[str, Any]:
+        """
+        读取一页已完成的结果。
+
+        Returns:
+            包含结果和下一页起始位置的字典；没有更多结果时next_offset为None，
+            任务仍在运行且该页还没有结果时next_offset等于offset
+        """
+        results = self.results[offset : offset + limit]
+        end = offset + len(results)
+        running = self.status in (QUEUED, RUNNING)
+        more = end < self.completed or (running and end < self.total)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "offset": offset,
+            "total": self.total,
+            "completed": self.completed,
+            "results": results,
+            "next_offset": end if more else None,
+        }
+
+
+class JobQueue(abc.ABC):
+    """任务队列接口"""
+
+    @abc.abstractmethod
+    def put(self, job_id: str) -> None:
+        """加入一个待执行的任务"""
+
+    @abc.abstractmethod
+    def get(self, timeout: Optional[float] = None) -> Optional[str]:
+        """取出一个任务ID，超时返回None"""
+
+
+class LocalJobQueue(JobQueue):
+    """进程内任务队列"""
+
+    def __init__(self):
+        self._queue: "queue.Queue[str]" = queue.Queue()
+
+    def put(self, job_id: str) -> None:
+        self._queue.put_nowait(job_id)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[str]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class JobStore(abc.ABC):
+    """
+    任务状态和结果的存储接口。
+
+    实现可以在多个进程或实例之间共享：get 返回的Job可以是存储内容的副本，
+    JobManager只通过本接口修改任务。
+    """
+
+    @abc.abstractmethod
+    def add(self, job: Job) -> None:
+        """
+        保存新提交的任务。
+
+        Raises:
+            JobLimitError: 保存的任务数量达到上限时抛出
+        """
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        """按ID查找任务，不存在或已过期时返回None"""
+
+    @abc.abstractmethod
+    def claim(self, job_id: str) -> Optional[Job]:
+        """
+        把排队中的任务标记为运行中并返回（包含输入）。
+
+        多个实例同时领取同一任务时只有一个成功。
+
+        Returns:
+            领取的任务；任务不存在或已经开始时返回None
+        """
+
+    @abc.abstractmethod
+    def append_results(self, job_id: str, results: List[Any]) -> None:
+        """追加一块已完成的结果"""
+
+    @abc.abstractmethod
+    def finish(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        """记录任务结束（SUCCEEDED或FAILED），不再需要的输入可以删除"""
+
+    @abc.abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """各状态的任务数量"""
+
+
+class LocalJobStore(JobStore):
+    """
+    进程内任务存储。
+
+    Args:
+        max_jobs: 同时保存的最大任务数量
+        ttl: 已结束任务的保留时间（秒）
+    """
+
+    def __init__(self, max_jobs: int = MAX_JOBS, ttl: float = JOB_TTL):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def add(self, job: Job) -> None:
+        with self._lock:
+            self._prune(time.time())
+            if len(self._jobs) >= self.max_jobs:
+                raise JobLimitError("任务数量已达上限，请稍后重试")
+            self._jobs[job.id] = job
+
+    def _prune(self, now: float) -> None:
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def claim(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return None
+            job.status = RUNNING
+            return job
+
+    def append_results(self, job_id: str, results: List[Any]) -> None:
+        self._jobs[job_id].results.extend(results)
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        job = self._jobs[job_id]
+        job.status = status
+        job.error = error
+        # 结束后不再需要输入，尽早释放内存
+        job.a = job.b = None
+        job.finished_at = time.time()
+        job.done.set()
+
+    def counts(self) -> Dict[str, int]:
+        counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        for job in list(self._jobs.values()):
+            counts[job.status] += 1
+        return counts
+
+
+def _validate(operation: str, a: Sequence[float], b: Optional[Sequence[float]]):
+    """提交时检查运算和操作数，避免任务排队后才失败"""
+    if operation not in BATCH_OPERATIONS:
+        raise ValueError(f"不支持的运算: {operation}")
+    # 用空输入检查操作数个数
+    evaluate_many(operation, [], None if b is None else [])
+    if b is not None and len(a) != len(b):
+        raise ValueError(f"操作数长度不一致（a: {len(a)}, b: {len(b)}）")
+    if len(a) > MAX_JOB_ELEMENTS:
+        raise ValueError(f"任务过大（最多支持 {MAX_JOB_ELEMENTS} 个元素）")
+
+
+def _check_finite(results: List[Any], start: int) -> List[Any]:
+    """检查一块结果中没有inf或nan，它们无法用JSON返回"""
+    for index, value in enumerate(results, start):
+        if isinstance(value, float) and not math.isfinite(value):
+            raise ValueError(f"计算结果超出范围（下标 {index} 的结果: {value}）")
+    return results
+
+
+class JobManager:
+    """
+    管理批量计算任务和后台工作线程。
+
+    工作线程在第一次提交任务时启动。计算在线程中执行，
+    不阻塞事件循环。
+
+    Args:
+        workers: 工作线程数量，为0时只提交任务，由队列的消费者调用 run 执行
+        job_queue: 任务队列，默认为进程内队列
+        chunk_size: 每块计算的元素数量
+        max_jobs: 同时保存的最大任务数量（默认的进程内存储）
+        ttl: 已结束任务的保留时间（秒，默认的进程内存储）
+        job_store: 任务存储，默认为进程内存储
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        job_queue: Optional[JobQueue] = None,
+        chunk_size: int = JOB_CHUNK_SIZE,
+        max_jobs: int = MAX_JOBS,
+        ttl: float = JOB_TTL,
+        job_store: Optional[JobStore] = None,
+    ):
+        self.workers = workers
+        self.queue = job_queue or LocalJobQueue()
+        self.store = job_store or LocalJobStore(max_jobs, ttl)
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+
+    def submit(
+        self, operation: str, a: Sequence[float], b: Optional[Sequence[float]] = None
+    ) -> Job:
+        """
+        提交批量计算任务。
+
+        Args:
+            operation: 运算名称，见 calculator.core.BATCH_OPERATIONS
+            a: 第一组操作数
+            b: 第二组操作数，单操作数运算时为None
+
+        Returns:
+            新建的任务
+
+        Raises:
+            ValueError: 运算不支持、操作数不匹配或任务过大时抛出
+            JobLimitError: 保存的任务数量达到上限时抛出
+        """
+        _validate(operation, a, b)
+        job = Job(
+            id=uuid.uuid4().hex,
+            operation=operation,
+            total=len(a),
+            a=a,
+            b=b,
+            trace_context=tracing.current_context(),
+        )
+        self.store.add(job)
+        self.start()
+        self.queue.put(job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """按ID查找任务，不存在或已过期时返回None"""
+        return self.store.get(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> bool:
+        """等待任务结束，返回任务是否已经结束"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return False
+            if job.status in (SUCCEEDED, FAILED):
+                return True
+            remaining = 0.05 if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # 进程内存储的任务结束时立即唤醒；共享存储返回的副本只能轮询
+            job.done.wait(min(remaining, 0.05))
+
+    def start(self) -> None:
+        """启动工作线程（已启动时不重复启动）"""
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            self._stopping.clear()
+            for _ in range(self.workers - len(self._threads)):
+                thread = threading.Thread(
+                    target=self._work, name="calculator-job-worker", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """通知工作线程在当前任务完成后退出"""
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            job_id = self.queue.get(timeout=0.5)
+            if job_id is not None:
+                self.run(job_id)
+
+    def run(self, job_id: str) -> Optional[Job]:
+        """
+        领取任务并在当前线程中按块执行。
+
+        托管队列可能重复投递，已开始或不存在的任务直接跳过。
+
+        Returns:
+            执行的任务；跳过时返回None
+        """
+        job = self.store.claim(job_id)
+        if job is None:
+            return None
+        a, b = job.a, job.b
+        start = end = 0
+        span = tracing.start_span(
+            "job",
+            {"calculator.job_id": job.id, "calculator.operation": job.operation},
+            parent=job.trace_context,
+        )
+        status, error = FAILED, "任务被中断"
+        try:
+            with span:
+                for start in range(0, job.total, self.chunk_size):
+                    end = min(start + self.chunk_size, job.total)
+                    results = evaluate_many(
+                        job.operation, a[start:end], None if b is None else b[start:end]
+                    )
+                    self.store.append_results(job.id, _check_finite(results, start))
+            status, error = SUCCEEDED, None
+        except Exception as e:
+            status = FAILED
+            error = f"下标 {start} 到 {end - 1} 之间的元素计算失败: {e}"
+        finally:
+            self.store.finish(job.id, status, error)
+        return job
+
+    def snapshot(self) -> Dict[str, int]:
+        """各状态的任务数量，供 /metrics 接口使用"""
+        return self.store.counts()
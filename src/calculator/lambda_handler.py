@@ -1,18 +1,153 @@
 """
 AWS Lambda处理函数模块。
+
+标量运算请求（POST /<运算>，JSON请求体只含数值参数）走快速路径：按
+calculator.core.OPERATIONS 查表后直接计算，不经过Mangum和FastAPI，
+响应与API一致。其他请求，以及快速路径无法确定结果的请求（参数类型不符、
+多余字段、非JSON的Content-Type、压缩的请求体等）都交给Mangum处理。
+
+快速路径不经过应用的中间件：不执行按客户端限流和准入控制，也不记录访问日志，
+因此默认关闭，只适合由API Gateway负责限流、不需要应用访问日志的部署。
+设置环境变量 CALCULATOR_LAMBDA_FAST_PATH=1 开启。
+
+预热事件（{"warmup": true}，或serverless-plugin-warmup发送的事件）不经过API，
+直接执行 calculator.warmup 的预热程序并返回预热报告。
+
+经过Mangum的请求由 calculator.accesslog 记录访问日志，每次调用结束时写出。
+配置了追踪导出器时（见 calculator.tracing），每次调用创建 lambda_handler span，
+经过Mangum的请求再创建 mangum span。
 """
 
+import base64
 import json
-from typing import Dict, Any
+import os
+from typing import Dict, Any, Optional, Tuple
 
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
+from . import accesslog, lifecycle, tracing, warmup
 from .api import handler
+from .core import OPERATIONS
 
 # 配置日志
 logger = Logger()
 
+# 导入时完成全部初始化阶段（包括预热，预热失败只记录警告），支持快照的运行时在此之后生成快照
+lifecycle.initialize()
+
+FAST_PATH_ENABLED = os.environ.get("CALCULATOR_LAMBDA_FAST_PATH", "0") == "1"
+
+# 本执行环境的第一次调用
+_cold_start = True
+
+
+def _http_request(event: Dict[str, Any]) -> Tuple[Optional[str], str]:
+    """取出API Gateway事件（REST API或HTTP API格式）的请求方法和路径"""
+    if "httpMethod" in event:
+        return event["httpMethod"], event.get("path") or ""
+    http = event.get("requestContext", {}).get("http", {})
+    return http.get("method"), event.get("rawPath") or http.get("path") or ""
+
+
+def _header(event: Dict[str, Any], name: str) -> Optional[str]:
+    """取出请求头（REST API格式的请求头名称大小写不固定）"""
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _is_json(content_type: Optional[str]) -> bool:
+    """与FastAPI一致：没有Content-Type，或为application/json、application/*+json"""
+    if not content_type:
+        return True
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    maintype, _, subtype = media_type.partition("/")
+    return maintype == "application" and (
+        subtype == "json" or subtype.endswith("+json")
+    )
+
+
+def _response(status: int, body: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "statusCode": status,
+        "headers": {"content-type": "application/json"},
+        "body": json.dumps(
+            body, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ),
+        "isBase64Encoded": False,
+    }
+
+
+def fast_path(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    直接计算标量运算请求。
+
+    Args:
+        event: API Gateway事件
+
+    Returns:
+        API响应；请求不适合快速路径时返回None
+    """
+    method, path = _http_request(event)
+    op = OPERATIONS.get(path[1:]) if path.startswith("/") else None
+    if method != "POST" or op is None:
+        return None
+    if not _is_json(_header(event, "content-type")) or _header(
+        event, "content-encoding"
+    ):
+        return None
+    body = event.get("body") or ""
+    try:
+        if event.get("isBase64Encoded"):
+            body = base64.b64decode(body)
+        values = json.loads(body)
+    except ValueError:
+        return None
+    names = op.params + op.optional
+    # 缺少参数或有多余字段时交给API校验
+    if not isinstance(values, dict) or not set(op.params) <= set(values) <= set(names):
+        return None
+    args = []
+    for name in names:
+        value = values.get(name)
+        if value is None and name in op.optional:
+            args.append(None)
+        elif type(value) is int or (type(value) is float and not op.integer):
+            args.append(value if op.integer else float(value))
+        else:
+            return None
+    try:
+        result = op.scalar(*args)
+    except op.errors as e:
+        return _response(400, {"detail": str(e)})
+    try:
+        return _response(200, {"result": result, "operation": op.label})
+    except ValueError:
+        return None
+
+
+def _invocation_span(event: Dict[str, Any], context: LambdaContext) -> Any:
+    """Lambda调用的span，从请求头的traceparent延续上游（API Gateway或调用方）的追踪"""
+    global _cold_start
+    if not tracing.is_enabled():
+        return tracing.NOOP_SPAN
+    method, path = _http_request(event)
+    attributes = {
+        "faas.invocation_id": getattr(context, "aws_request_id", None),
+        "faas.coldstart": _cold_start,
+        "http.method": method,
+        "http.target": path,
+    }
+    _cold_start = False
+    return tracing.start_span(
+        "lambda_handler",
+        attributes,
+        parent=tracing.extract(event.get("headers")),
+        kind=tracing.SERVER,
+    )
+
 
 @logger.inject_lambda_context
 def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> Dict[str, Any]:
@@ -26,9 +161,19 @@ def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> Dict[str, A
     Returns:
         API响应
     """
+    if warmup.is_warmup_event(event):
+        report = warmup.run_warm_up()
+        logger.info("预热完成", extra={"warmup": report})
+        return report
     try:
-        # 使用Mangum处理API Gateway事件
-        response = handler(event, context)
+        with _invocation_span(event, context) as span:
+            response = fast_path(event) if FAST_PATH_ENABLED else None
+            span.set_attribute("calculator.fast_path", response is not None)
+            if response is None:
+                # 使用Mangum处理API Gateway事件
+                with tracing.start_span("mangum"):
+                    response = handler(event, context)
+            span.set_attribute("http.status_code", response["statusCode"])
         return response
     except Exception as e:
         logger.error("处理请求时发生错误: %s", str(e))
@@ -40,3 +185,6 @@ def lambda_handler(event: Dict[str, Any], context: LambdaContext) -> Dict[str, A
                 "Access-Control-Allow-Origin": "*",
             },
         }
+    finally:
+        # 调用结束后执行环境可能被冻结，访问日志不能留在队列里
+        accesslog.writer.flush()
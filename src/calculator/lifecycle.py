@@ -0,0 +1,335 @@
+"""
+初始化阶段与快照钩子。
+
+Lambda冷启动的大部分时间花在导入依赖和构建 calculator.api 的应用上，
+第一次请求还要承担延迟初始化的开销（中间件栈、异步后端、OpenAPI文档等）。
+initialize() 把初始化拆成三个阶段并记录耗时：
+
+1. import：导入FastAPI、Pydantic、Mangum等依赖
+2. build：导入 calculator.api，注册路由、中间件并生成请求模型
+3. warm：构建中间件栈，用预热程序（calculator.warmup）把每个路由请求一遍，
+   并通过Mangum处理一次 /health 请求
+
+在支持快照恢复的运行时（如Lambda SnapStart）中，快照在初始化完成后生成，
+恢复出的实例直接从预热完成的状态开始处理请求。register_before_snapshot /
+register_after_restore 注册快照前和恢复后执行的钩子；运行时提供
+snapshot_restore_py 时自动向运行时注册。
+
+本地模拟恢复并测量第一次请求的延迟：
+
+    PYTHONPATH=src python -m calculator.lifecycle --runs 5
+
+模拟方式是在初始化完成的进程中fork子进程（相当于从同一快照恢复），
+与每次启动新进程、不预热的冷启动对比。
+"""
+
+import argparse
+import gc
+import importlib
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("import", "build", "warm")
+
+# 导入阶段预先导入的依赖，包括第一次请求时才会导入的异步后端
+DEPENDENCIES = (
+    "fastapi",
+    "fastapi.routing",
+    "starlette.middleware",
+    "pydantic",
+    "mangum",
+    "anyio._backends._asyncio",
+)
+
+_before_snapshot: List[Callable[[], None]] = []
+_after_restore: List[Callable[[], None]] = []
+_timings: Dict[str, float] = {}
+
+
+def register_before_snapshot(func: Callable[[], None]) -> Callable[[], None]:
+    """注册快照前执行的钩子，可以作为装饰器使用"""
+    _before_snapshot.append(func)
+    return func
+
+
+def register_after_restore(func: Callable[[], None]) -> Callable[[], None]:
+    """注册恢复后执行的钩子，可以作为装饰器使用"""
+    _after_restore.append(func)
+    return func
+
+
+def before_snapshot() -> None:
+    """按注册顺序执行快照前的钩子"""
+    for func in _before_snapshot:
+        func()
+
+
+def after_restore() -> None:
+    """按注册顺序执行恢复后的钩子"""
+    for func in _after_restore:
+        func()
+
+
+@register_before_snapshot
+def _freeze_heap() -> None:
+    # 初始化产生的对象在进程生命周期内一直存在，移出GC跟踪的分代后，
+    # 恢复后的垃圾回收不再扫描它们，fork出的进程也不会因此复制内存页
+    gc.collect()
+    gc.freeze()
+
+
+@register_after_restore
+def _reseed_random() -> None:
+    # 同一快照恢复出的实例共享随机数生成器的状态
+    random.seed()
+
+
+def import_dependencies() -> None:
+    """导入阶段：导入第三方依赖"""
+    for name in DEPENDENCIES:
+        importlib.import_module(name)
+
+
+def build_app() -> Any:
+    """构建阶段：导入 calculator.api 并返回应用"""
+    from . import api
+
+    return api.app
+
+
+def warm(app: Any) -> None:
+    """
+    预热阶段：提前完成第一次请求时才会执行的初始化。
+
+    预热请求不计入运行指标，也不追踪，见 calculator.warmup。
+
+    Args:
+        app: calculator.api 中的应用
+    """
+    from . import api, tracing, warmup
+
+    if app.middleware_stack is None:
+        app.middleware_stack = app.build_middleware_stack()
+    report = warmup.run_warm_up(app)
+    if report["failed"]:
+        raise RuntimeError(f"预热请求失败: {', '.join(report['failed'])}")
+    # 经过Mangum的预热请求无法带上预热标记，暂时关闭追踪
+    exporter = tracing.set_exporter(None)
+    try:
+        response = api.handler(request_event("GET", "/health"), None)
+    finally:
+        tracing.set_exporter(exporter)
+    if response["statusCode"] != 200:
+        raise RuntimeError(f"预热请求失败: {response['statusCode']}")
+
+
+def initialize() -> Dict[str, float]:
+    """
+    按阶段完成初始化（已完成时直接返回），并在运行时支持快照时注册钩子。
+
+    预热失败时只记录警告，不抛出异常（与 calculator.server 启动时的预热一致）。
+
+    Returns:
+        各阶段耗时（毫秒）
+    """
+    if _timings:
+        return dict(_timings)
+    start = time.perf_counter()
+    import_dependencies()
+    imported = time.perf_counter()
+    app = build_app()
+    built = time.perf_counter()
+    try:
+        warm(app)
+    except Exception:
+        # 预热只是提前完成初始化，失败时照常处理请求，不让执行环境初始化失败
+        logger.warning("预热失败，跳过预热", exc_info=True)
+    warmed = time.perf_counter()
+    _timings.update(
+        {
+            "import": (imported - start) * 1000,
+            "build": (built - imported) * 1000,
+            "warm": (warmed - built) * 1000,
+        }
+    )
+    _register_runtime_hooks()
+    return dict(_timings)
+
+
+def _register_runtime_hooks() -> None:
+    try:
+        from snapshot_restore_py import (  # type: ignore
+            register_after_restore as runtime_after_restore,
+            register_before_snapshot as runtime_before_snapshot,
+        )
+    except ImportError:
+        return
+    runtime_before_snapshot(before_snapshot)
+    runtime_after_restore(after_restore)
+
+
+def request_event(
+    method: str, path: str, query: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """构造API Gateway（REST API格式）的请求事件"""
+    return {
+        "resource": path,
+        "path": path,
+        "httpMethod": method,
+        "headers": {},
+        "multiValueHeaders": {},
+        "queryStringParameters": query,
+        "multiValueQueryStringParameters": (
+            {key: [value] for key, value in query.items()} if query else None
+        ),
+        "requestContext": {
+            "resourcePath": path,
+            "httpMethod": method,
+            "path": path,
+            "identity": {"sourceIp": "127.0.0.1"},
+        },
+        "body": None,
+        "isBase64Encoded": False,
+    }
+
+
+# 模拟恢复时测量的请求：经过完整的中间件和路由处理
+MEASURED_EVENT = request_event("GET", "/sqrt", {"value": "16"})
+
+
+def _timed_request(event: Dict[str, Any]) -> float:
+    from . import api
+
+    start = time.perf_counter()
+    response = api.handler(event, None)
+    elapsed = (time.perf_counter() - start) * 1000
+    if response["statusCode"] != 200:
+        raise RuntimeError(f"请求失败: {response['statusCode']}")
+    return elapsed
+
+
+def _restored_first_request(event: Dict[str, Any]) -> Dict[str, float]:
+    """
+    fork一个子进程模拟从快照恢复，返回恢复钩子和第一次请求的耗时（毫秒）。
+
+    fork出的子进程第一次写入继承的内存页时要复制页面，第一次请求因此
+    比稳定状态慢；从快照恢复时按需加载内存页，也有类似的开销。
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        status = 1
+        try:
+            start = time.perf_counter()
+            after_restore()
+            restore = (time.perf_counter() - start) * 1000
+            first_request = _timed_request(event)
+            result = {"restore": restore, "first_request": first_request}
+            os.write(write_fd, json.dumps(result).encode())
+            status = 0
+        finally:
+            os._exit(status)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        data = f.read()
+    _, status = os.waitpid(pid, 0)
+    if status != 0:
+        raise RuntimeError("模拟恢复的子进程执行失败")
+    return json.loads(data)
+
+
+def _cold_first_request() -> Dict[str, float]:
+    """启动新进程，不预热，返回初始化和第一次请求的耗时（毫秒）"""
+    result = subprocess.run(
+        [sys.executable, "-m", "calculator.lifecycle", "--cold"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def _median(runs: List[Dict[str, float]], key: str) -> float:
+    return statistics.median(run[key] for run in runs)
+
+
+def simulate_restore(runs: int = 5) -> Dict[str, Any]:
+    """
+    对比冷启动和从快照恢复后第一次请求的延迟。
+
+    Args:
+        runs: 冷启动和模拟恢复各执行的次数
+
+    Returns:
+        初始化各阶段耗时，以及冷启动和模拟恢复各项耗时的中位数（毫秒）：
+        cold_init/restore 为处理请求前的准备耗时，*_first_request 为第一次
+        请求的耗时，*_total 为两者之和
+    """
+    if not hasattr(os, "fork"):
+        raise RuntimeError("模拟恢复需要支持fork的平台")
+    cold = [_cold_first_request() for _ in range(runs)]
+    phases = initialize()
+    before_snapshot()
+    restored = [_restored_first_request(MEASURED_EVENT) for _ in range(runs)]
+    report = {
+        "phases": phases,
+        "cold_init": _median(cold, "init"),
+        "cold_first_request": _median(cold, "first_request"),
+        "restore": _median(restored, "restore"),
+        "restored_first_request": _median(restored, "first_request"),
+        "steady_state": _timed_request(MEASURED_EVENT),
+    }
+    report["cold_total"] = report["cold_init"] + report["cold_first_request"]
+    report["restored_total"] = report["restore"] + report["restored_first_request"]
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="模拟快照恢复并测量第一次请求的延迟")
+    parser.add_argument("--runs", type=int, default=5, help="冷启动和模拟恢复各执行的次数")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出结果")
+    parser.add_argument("--cold", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.cold:
+        # 冷启动子进程：导入并构建应用，不预热，直接处理第一次请求
+        start = time.perf_counter()
+        import_dependencies()
+        build_app()
+        init = (time.perf_counter() - start) * 1000
+        first_request = _timed_request(MEASURED_EVENT)
+        print(json.dumps({"init": init, "first_request": first_request}))
+        return 0
+
+    report = simulate_restore(args.runs)
+    if args.json:
+        print(json.dumps(report))
+        return 0
+    phases = report["phases"]
+    print("初始化阶段耗时: " + ", ".join(f"{p} {phases[p]:.1f} ms" for p in PHASES))
+    print(
+        f"冷启动: 初始化（不预热） {report['cold_init']:.1f} ms + "
+        f"第一次请求 {report['cold_first_request']:.2f} ms = "
+        f"{report['cold_total']:.1f} ms"
+    )
+    print(
+        f"模拟恢复: 恢复钩子 {report['restore']:.2f} ms + "
+        f"第一次请求 {report['restored_first_request']:.2f} ms = "
+        f"{report['restored_total']:.1f} ms"
+    )
+    print(f"稳定状态的请求: {report['steady_state']:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
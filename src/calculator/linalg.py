@@ -0,0 +1,263 @@
+"""
+矩阵与线性代数运算模块。
+
+安装了NumPy时使用NumPy计算，否则使用纯Python实现。矩阵用
+行列表（List[List[float]]）表示，两种实现的输入输出格式一致。
+
+矩阵也可以用紧凑的二进制格式传输：每个矩阵以两个小端uint32
+（行数、列数）开头，后面按行排列 rows*cols 个小端float64，
+多个矩阵依次拼接。
+"""
+
+import math
+import struct
+import sys
+from array import array
+from operator import mul
+from typing import List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - 取决于运行环境
+    np = None
+
+Matrix = List[List[float]]
+Vector = List[float]
+
+# 单个矩阵的最大元素数量，保护Lambda的内存和执行时间
+MAX_ELEMENTS = 250_000
+# 主元绝对值低于该相对阈值时视为奇异矩阵
+SINGULAR_TOLERANCE = 1e-12
+
+_HEADER = struct.Struct("<II")
+
+# Python 3.12+ 提供C实现的点积
+_sumprod = getattr(math, "sumprod", None)
+
+
+def _dot(row: Sequence[float], column: Sequence[float]) -> float:
+    if _sumprod is not None:
+        return _sumprod(row, column)
+    return sum(map(mul, row, column))
+
+
+def has_numpy() -> bool:
+    """是否使用NumPy实现"""
+    return np is not None
+
+
+def shape(matrix: Sequence[Sequence[float]], name: str = "a") -> Tuple[int, int]:
+    """
+    检查矩阵格式并返回行列数。
+
+    Raises:
+        ValueError: 矩阵为空、各行长度不一致或元素过多时抛出
+    """
+    if not matrix or not matrix[0]:
+        raise ValueError(f"矩阵 {name} 不能为空")
+    rows, cols = len(matrix), len(matrix[0])
+    if any(len(row) != cols for row in matrix):
+        raise ValueError(f"矩阵 {name} 的每一行长度必须相同")
+    if rows * cols > MAX_ELEMENTS:
+        raise ValueError(f"矩阵 {name} 过大（最多支持 {MAX_ELEMENTS} 个元素）")
+    return rows, cols
+
+
+def _check_square(matrix: Matrix, operation: str) -> int:
+    rows, cols = shape(matrix)
+    if rows != cols:
+        raise ValueError(f"只能计算方阵的{operation}（当前: {rows}x{cols}）")
+    return rows
+
+
+def _singular_error() -> ValueError:
+    return ValueError("系数矩阵是奇异矩阵，方程组没有唯一解")
+
+
+def matmul(a: Matrix, b: Matrix) -> Matrix:
+    """
+    矩阵乘法。
+
+    Args:
+        a: m x n 矩阵
+        b: n x p 矩阵
+
+    Returns:
+        m x p 矩阵
+
+    Raises:
+        ValueError: 矩阵格式错误、维度不匹配或结果元素过多时抛出
+    """
+    a_rows, a_cols = shape(a, "a")
+    b_rows, b_cols = shape(b, "b")
+    if a_cols != b_rows:
+        raise ValueError(f"矩阵维度不匹配（a: {a_rows}x{a_cols}, b: {b_rows}x{b_cols}）")
+    # 输入各自不超过上限时，m x 1 与 1 x p 相乘的结果仍可能有 MAX_ELEMENTS**2 个元素
+    if a_rows * b_cols > MAX_ELEMENTS:
+        raise ValueError(f"乘积矩阵过大（{a_rows}x{b_cols}，最多支持 {MAX_ELEMENTS} 个元素）")
+    if np is not None:
+        return (np.asarray(a, dtype=float) @ np.asarray(b, dtype=float)).tolist()
+    # 先转置b，使内层循环按行连续读取两个操作数
+    columns = list(zip(*b))
+    return [[_dot(row, column) for column in columns] for row in a]
+
+
+def transpose(a: Matrix) -> Matrix:
+    """
+    矩阵转置。
+
+    Args:
+        a: m x n 矩阵
+
+    Returns:
+        n x m 矩阵
+    """
+    shape(a)
+    return [list(column) for column in zip(*a)]
+
+
+def _eliminate(a: Matrix, b: Matrix) -> Tuple[Matrix, Matrix, int]:
+    """
+    列主元高斯消元，原地把a化为上三角矩阵，对b做相同的行变换。
+
+    Returns:
+        (上三角矩阵, 变换后的b, 行交换次数)；遇到奇异矩阵时抛出ValueError
+    """
+    n = len(a)
+    scale = max(abs(x) for row in a for x in row) or 1.0
+    swaps = 0
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        if abs(a[pivot][col]) <= SINGULAR_TOLERANCE * scale:
+            raise _singular_error()
+        if pivot != col:
+            a[col], a[pivot] = a[pivot], a[col]
+            b[col], b[pivot] = b[pivot], b[col]
+            swaps += 1
+        pivot_row, pivot_b = a[col], b[col]
+        pivot_value = pivot_row[col]
+        for r in range(col + 1, n):
+            factor = a[r][col] / pivot_value
+            if factor:
+                a[r] = [x - factor * y for x, y in zip(a[r], pivot_row)]
+                b[r] = [x - factor * y for x, y in zip(b[r], pivot_b)]
+    return a, b, swaps
+
+
+def det(a: Matrix) -> float:
+    """
+    计算行列式。
+
+    Args:
+        a: n x n 方阵
+
+    Returns:
+        行列式的值，奇异矩阵返回0
+
+    Raises:
+        ValueError: 不是方阵时抛出
+    """
+    n = _check_square(a, "行列式")
+    if np is not None:
+        return float(np.linalg.det(np.asarray(a, dtype=float)))
+    try:
+        upper, _, swaps = _eliminate([list(map(float, row)) for row in a], [[]] * n)
+    except ValueError:
+        return 0.0
+    result = -1.0 if swaps % 2 else 1.0
+    for i in range(n):
+        result *= upper[i][i]
+    return result
+
+
+def solve(a: Matrix, b: Vector) -> Vector:
+    """
+    求解线性方程组 a x = b。
+
+    Args:
+        a: n x n 系数矩阵
+        b: 长度为n的常数向量
+
+    Returns:
+        方程组的解x
+
+    Raises:
+        ValueError: 维度不匹配或系数矩阵奇异时抛出
+    """
+    n = _check_square(a, "线性方程组")
+    if len(b) != n:
+        raise ValueError(f"常数向量长度与系数矩阵不匹配（a: {n}x{n}, b: {len(b)}）")
+    if np is not None:
+        try:
+            x = np.linalg.solve(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+        except np.linalg.LinAlgError:
+            raise _singular_error()
+        return x.tolist()
+
+    upper, rhs, _ = _eliminate(
+        [list(map(float, row)) for row in a], [[float(v)] for v in b]
+    )
+    x = [0.0] * n
+    for i in range(n - 1, -1, -1):
+        row = upper[i]
+        x[i] = (rhs[i][0] - _dot(row[i + 1 :], x[i + 1 :])) / row[i]
+    return x
+
+
+def pack_matrix(matrix: Sequence[Sequence[float]]) -> bytes:
+    """
+    把矩阵编码为二进制格式。
+
+    Args:
+        matrix: 矩阵
+
+    Returns:
+        编码后的字节串
+    """
+    rows, cols = len(matrix), len(matrix[0]) if matrix else 0
+    values = array("d", (x for row in matrix for x in row))
+    if sys.byteorder != "little":
+        values.byteswap()
+    return _HEADER.pack(rows, cols) + values.tobytes()
+
+
+def unpack_matrices(data: bytes) -> List[Matrix]:
+    """
+    从二进制数据中解码依次排列的矩阵。
+
+    Args:
+        data: pack_matrix 编码结果的拼接
+
+    Returns:
+        矩阵列表
+
+    Raises:
+        ValueError: 矩阵为空、过大或数据长度与头部描述不一致时抛出
+    """
+    matrices = []
+    offset = 0
+    view = memoryview(data)
+    while offset < len(data):
+        if offset + _HEADER.size > len(data):
+            raise ValueError("二进制矩阵数据不完整")
+        rows, cols = _HEADER.unpack_from(data, offset)
+        offset += _HEADER.size
+        # 先检查各维度再分配行列表：cols为0时 rows*cols 恒为0，
+        # 只检查元素数量会按头部中任意大的rows创建空行
+        if rows == 0 or cols == 0:
+            raise ValueError("矩阵不能为空")
+        if rows > MAX_ELEMENTS or cols > MAX_ELEMENTS or rows * cols > MAX_ELEMENTS:
+            raise ValueError(f"矩阵过大（最多支持 {MAX_ELEMENTS} 个元素）")
+        count = rows * cols
+        end = offset + count * 8
+        if end > len(data):
+            raise ValueError("二进制矩阵数据不完整")
+        values = array("d")
+        values.frombytes(view[offset:end])
+        if sys.byteorder != "little":
+            values.byteswap()
+        matrices.append(
+            [values[r * cols : (r + 1) * cols].tolist() for r in range(rows)]
+        )
+        offset = end
+    return matrices
@@ -0,0 +1,212 @@
+"""
+多进程批量计算模块。
+
+大批量运算按区间切分后交给进程池并行执行。操作数和结果放在
+共享内存（multiprocessing.shared_memory）中，工作进程按区间直接读写，
+避免在进程之间pickle大列表。数据量较小时直接串行计算。
+
+共享内存中的结果是float64，整数运算（gcd、factorial等）的结果会丢失
+精度或类型，这些运算总是串行计算。
+"""
+
+import atexit
+import math
+import multiprocessing
+import os
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence
+
+from .core import OPERATIONS, evaluate_many
+
+# 元素数量达到该值时才使用多进程，低于该值时进程间调度开销大于收益
+PARALLEL_THRESHOLD = 200_000
+# 每个分片的最少元素数量
+MIN_SHARD_SIZE = 50_000
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def default_workers() -> int:
+    """默认工作进程数量，等于可用CPU核数"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    """获取共享的进程池，避免每次调用都重新启动进程"""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown()
+            method = (
+                "forkserver"
+                if "forkserver" in multiprocessing.get_all_start_methods()
+                else "spawn"
+            )
+            _executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context(method)
+            )
+            _executor_workers = workers
+        return _executor
+
+
+def shutdown() -> None:
+    """关闭共享的进程池"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+
+atexit.register(shutdown)
+
+
+def _is_integer_operation(operation: str) -> bool:
+    op = OPERATIONS.get(operation)
+    return op is not None and op.integer
+
+
+def _to_shared(values: Sequence[float]) -> shared_memory.SharedMemory:
+    """把操作数复制到新建的共享内存块中"""
+    data = values if isinstance(values, array) else array("d", values)
+    shm = shared_memory.SharedMemory(create=True, size=max(len(data), 1) * 8)
+    view = memoryview(shm.buf).cast("d")
+    try:
+        view[: len(data)] = data
+    finally:
+        view.release()
+    return shm
+
+
+def _run_shard(
+    operation: str,
+    a_name: str,
+    b_name: Optional[str],
+    out_name: str,
+    start: int,
+    stop: int,
+) -> None:
+    """工作进程：计算 [start, stop) 区间并写回结果共享内存"""
+    blocks = []
+    views = []
+    try:
+        for name in (a_name, b_name, out_name):
+            if name is None:
+                views.append(None)
+                continue
+            # 工作进程与主进程共用同一个资源跟踪器，共享内存由主进程负责释放
+            shm = shared_memory.SharedMemory(name=name)
+            blocks.append(shm)
+            views.append(memoryview(shm.buf).cast("d"))
+
+        a_view, b_view, out_view = views
+        a = a_view[start:stop].tolist()
+        b = b_view[start:stop].tolist() if b_view is not None else None
+        out_view[start:stop] = array("d", evaluate_many(operation, a, b))
+    finally:
+        for view in views:
+            if view is not None:
+                view.release()
+        for shm in blocks:
+            shm.close()
+
+
+def evaluate_parallel(
+    operation: str,
+    a: Sequence[float],
+    b: Optional[Sequence[float]] = None,
+    workers: Optional[int] = None,
+) -> List[float]:
+    """
+    使用进程池并行批量计算。
+
+    Args:
+        operation: 运算名称
+        a: 第一组操作数
+        b: 第二组操作数，单操作数运算时为None
+        workers: 工作进程数量，默认等于CPU核数
+
+    Returns:
+        逐元素的计算结果
+
+    Raises:
+        与 calculator.core.evaluate_many 相同；多个元素出错时抛出下标最小的错误
+        ValueError: 整数运算不支持多进程计算，结果无法精确地写入float64共享内存
+    """
+    if b is not None and len(a) != len(b):
+        # 交给串行实现生成统一的错误信息
+        return evaluate_many(operation, a, b)
+    if _is_integer_operation(operation):
+        raise ValueError(f"运算 {operation} 的结果是整数，不支持多进程计算")
+
+    workers = workers or default_workers()
+    size = len(a)
+    shard_size = max(MIN_SHARD_SIZE, math.ceil(size / workers))
+
+    blocks = [_to_shared(a)]
+    if b is not None:
+        blocks.append(_to_shared(b))
+    out = shared_memory.SharedMemory(create=True, size=max(size, 1) * 8)
+    blocks.append(out)
+    try:
+        executor = _get_executor(workers)
+        futures = [
+            executor.submit(
+                _run_shard,
+                operation,
+                blocks[0].name,
+                blocks[1].name if b is not None else None,
+                out.name,
+                start,
+                min(start + shard_size, size),
+            )
+            for start in range(0, size, shard_size)
+        ]
+        # 按分片顺序取结果，保证抛出的是下标最小的错误
+        for future in futures:
+            future.result()
+
+        view = memoryview(out.buf).cast("d")
+        try:
+            return view[:size].tolist()
+        finally:
+            view.release()
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+
+def evaluate(
+    operation: str,
+    a: Sequence[float],
+    b: Optional[Sequence[float]] = None,
+    workers: Optional[int] = None,
+    threshold: int = PARALLEL_THRESHOLD,
+) -> List[float]:
+    """
+    批量计算，根据数据量自动选择串行或多进程执行。
+
+    Args:
+        operation: 运算名称
+        a: 第一组操作数
+        b: 第二组操作数，单操作数运算时为None
+        workers: 工作进程数量，默认等于CPU核数
+        threshold: 使用多进程的最小元素数量
+
+    Returns:
+        逐元素的计算结果，整数运算总是串行计算，结果为整数
+    """
+    workers = workers or default_workers()
+    if workers <= 1 or len(a) < threshold or _is_integer_operation(operation):
+        return evaluate_many(operation, a, b)
+    return evaluate_parallel(operation, a, b, workers=workers)
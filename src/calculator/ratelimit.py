@@ -0,0 +1,256 @@
+"""
+按客户端限流。
+
+每个客户端（优先按X-API-Key，否则按IP）一个令牌桶：令牌按rate每秒
+补充，最多积累burst个，每个请求消耗一个令牌，没有令牌时返回429。
+
+令牌桶状态保存在存储中：
+- MemoryStore：进程内存储，每个活跃客户端只保存两个数；空闲时间
+  超过令牌补满所需时间的客户端会被清除（清除后的状态与满桶相同，
+  不影响限流结果）。
+- RedisStore：多个进程/Lambda实例共享的存储，用Lua脚本原子地
+  更新令牌桶，键的过期时间等于令牌补满所需时间。
+"""
+
+import abc
+import hashlib
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .admission import EXEMPT_PATHS, WARMUP_SCOPE_KEY
+
+logger = logging.getLogger(__name__)
+
+# 默认每个客户端每秒100个请求，最多允许200个请求的突发
+DEFAULT_RATE = 100.0
+DEFAULT_BURST = 200.0
+
+
+def take_tokens(
+    tokens: float,
+    updated: float,
+    now: float,
+    rate: float,
+    capacity: float,
+    cost: float,
+) -> Tuple[bool, float, float]:
+    """
+    补充令牌并尝试消耗。
+
+    Args:
+        tokens: 上次更新后的令牌数
+        updated: 上次更新的时间
+        now: 当前时间
+        rate: 每秒补充的令牌数
+        capacity: 令牌桶容量
+        cost: 本次消耗的令牌数
+
+    Returns:
+        (是否允许, 更新后的令牌数, 不允许时需要等待的秒数)
+    """
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / rate
+
+
+class RateLimitStore(abc.ABC):
+    """令牌桶存储接口"""
+
+    @abc.abstractmethod
+    async def take(
+        self, key: str, rate: float, capacity: float, cost: float = 1.0
+    ) -> Tuple[bool, float]:
+        """
+        原子地补充并消耗指定客户端的令牌。
+
+        Returns:
+            (是否允许, 不允许时需要等待的秒数)
+        """
+        raise NotImplementedError
+
+
+class MemoryStore(RateLimitStore):
+    """
+    进程内令牌桶存储。
+
+    按最近访问顺序保存令牌桶，访问时顺带清除队首已经空闲到补满的桶，
+    每次操作的均摊开销为O(1)。
+
+    Args:
+        max_keys: 最多保存的客户端数量，超出时清除最久未访问的客户端
+        clock: 时钟函数
+    """
+
+    def __init__(
+        self, max_keys: int = 100_000, clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _evict(self, now: float, refill_time: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            key, (_, updated) = next(iter(buckets.items()))
+            if now - updated < refill_time and len(buckets) <= self.max_keys:
+                break
+            del buckets[key]
+
+    async def take(
+        self, key: str, rate: float, capacity: float, cost: float = 1.0
+    ) -> Tuple[bool, float]:
+        now = self.clock()
+        self._evict(now, capacity / rate)
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        allowed, tokens, wait = take_tokens(tokens, updated, now, rate, capacity, cost)
+        self._buckets[key] = (tokens, now)
+        return allowed, wait
+
+
+# KEYS[1]: 客户端键；ARGV: rate, capacity, cost, now
+# 返回 {是否允许(0/1), 需要等待的秒数(字符串，避免Redis把Lua数值截断为整数)}
+_REDIS_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1])
+local updated = tonumber(state[2])
+if tokens == nil or updated == nil then
+    tokens = capacity
+else
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+end
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(wait)}
+"""
+
+
+class RedisStore(RateLimitStore):
+    """
+    基于Redis的共享令牌桶存储。
+
+    Args:
+        client: 兼容 redis.asyncio.Redis 的客户端（需要提供eval方法）
+        prefix: 键前缀
+        clock: 时钟函数，多个实例共享状态，需要使用墙上时间
+    """
+
+    script = _REDIS_SCRIPT
+
+    def __init__(
+        self,
+        client: Any,
+        prefix: str = "ratelimit:",
+        clock: Callable[[], float] = time.time,
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.clock = clock
+
+    async def take(
+        self, key: str, rate: float, capacity: float, cost: float = 1.0
+    ) -> Tuple[bool, float]:
+        allowed, wait = await self.client.eval(
+            self.script, 1, self.prefix + key, rate, capacity, cost, self.clock()
+        )
+        if isinstance(wait, bytes):
+            wait = wait.decode()
+        return bool(int(allowed)), float(wait)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+class RateLimitMiddleware:
+    """
+    按客户端限流的中间件。
+
+    Args:
+        app: ASGI应用
+        rate: 每个客户端每秒允许的请求数，默认读取CALCULATOR_RATE_LIMIT
+        burst: 每个客户端允许的突发请求数，默认读取CALCULATOR_RATE_BURST
+        store: 令牌桶存储，默认为进程内存储
+        trust_forwarded: 是否按X-Forwarded-For识别客户端IP，仅在可信代理之后开启
+        exempt_paths: 不限流的路径
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        store: Optional[RateLimitStore] = None,
+        trust_forwarded: bool = False,
+        exempt_paths: frozenset = EXEMPT_PATHS,
+    ):
+        self.app = app
+        self.rate = rate or _env_float("CALCULATOR_RATE_LIMIT", DEFAULT_RATE)
+        self.burst = burst or _env_float("CALCULATOR_RATE_BURST", DEFAULT_BURST)
+        self.store = store or MemoryStore()
+        self.trust_forwarded = trust_forwarded
+        self.exempt_paths = exempt_paths
+
+    def client_key(self, scope: Scope) -> str:
+        """客户端标识：API密钥的摘要（不保存密钥原文）或客户端IP"""
+        headers = Headers(scope=scope)
+        api_key = headers.get("x-api-key")
+        if api_key:
+            return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:32]
+        forwarded = headers.get("x-forwarded-for") if self.trust_forwarded else None
+        if forwarded:
+            return "ip:" + forwarded.split(",")[0].strip()
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["path"] in self.exempt_paths
+            or scope.get(WARMUP_SCOPE_KEY)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            allowed, wait = await self.store.take(
+                self.client_key(scope), self.rate, self.burst
+            )
+        except Exception:
+            # 共享存储不可用时放行，避免限流组件故障导致整个服务不可用
+            logger.warning("限流存储不可用，放行请求", exc_info=True)
+            allowed, wait = True, 0.0
+
+        if not allowed:
+            response = JSONResponse(
+                {"detail": "请求过于频繁，请稍后重试"},
+                status_code=429,
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
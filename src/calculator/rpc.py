@@ -0,0 +1,390 @@
+"""
+二进制RPC接口。
+
+服务间调用不需要JSON和HTTP的开销：客户端与服务端之间保持一个TCP连接，
+使用紧凑的长度前缀二进制帧，运算与REST接口共用 calculator.core 的运算表。
+
+帧格式（小端）：
+
+    uint32 长度（不含这4个字节） | uint8 类型 | uint32 调用ID或流ID | 负载
+
+帧类型：
+- CALL（客户端）：uint8 名称长度 | 运算名称 | float64参数...
+- RESULT（服务端）：uint8 值类型（d=float64、q=int64、s=十进制字符串）| 值
+- ERROR（服务端）：UTF-8错误信息
+- OPEN（客户端）：运算名称，打开一个批量计算流
+- DATA（双向）：uint32 元素数 | uint8 列数 | 各列float64数组；
+  客户端发送操作数列，服务端按顺序回复一列结果；每帧最多 MAX_STREAM_ELEMENTS 个元素
+- CLOSE（双向）：客户端关闭流，服务端回复CLOSE
+
+同一连接上可以同时进行多个调用和流，回复按ID匹配。
+"""
+
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import integer
+from .core import BATCH_OPERATIONS, OPERATIONS, evaluate_many
+from .jobs import JOB_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 9000
+# 单个帧的最大字节数
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+# 单个数据帧的最大元素数。数据帧在事件循环中计算，与批量任务每块的元素数量
+# 相同，一个帧不会长时间阻塞同一进程中的其他连接；更多元素分成多个帧发送
+MAX_STREAM_ELEMENTS = JOB_CHUNK_SIZE
+
+CALL = 1
+RESULT = 2
+ERROR = 3
+OPEN = 4
+DATA = 5
+CLOSE = 6
+
+_FRAME = struct.Struct("<IBI")
+_FRAME_OVERHEAD = _FRAME.size - 4
+_DATA_HEADER = struct.Struct("<IB")
+_INT64_RANGE = (-(2**63), 2**63)
+
+
+class ProtocolError(Exception):
+    """帧格式错误，连接无法继续使用"""
+
+
+class RpcError(Exception):
+    """服务端返回的错误"""
+
+
+def encode_frame(kind: int, ident: int, payload: bytes = b"") -> bytes:
+    """编码一个帧"""
+    return _FRAME.pack(len(payload) + _FRAME_OVERHEAD, kind, ident) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, int, bytes]:
+    """
+    读取一个帧。
+
+    Returns:
+        (帧类型, ID, 负载)
+
+    Raises:
+        ProtocolError: 帧长度无效时抛出
+        asyncio.IncompleteReadError: 连接在帧中途关闭时抛出
+    """
+    length, kind, ident = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    if not _FRAME_OVERHEAD <= length <= MAX_FRAME_SIZE:
+        raise ProtocolError(f"帧长度无效: {length}")
+    return kind, ident, await reader.readexactly(length - _FRAME_OVERHEAD)
+
+
+def encode_call(operation: str, args: Sequence[float]) -> bytes:
+    name = operation.encode()
+    return bytes([len(name)]) + name + struct.pack(f"<{len(args)}d", *args)
+
+
+def decode_call(payload: bytes) -> Tuple[str, Tuple[float, ...]]:
+    if not payload or len(payload) < 1 + payload[0]:
+        raise ValueError("调用帧格式错误")
+    end = 1 + payload[0]
+    name = payload[1:end].decode()
+    count, remainder = divmod(len(payload) - end, 8)
+    if remainder:
+        raise ValueError("调用帧格式错误")
+    return name, struct.unpack_from(f"<{count}d", payload, end)
+
+
+def encode_value(value: Any) -> bytes:
+    if isinstance(value, int) and not isinstance(value, bool):
+        if _INT64_RANGE[0] <= value < _INT64_RANGE[1]:
+            return b"q" + struct.pack("<q", value)
+        return b"s" + integer.to_decimal_string(value).encode()
+    return b"d" + struct.pack("<d", value)
+
+
+def decode_value(payload: bytes) -> Any:
+    tag, body = payload[:1], payload[1:]
+    if tag == b"q":
+        return struct.unpack("<q", body)[0]
+    if tag == b"s":
+        return int(body.decode())
+    return struct.unpack("<d", body)[0]
+
+
+def encode_columns(columns: Sequence[Sequence[float]]) -> bytes:
+    count = len(columns[0]) if columns else 0
+    if any(len(column) != count for column in columns):
+        raise ValueError("各列长度必须相同")
+    parts = [_DATA_HEADER.pack(count, len(columns))]
+    parts.extend(struct.pack(f"<{count}d", *column) for column in columns)
+    return b"".join(parts)
+
+
+def decode_columns(
+    payload: bytes, max_count: Optional[int] = None
+) -> List[List[float]]:
+    if len(payload) < _DATA_HEADER.size:
+        raise ValueError("数据帧格式错误")
+    count, width = _DATA_HEADER.unpack_from(payload)
+    if max_count is not None and count > max_count:
+        raise ValueError(f"数据帧过大（最多支持 {max_count} 个元素）")
+    if len(payload) != _DATA_HEADER.size + count * width * 8:
+        raise ValueError("数据帧长度与元素数不一致")
+    fmt = struct.Struct(f"<{count}d")
+    return [
+        list(fmt.unpack_from(payload, _DATA_HEADER.size + i * fmt.size))
+        for i in range(width)
+    ]
+
+
+def _call(payload: bytes) -> Any:
+    name, args = decode_call(payload)
+    op = OPERATIONS.get(name)
+    if op is None:
+        raise ValueError(f"不支持的运算: {name}")
+    if not op.arity <= len(args) <= op.arity + len(op.optional):
+        raise ValueError(f"运算 {name} 需要 {op.arity} 个参数（当前: {len(args)}）")
+    return op.scalar(*args)
+
+
+def _stream_data(operation: str, payload: bytes) -> bytes:
+    columns = decode_columns(payload, MAX_STREAM_ELEMENTS)
+    if not 1 <= len(columns) <= 2:
+        raise ValueError(f"数据帧需要1到2列操作数（当前: {len(columns)}）")
+    results = evaluate_many(operation, *columns)
+    return encode_columns([results])
+
+
+def dispatch(kind: int, ident: int, payload: bytes, streams: Dict[int, str]) -> bytes:
+    """
+    处理一个客户端帧。
+
+    Args:
+        kind: 帧类型
+        ident: 调用ID或流ID
+        payload: 负载
+        streams: 当前连接上已打开的流（流ID到运算名称）
+
+    Returns:
+        要发送的回复帧，没有回复时为空
+
+    Raises:
+        ProtocolError: 帧类型未知时抛出
+    """
+    try:
+        if kind == CALL:
+            return encode_frame(RESULT, ident, encode_value(_call(payload)))
+        if kind == DATA:
+            operation = streams.get(ident)
+            if operation is None:
+                raise ValueError(f"流不存在: {ident}")
+            return encode_frame(DATA, ident, _stream_data(operation, payload))
+        if kind == OPEN:
+            operation = payload.decode()
+            if operation not in BATCH_OPERATIONS:
+                raise ValueError(f"不支持的运算: {operation}")
+            streams[ident] = operation
+            return b""
+        if kind == CLOSE:
+            streams.pop(ident, None)
+            return encode_frame(CLOSE, ident)
+    except Exception as e:
+        return encode_frame(ERROR, ident, str(e).encode())
+    raise ProtocolError(f"未知的帧类型: {kind}")
+
+
+async def handle_connection(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    """处理一个客户端连接，直到连接关闭"""
+    streams: Dict[int, str] = {}
+    try:
+        while True:
+            kind, ident, payload = await read_frame(reader)
+            reply = dispatch(kind, ident, payload, streams)
+            if reply:
+                writer.write(reply)
+                # 客户端不读取回复、发送缓冲区超过高水位时暂停读取新请求
+                await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    except ProtocolError as e:
+        logger.warning("RPC协议错误，关闭连接: %s", e)
+        writer.write(encode_frame(ERROR, 0, str(e).encode()))
+    finally:
+        writer.close()
+
+
+async def start_server(
+    host: str = "127.0.0.1", port: int = DEFAULT_PORT
+) -> asyncio.AbstractServer:
+    """启动RPC服务，port为0时由系统分配端口"""
+    return await asyncio.start_server(handle_connection, host, port)
+
+
+class RpcStream:
+    """一个批量计算流，结果按发送顺序返回"""
+
+    def __init__(self, client: "RpcClient", ident: int, operation: str):
+        self.client = client
+        self.ident = ident
+        self.operation = operation
+        self._results: "asyncio.Queue[Any]" = asyncio.Queue()
+        self._closed = asyncio.get_running_loop().create_future()
+
+    async def send(self, *columns: Sequence[float]) -> None:
+        """发送一块操作数，单操作数运算发送一列，双操作数运算发送两列"""
+        await self.client._send(encode_frame(DATA, self.ident, encode_columns(columns)))
+
+    async def receive(self) -> List[float]:
+        """
+        按顺序接收一块结果。
+
+        Raises:
+            RpcError: 该块计算出错时抛出，流仍可继续使用
+        """
+        item = await self._results.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    async def close(self) -> None:
+        """关闭流；已经收到的结果仍可以通过receive读取"""
+        await self.client._send(encode_frame(CLOSE, self.ident))
+        await self._closed
+        self.client._streams.pop(self.ident, None)
+
+
+class RpcClient:
+    """
+    RPC客户端。同一个客户端可以并发调用，请求在一个连接上流水线发送。
+
+    使用 RpcClient.connect 创建。
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._calls: Dict[int, asyncio.Future] = {}
+        self._streams: Dict[int, RpcStream] = {}
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        """连接RPC服务"""
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _send(self, frame: bytes) -> None:
+        self._writer.write(frame)
+        await self._writer.drain()
+
+    async def call(self, operation: str, *args: float) -> Any:
+        """
+        调用一次运算。
+
+        Args:
+            operation: 运算名称，与REST接口一致
+            args: 参数
+
+        Returns:
+            计算结果
+
+        Raises:
+            RpcError: 服务端返回错误时抛出
+        """
+        ident = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._calls[ident] = future
+        await self._send(encode_frame(CALL, ident, encode_call(operation, args)))
+        return await future
+
+    async def stream(self, operation: str) -> RpcStream:
+        """打开一个批量计算流"""
+        stream = RpcStream(self, next(self._ids), operation)
+        self._streams[stream.ident] = stream
+        await self._send(encode_frame(OPEN, stream.ident, operation.encode()))
+        return stream
+
+    async def _read_loop(self) -> None:
+        error: Exception = ConnectionError("RPC连接已关闭")
+        try:
+            while True:
+                kind, ident, payload = await read_frame(self._reader)
+                self._deliver(kind, ident, payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            error = e
+        for future in self._calls.values():
+            if not future.done():
+                future.set_exception(error)
+        for stream in self._streams.values():
+            stream._results.put_nowait(error)
+            if not stream._closed.done():
+                stream._closed.set_exception(error)
+
+    def _deliver(self, kind: int, ident: int, payload: bytes) -> None:
+        future = self._calls.pop(ident, None)
+        if future is not None:
+            if kind == RESULT:
+                future.set_result(decode_value(payload))
+            else:
+                future.set_exception(RpcError(payload.decode()))
+            return
+        stream = self._streams.get(ident)
+        if stream is None:
+            if kind == ERROR:
+                logger.warning("RPC服务端错误: %s", payload.decode())
+            return
+        if kind == DATA:
+            stream._results.put_nowait(decode_columns(payload)[0])
+        elif kind == ERROR:
+            stream._results.put_nowait(RpcError(payload.decode()))
+        elif kind == CLOSE and not stream._closed.done():
+            stream._closed.set_result(None)
+
+    async def close(self) -> None:
+        """关闭连接"""
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self._reader_task
+
+
+async def serve(host: str, port: int) -> None:
+    """启动RPC服务并一直运行"""
+    server = await start_server(host, port)
+    logger.info("RPC服务监听地址: %s:%d", host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="启动计算器二进制RPC服务")
+    # RPC接口没有限流，默认只监听本机，需要对外提供服务时显式指定监听地址
+    parser.add_argument(
+        "--host", default=os.environ.get("CALCULATOR_RPC_HOST", "127.0.0.1")
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=int(os.environ.get("CALCULATOR_RPC_PORT", DEFAULT_PORT)),
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
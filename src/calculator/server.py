@@ -0,0 +1,319 @@
+"""
+生产环境ASGI服务入口。
+
+用法::
+
+    python -m calculator.server --workers 4
+
+所有参数也可以通过环境变量配置（命令行参数优先）。多进程模式下，
+主进程先导入应用并绑定端口，再fork出工作进程，工作进程共享已导入的
+代码和监听套接字。
+"""
+
+import argparse
+import importlib.util
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import uvicorn
+
+from . import warmup
+
+logger = logging.getLogger(__name__)
+
+# 崩溃循环保护：RESTART_WINDOW秒内重启超过MAX_RESTARTS次时停止服务
+MAX_RESTARTS = 5
+RESTART_WINDOW = 60.0
+# 检查工作进程状态的间隔（秒）
+CHECK_INTERVAL = 0.5
+
+
+class CrashLoopError(RuntimeError):
+    """工作进程在短时间内反复退出"""
+
+
+def available_cpus() -> int:
+    """
+    获取当前进程可用的CPU核数。
+
+    优先考虑CPU亲和性和cgroup配额（容器限制），
+    避免在容器内按宿主机核数启动过多进程。
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r", encoding="utf-8") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+@dataclass
+class ServerSettings:
+    """服务运行参数"""
+
+    host: str = field(
+        default_factory=lambda: os.environ.get("CALCULATOR_HOST", "0.0.0.0")
+    )
+    port: int = field(default_factory=lambda: _env_int("CALCULATOR_PORT", 8000))
+    workers: int = field(
+        default_factory=lambda: _env_int("CALCULATOR_WORKERS", available_cpus())
+    )
+    keep_alive: int = field(
+        default_factory=lambda: _env_int("CALCULATOR_KEEP_ALIVE", 5)
+    )
+    backlog: int = field(default_factory=lambda: _env_int("CALCULATOR_BACKLOG", 2048))
+    log_level: str = field(
+        default_factory=lambda: os.environ.get("CALCULATOR_LOG_LEVEL", "info")
+    )
+    access_log: bool = field(
+        default_factory=lambda: os.environ.get("CALCULATOR_ACCESS_LOG", "1") != "0"
+    )
+    warmup: bool = field(
+        default_factory=lambda: os.environ.get("CALCULATOR_WARMUP", "1") != "0"
+    )
+
+
+def event_loop_impl() -> str:
+    """安装了uvloop时使用uvloop，否则使用标准asyncio"""
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def http_impl() -> str:
+    """安装了httptools时使用httptools解析HTTP，否则使用h11"""
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def build_config(settings: ServerSettings) -> uvicorn.Config:
+    """根据运行参数创建uvicorn配置，应用在此处预先导入"""
+    # 访问日志由应用的JSON访问日志中间件（calculator.accesslog）记录，
+    # 中间件在构建中间件栈时读取该环境变量，uvicorn自身的文本访问日志关闭
+    os.environ["CALCULATOR_ACCESS_LOG"] = "1" if settings.access_log else "0"
+    from .api import app
+
+    return uvicorn.Config(
+        app,
+        host=settings.host,
+        port=settings.port,
+        loop=event_loop_impl(),
+        http=http_impl(),
+        timeout_keep_alive=settings.keep_alive,
+        backlog=settings.backlog,
+        log_level=settings.log_level,
+        access_log=False,
+    )
+
+
+def bind_socket(settings: ServerSettings) -> socket.socket:
+    """
+    在主进程中创建监听套接字，供所有工作进程共享。
+
+    显式指定IPPROTO_TCP：asyncio只对proto为TCP的连接设置TCP_NODELAY，
+    而accept得到的连接沿用监听套接字的proto。uvicorn.Config.bind_socket
+    使用proto=0，会导致小响应受Nagle算法和延迟ACK影响，每次请求多出约40ms。
+    """
+    family = socket.AF_INET6 if ":" in settings.host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((settings.host, settings.port))
+    sock.set_inheritable(True)
+    logger.info("监听地址: http://%s:%d", settings.host, settings.port)
+    return sock
+
+
+def _serve(config: uvicorn.Config, sock: socket.socket) -> None:
+    """工作进程入口"""
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Supervisor:
+    """
+    管理多个工作进程。
+
+    工作进程意外退出时自动拉起新的进程，收到SIGTERM/SIGINT时
+    通知所有工作进程优雅退出。工作进程启动后立即崩溃（配置错误、
+    依赖缺失等）时，重启无法恢复，在restart_window秒内重启超过
+    max_restarts次后停止所有工作进程并抛出CrashLoopError。
+
+    Args:
+        config: uvicorn配置
+        sock: 共享的监听套接字
+        workers: 工作进程数量
+        max_restarts: 时间窗口内允许的最大重启次数
+        restart_window: 时间窗口（秒）
+    """
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        sock: socket.socket,
+        workers: int,
+        max_restarts: int = MAX_RESTARTS,
+        restart_window: float = RESTART_WINDOW,
+    ):
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self._restarts: "deque[float]" = deque()
+        self.processes: List[multiprocessing.process.BaseProcess] = []
+        self._context = multiprocessing.get_context("fork")
+        self._stopping = False
+
+    def _spawn(self) -> multiprocessing.process.BaseProcess:
+        process = self._context.Process(
+            target=_serve, args=(self.config, self.sock), daemon=False
+        )
+        process.start()
+        return process
+
+    def _handle_signal(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _record_restart(self) -> bool:
+        """记录一次重启，返回时间窗口内的重启次数是否仍在上限之内"""
+        now = time.monotonic()
+        self._restarts.append(now)
+        while self._restarts[0] <= now - self.restart_window:
+            self._restarts.popleft()
+        return len(self._restarts) <= self.max_restarts
+
+    def run(self) -> None:
+        """
+        启动工作进程并阻塞直到收到退出信号。
+
+        Raises:
+            CrashLoopError: 工作进程反复退出时，停止所有工作进程后抛出
+        """
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._handle_signal)
+
+        self.processes = [self._spawn() for _ in range(self.workers)]
+        logger.info("已启动 %d 个工作进程", self.workers)
+
+        while not self._stopping:
+            for index, process in enumerate(self.processes):
+                if process.is_alive() or self._stopping:
+                    continue
+                if not self._record_restart():
+                    logger.error(
+                        "工作进程在 %.0f 秒内退出超过 %d 次，停止服务",
+                        self.restart_window,
+                        self.max_restarts,
+                    )
+                    self.stop()
+                    raise CrashLoopError("工作进程反复退出")
+                logger.warning(
+                    "工作进程 %s 已退出（退出码: %s），重新启动",
+                    process.pid,
+                    process.exitcode,
+                )
+                self.processes[index] = self._spawn()
+            time.sleep(CHECK_INTERVAL)
+
+        self.stop()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """通知所有工作进程退出并等待"""
+        for process in self.processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.kill()
+        self.sock.close()
+
+
+def run(settings: Optional[ServerSettings] = None) -> None:
+    """
+    启动服务。
+
+    Args:
+        settings: 运行参数，为None时从环境变量读取
+    """
+    settings = settings or ServerSettings()
+    config = build_config(settings)
+    if settings.warmup:
+        # 在fork工作进程之前预热，工作进程继承预热后的状态
+        report = warmup.run_warm_up(config.app)
+        logger.info(
+            "预热完成: %d 个请求，耗时 %.1f ms",
+            report["requests"],
+            report["duration_ms"],
+        )
+        if report["failed"]:
+            logger.warning("预热请求失败: %s", ", ".join(report["failed"]))
+
+    if settings.workers <= 1:
+        uvicorn.Server(config).run()
+        return
+
+    config.load()
+    sock = bind_socket(settings)
+    Supervisor(config, sock, settings.workers).run()
+
+
+def parse_args(argv=None) -> ServerSettings:
+    """解析命令行参数，未指定的参数使用环境变量或默认值"""
+    defaults = ServerSettings()
+    parser = argparse.ArgumentParser(description="启动计算器API服务")
+    parser.add_argument("--host", default=defaults.host)
+    parser.add_argument("--port", type=int, default=defaults.port)
+    parser.add_argument("--workers", type=int, default=defaults.workers, help="工作进程数量")
+    parser.add_argument(
+        "--keep-alive",
+        type=int,
+        default=defaults.keep_alive,
+        help="keep-alive连接的空闲超时（秒）",
+    )
+    parser.add_argument("--backlog", type=int, default=defaults.backlog, help="监听队列长度")
+    parser.add_argument("--log-level", default=defaults.log_level)
+    parser.add_argument(
+        "--no-access-log",
+        dest="access_log",
+        action="store_false",
+        default=defaults.access_log,
+        help="不记录访问日志",
+    )
+    parser.add_argument(
+        "--no-warmup",
+        dest="warmup",
+        action="store_false",
+        default=defaults.warmup,
+        help="启动时不预热",
+    )
+    args = parser.parse_args(argv)
+    return ServerSettings(**vars(args))
+
+
+def main(argv=None) -> None:
+    """命令行入口，工作进程反复退出时以非零退出码结束"""
+    try:
+        run(parse_args(argv))
+    except CrashLoopError:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
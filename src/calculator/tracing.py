@@ -0,0 +1,393 @@
+"""
+分布式追踪。
+
+与OpenTelemetry兼容的最小实现：span的字段（trace_id、span_id、parent_span_id、
+kind、开始和结束时间、attributes、status、events）与OpenTelemetry的span一致，
+请求之间通过W3C Trace Context的 traceparent 请求头传播。不依赖OpenTelemetry SDK，
+Lambda部署包不需要额外的依赖。本模块只使用标准库，calculator.core 也可以埋点；
+ASGI和FastAPI的埋点见 calculator.instrumentation。
+
+未配置导出器时追踪是空操作：start_span 返回同一个不记录的span，
+各处埋点几乎没有开销。导出器：
+
+    CALCULATOR_TRACE_EXPORTER=console       每个span输出一行JSON到标准输出
+    set_exporter(InMemorySpanExporter())    保存在内存中，供测试使用
+
+埋点位置：
+
+    lambda_handler          Lambda调用（calculator.lambda_handler）
+    mangum                  Mangum在API Gateway事件和ASGI之间的转换
+    <方法> <路由>           ASGI请求，包括中间件和路由匹配
+    route <路由>            请求参数解析和校验、接口函数、响应序列化
+    evaluate_many           批量计算中每次 calculator.core.evaluate_many 调用
+    job                     批量计算任务，父span为提交任务的请求
+"""
+
+import contextvars
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, TextIO
+
+SERVER = "server"
+INTERNAL = "internal"
+
+UNSET = "unset"
+OK = "ok"
+ERROR = "error"
+
+TRACEPARENT = "traceparent"
+_TRACEPARENT_PATTERN = re.compile(
+    r"([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?"
+)
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+
+class SpanContext:
+    """
+    跨进程传播的span标识。
+
+    Attributes:
+        trace_id: 32位十六进制的追踪ID
+        span_id: 16位十六进制的span ID
+        sampled: 是否记录（traceparent的sampled标志）
+    """
+
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool = True):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent格式"""
+        flags = "01" if self.sampled else "00"
+        return f"00-{self.trace_id}-{self.span_id}-{flags}"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """
+    解析traceparent请求头。
+
+    Args:
+        value: 形如 00-<trace_id>-<span_id>-<flags> 的请求头
+
+    Returns:
+        上游的span标识；请求头缺失或格式不合法时返回None
+    """
+    if not value:
+        return None
+    match = _TRACEPARENT_PATTERN.fullmatch(value.strip().lower())
+    if match is None:
+        return None
+    version, trace_id, span_id, flags, rest = match.groups()
+    # 版本00不允许附加字段，更高的版本按00解析前四个字段
+    if version == "ff" or (version == "00" and rest):
+        return None
+    if trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID:
+        return None
+    sampled = bool(int(flags, 16) & 1)
+    return SpanContext(trace_id, span_id, sampled)
+
+
+def extract(headers: Optional[Mapping[str, str]]) -> Optional[SpanContext]:
+    """从请求头（不区分大小写）中取出上游的span标识"""
+    if not headers:
+        return None
+    value = headers.get(TRACEPARENT)
+    if value is None:
+        for name, candidate in headers.items():
+            if name.lower() == TRACEPARENT:
+                value = candidate
+                break
+    return parse_traceparent(value)
+
+
+def inject(headers: Dict[str, str]) -> Dict[str, str]:
+    """把当前span的标识写入下游请求的请求头，没有当前span时不修改"""
+    context = current_context()
+    if context is not None:
+        headers[TRACEPARENT] = context.traceparent
+    return headers
+
+
+class Span:
+    """
+    一次操作的耗时和属性，作为上下文管理器使用时成为当前span。
+
+    Attributes:
+        name: span名称
+        context: span标识
+        parent_span_id: 父span的ID，根span为None
+        kind: server（处理外部请求）或internal
+        start_time, end_time: 开始和结束时间（Unix纳秒）
+        attributes: 属性
+        status: unset、ok或error
+        status_description: 出错时的说明
+        events: 事件（如exception）
+    """
+
+    __slots__ = (
+        "name",
+        "context",
+        "parent_span_id",
+        "kind",
+        "start_time",
+        "end_time",
+        "attributes",
+        "status",
+        "status_description",
+        "events",
+        "_token",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        context: SpanContext,
+        parent_span_id: Optional[str] = None,
+        kind: str = INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.context = context
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.start_time = time.time_ns()
+        self.end_time: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = UNSET
+        self.status_description: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self._token: Optional[contextvars.Token] = None
+
+    @property
+    def is_recording(self) -> bool:
+        return self.context.sampled
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_status(self, status: str, description: Optional[str] = None) -> None:
+        self.status = status
+        self.status_description = description
+
+    def record_exception(self, exc: BaseException) -> None:
+        """按OpenTelemetry的约定记录exception事件"""
+        self.events.append(
+            {
+                "name": "exception",
+                "time": time.time_ns(),
+                "attributes": {
+                    "exception.type": type(exc).__qualname__,
+                    "exception.message": str(exc),
+                },
+            }
+        )
+
+    def end(self) -> None:
+        """结束span并交给导出器，重复调用无效"""
+        if self.end_time is not None:
+            return
+        self.end_time = time.time_ns()
+        exporter = _exporter
+        if exporter is not None and self.context.sampled:
+            exporter.export([self])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出格式"""
+        return {
+            "name": self.name,
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_span_id": self.parent_span_id,
+            "kind": self.kind,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "attributes": self.attributes,
+            "status": {"code": self.status, "description": self.status_description},
+            "events": self.events,
+        }
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            self.record_exception(exc)
+            self.set_status(ERROR, f"{exc_type.__qualname__}: {exc}")
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+        self.end()
+
+
+class _NoopSpan:
+    """未配置导出器时使用的span，所有操作都是空操作"""
+
+    __slots__ = ()
+    context = None
+    is_recording = False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_status(self, status: str, description: Optional[str] = None) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "calculator_span", default=None
+)
+
+
+def current_span() -> Optional[Span]:
+    """当前span，没有时返回None"""
+    return _current.get()
+
+
+def current_context() -> Optional[SpanContext]:
+    """当前span的标识，用于在其他线程中延续追踪"""
+    span = _current.get()
+    return span.context if span is not None else None
+
+
+def _random_id(bits: int) -> str:
+    return f"{random.getrandbits(bits) or 1:0{bits // 4}x}"
+
+
+def start_span(
+    name: str,
+    attributes: Optional[Dict[str, Any]] = None,
+    parent: Optional[SpanContext] = None,
+    kind: str = INTERNAL,
+) -> Any:
+    """
+    创建span，在with语句中使用时成为当前span并在结束时导出。
+
+    Args:
+        name: span名称
+        attributes: 属性
+        parent: 父span的标识，默认为当前span；没有父span时开始新的追踪
+        kind: server或internal
+
+    Returns:
+        Span；未配置导出器时返回 NOOP_SPAN
+    """
+    if _exporter is None:
+        return NOOP_SPAN
+    if parent is None:
+        parent = current_context()
+    if parent is None:
+        context = SpanContext(_random_id(128), _random_id(64))
+        return Span(name, context, None, kind, attributes)
+    context = SpanContext(parent.trace_id, _random_id(64), parent.sampled)
+    return Span(name, context, parent.span_id, kind, attributes)
+
+
+class InMemorySpanExporter:
+    """把结束的span保存在内存中，供测试使用"""
+
+    def __init__(self):
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        with self._lock:
+            self._spans.extend(spans)
+
+    def get_finished_spans(self) -> List[Span]:
+        """按结束顺序返回已结束的span"""
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+class ConsoleSpanExporter:
+    """
+    每个span输出一行JSON。
+
+    Args:
+        stream: 输出流，默认为标准输出
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(
+            json.dumps(span.to_dict(), ensure_ascii=False) + "\n" for span in spans
+        )
+        with self._lock:
+            stream = self.stream or sys.stdout
+            stream.write(lines)
+            stream.flush()
+
+
+EXPORTERS: Dict[str, Callable[[], Any]] = {
+    "console": ConsoleSpanExporter,
+    "memory": InMemorySpanExporter,
+}
+
+
+def _exporter_from_env() -> Any:
+    name = os.environ.get("CALCULATOR_TRACE_EXPORTER", "none").lower()
+    if name in ("", "none"):
+        return None
+    if name not in EXPORTERS:
+        raise ValueError(f"不支持的追踪导出器: {name}")
+    return EXPORTERS[name]()
+
+
+_exporter = _exporter_from_env()
+
+
+def set_exporter(exporter: Any) -> Any:
+    """
+    设置导出器。
+
+    Args:
+        exporter: 有 export(spans) 方法的对象，None表示关闭追踪
+
+    Returns:
+        之前的导出器
+    """
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    return previous
+
+
+def get_exporter() -> Any:
+    """当前的导出器，未配置时为None"""
+    return _exporter
+
+
+def is_enabled() -> bool:
+    """是否配置了导出器"""
+    return _exporter is not None
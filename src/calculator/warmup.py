@@ -0,0 +1,222 @@
+"""
+预热程序。
+
+扩容或部署后，新实例处理前几个请求时要承担第一次调用的开销（路由的
+参数解析和校验、响应序列化、压缩等代码路径第一次执行）。预热程序在
+进程内直接调用ASGI应用，用示例参数把每个路由请求一遍，并报告耗时。
+
+预热请求的scope带有 WARMUP_SCOPE_KEY 标记，不计入准入控制的指标，
+不消耗限流配额，也不记录访问日志和追踪。会产生状态的路由（提交批量计算任务）
+和WebSocket不预热。
+
+触发方式：
+- Lambda：发送 {"warmup": true} 事件（或serverless-plugin-warmup的事件），
+  见 calculator.lambda_handler
+- 服务进程：calculator.server 启动时在fork工作进程之前执行，
+  设置 CALCULATOR_WARMUP=0 或使用 --no-warmup 关闭
+- Lambda初始化阶段：calculator.lifecycle 的预热阶段
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlencode
+
+from starlette.routing import Route
+
+from .admission import WARMUP_SCOPE_KEY
+from .core import OPERATIONS
+
+
+class WarmupRequest(NamedTuple):
+    """一个预热请求"""
+
+    method: str
+    path: str
+    query: Optional[Dict[str, Any]] = None
+    body: Optional[Any] = None
+    # 期望的响应状态码
+    status: int = 200
+
+
+_MATRIX = [[1.0, 2.0], [3.0, 4.0]]
+
+# 不由运算注册表生成的路由的预热请求，键为 (方法, 路由路径)
+EXAMPLES: Dict[Tuple[str, str], WarmupRequest] = {
+    ("POST", "/int/factorial"): WarmupRequest("POST", "/int/factorial", body={"n": 20}),
+    ("POST", "/int/binomial"): WarmupRequest(
+        "POST", "/int/binomial", body={"n": 10, "k": 3}
+    ),
+    ("POST", "/int/powmod"): WarmupRequest(
+        "POST", "/int/powmod", body={"base": 4, "exponent": 13, "modulus": 497}
+    ),
+    ("POST", "/int/is_prime"): WarmupRequest("POST", "/int/is_prime", body={"n": 97}),
+    ("POST", "/matrix/multiply"): WarmupRequest(
+        "POST", "/matrix/multiply", body={"a": _MATRIX, "b": _MATRIX}
+    ),
+    ("POST", "/matrix/transpose"): WarmupRequest(
+        "POST", "/matrix/transpose", body={"a": _MATRIX}
+    ),
+    ("POST", "/matrix/det"): WarmupRequest("POST", "/matrix/det", body={"a": _MATRIX}),
+    ("POST", "/matrix/solve"): WarmupRequest(
+        "POST", "/matrix/solve", body={"a": _MATRIX, "b": [1.0, 2.0]}
+    ),
+    # 查询不存在的任务，只预热路由和参数解析，不创建任务
+    ("GET", "/jobs/{job_id}"): WarmupRequest("GET", "/jobs/warmup", status=404),
+    ("GET", "/jobs/{job_id}/results"): WarmupRequest(
+        "GET", "/jobs/warmup/results", status=404
+    ),
+}
+
+# 不预热的路由：提交任务会创建任务并启动工作线程
+SKIPPED = frozenset({("POST", "/jobs")})
+
+
+def build_requests(app: Any) -> Tuple[List[WarmupRequest], List[str]]:
+    """
+    为应用的每个HTTP路由生成预热请求。
+
+    Args:
+        app: ASGI应用
+
+    Returns:
+        (预热请求, 没有预热请求的路由)
+    """
+    requests: List[WarmupRequest] = []
+    missing: List[str] = []
+    for route in app.routes:
+        if not isinstance(route, Route):
+            continue
+        for method in sorted(route.methods or ()):
+            if method == "HEAD" or (method, route.path) in SKIPPED:
+                continue
+            request = _request_for(method, route.path)
+            if request is None:
+                missing.append(f"{method} {route.path}")
+            else:
+                requests.append(request)
+    return requests, missing
+
+
+def _request_for(method: str, path: str) -> Optional[WarmupRequest]:
+    if (method, path) in EXAMPLES:
+        return EXAMPLES[method, path]
+    op = OPERATIONS.get(path[1:])
+    if op is not None:
+        params = dict(zip(op.params + op.optional, op.example))
+        if method == "POST":
+            return WarmupRequest(method, path, body=params)
+        return WarmupRequest(method, path, query=params)
+    if method == "GET" and "{" not in path:
+        return WarmupRequest(method, path)
+    return None
+
+
+async def request(app: Any, warmup_request: WarmupRequest) -> int:
+    """
+    在进程内直接调用ASGI应用处理一个预热请求。
+
+    Returns:
+        响应状态码
+    """
+    body = b""
+    headers = [(b"accept-encoding", b"gzip")]
+    if warmup_request.body is not None:
+        body = json.dumps(warmup_request.body).encode()
+        headers.append((b"content-type", b"application/json"))
+    headers.append((b"content-length", str(len(body)).encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": warmup_request.method,
+        "scheme": "http",
+        "path": warmup_request.path,
+        "raw_path": warmup_request.path.encode(),
+        "root_path": "",
+        "query_string": urlencode(warmup_request.query or {}).encode(),
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+        WARMUP_SCOPE_KEY: True,
+    }
+    received = False
+    status = 0
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def warm_up(app: Any) -> Dict[str, Any]:
+    """
+    依次请求应用的每个路由。
+
+    Args:
+        app: ASGI应用
+
+    Returns:
+        预热报告：请求数、总耗时（毫秒）、各路由耗时、状态码不符合预期的
+        路由和没有预热请求的路由
+    """
+    requests, missing = build_requests(app)
+    timings: Dict[str, float] = {}
+    failed: List[str] = []
+    start = time.perf_counter()
+    for warmup_request in requests:
+        name = f"{warmup_request.method} {warmup_request.path}"
+        begin = time.perf_counter()
+        try:
+            status = await request(app, warmup_request)
+        except Exception as e:
+            failed.append(f"{name}: {e}")
+            continue
+        timings[name] = (time.perf_counter() - begin) * 1000
+        if status != warmup_request.status:
+            failed.append(f"{name}: {status}")
+    return {
+        "requests": len(requests),
+        "duration_ms": (time.perf_counter() - start) * 1000,
+        "routes": timings,
+        "failed": failed,
+        "missing": missing,
+    }
+
+
+def run_warm_up(app: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    在新的事件循环中执行预热（不能在运行中的事件循环里调用）。
+
+    Args:
+        app: ASGI应用，默认为 calculator.api.app
+
+    Returns:
+        预热报告，见 warm_up
+    """
+    if app is None:
+        from .api import app
+    # 不使用asyncio.run：它会清除当前线程的事件循环，之后Mangum无法获取事件循环
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(warm_up(app))
+    finally:
+        loop.close()
+
+
+def is_warmup_event(event: Any) -> bool:
+    """是否为Lambda预热事件：{"warmup": true} 或serverless-plugin-warmup发送的事件"""
+    return isinstance(event, dict) and (
+        event.get("warmup") is True or event.get("source") == "serverless-plugin-warmup"
+    )
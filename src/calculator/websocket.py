@@ -0,0 +1,251 @@
+"""
+WebSocket计算接口。
+
+客户端在一个连接上连续发送计算消息，不必等待上一条的结果：
+
+    {"id": 1, "operation": "add", "a": 1, "b": 2}
+    {"id": 2, "operation": "sqrt", "value": 16}
+    {"id": 3, "operation": "int/factorial", "n": 1000}
+
+参数名与对应的REST接口一致。每条消息单独回复，回复按完成顺序发送，
+不保证与请求顺序一致，客户端按id匹配：
+
+    {"id": 1, "result": 3.0}
+    {"id": 2, "error": "..."}
+
+大整数运算（int/*）可能耗时较长，在专用的线程池中执行，不阻塞后续消息；
+结果以十进制字符串返回。线程池的线程数固定（BIG_INTEGER_WORKERS），所有
+连接共用，每个连接同时排队和执行的大整数运算也有上限（MAX_BIG_INFLIGHT）。
+线程中已经开始的计算无法中断，客户端断开时只丢弃还在排队的运算，
+线程数上限保证了断开的连接留下的计算不会无限占用CPU。
+
+背压：每个连接同时处理的消息数和待发送的回复数都有上限。客户端
+不读取回复时，待发送队列填满，处理中的消息无法完成，服务端随之
+停止读取新消息，由TCP流量控制让客户端的发送变慢。
+"""
+
+import asyncio
+import atexit
+import json
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from starlette.websockets import WebSocket
+
+from . import integer
+from .core import OPERATIONS as _CORE_OPERATIONS
+
+# 每个连接同时处理的最大消息数
+MAX_INFLIGHT = 256
+# 每个连接待发送的最大回复数
+MAX_PENDING_REPLIES = 256
+# 大整数运算线程池的线程数，所有连接共用
+BIG_INTEGER_WORKERS = 4
+# 每个连接同时排队和执行的最大大整数运算数
+MAX_BIG_INFLIGHT = 4
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """获取大整数运算共用的线程池，第一次使用时创建"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=BIG_INTEGER_WORKERS, thread_name_prefix="calculator-ws"
+            )
+        return _executor
+
+
+def shutdown() -> None:
+    """关闭大整数运算的线程池，丢弃还在排队的运算"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+atexit.register(shutdown)
+
+
+class _Operation(NamedTuple):
+    func: Callable[..., Any]
+    params: Tuple[str, ...]
+    optional: Tuple[str, ...] = ()
+    # 大整数运算：参数可以是十进制字符串，在线程中执行，整数结果以字符串返回
+    big: bool = False
+
+
+def _build_operations() -> Dict[str, _Operation]:
+    operations = {
+        name: _Operation(op.scalar, op.params, op.optional)
+        for name, op in _CORE_OPERATIONS.items()
+    }
+    operations["int/factorial"] = _Operation(integer.factorial, ("n",), big=True)
+    operations["int/binomial"] = _Operation(integer.binomial, ("n", "k"), big=True)
+    operations["int/powmod"] = _Operation(
+        integer.pow_mod, ("base", "exponent", "modulus"), big=True
+    )
+    operations["int/is_prime"] = _Operation(integer.is_prime, ("n",), big=True)
+    return operations
+
+
+OPERATIONS = _build_operations()
+
+
+def _argument(name: str, value: Any, big: bool) -> Any:
+    if big and isinstance(value, str):
+        return integer.parse_integer(value)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"参数 {name} 必须是数值")
+    if big and not isinstance(value, int):
+        raise ValueError(f"参数 {name} 必须是整数")
+    # json.loads 接受NaN、Infinity和超出范围的数值，与REST接口一样拒绝
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError(f"参数 {name} 必须是有限数值（当前输入值: {value}）")
+    return value
+
+
+def parse_message(message: Any) -> Tuple[_Operation, List[Any]]:
+    """
+    检查计算消息并取出运算和参数。
+
+    Args:
+        message: 解析后的JSON消息
+
+    Returns:
+        (运算, 按顺序排列的参数)
+
+    Raises:
+        ValueError: 消息格式错误、运算不支持或参数缺失时抛出
+    """
+    if not isinstance(message, dict):
+        raise ValueError("消息必须是JSON对象")
+    operation = OPERATIONS.get(message.get("operation"))
+    if operation is None:
+        raise ValueError(f"不支持的运算: {message.get('operation')}")
+    args = []
+    for name in operation.params:
+        if name not in message:
+            raise ValueError(f"缺少参数: {name}")
+        args.append(_argument(name, message[name], operation.big))
+    for name in operation.optional:
+        value = message.get(name)
+        args.append(None if value is None else _argument(name, value, operation.big))
+    return operation, args
+
+
+def _result(value: Any, big: bool) -> Any:
+    if big and isinstance(value, int) and not isinstance(value, bool):
+        return integer.to_decimal_string(value)
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError(f"计算结果超出范围（当前结果: {value}）")
+    return value
+
+
+class CalculationSession:
+    """
+    一个WebSocket连接上的计算会话。
+
+    Args:
+        websocket: WebSocket连接
+        max_inflight: 同时处理的最大消息数
+        max_pending_replies: 待发送的最大回复数
+        max_big_inflight: 同时排队和执行的最大大整数运算数
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_inflight: int = MAX_INFLIGHT,
+        max_pending_replies: int = MAX_PENDING_REPLIES,
+        max_big_inflight: int = MAX_BIG_INFLIGHT,
+    ):
+        self.websocket = websocket
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._big_slots = asyncio.Semaphore(max_big_inflight)
+        self._replies: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(
+            max_pending_replies
+        )
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def run(self) -> None:
+        """接受连接并处理消息，直到客户端断开"""
+        await self.websocket.accept()
+        writer = asyncio.create_task(self._write())
+        try:
+            while True:
+                # 处理中的消息达到上限时暂停读取，形成背压
+                await self._slots.acquire()
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    self._slots.release()
+                    break
+                data = message.get("text")
+                if data is None:
+                    data = message.get("bytes", b"")
+                task = asyncio.create_task(self._handle(data))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            # 客户端已经断开，未完成的计算和回复直接丢弃
+            for task in list(self._tasks):
+                task.cancel()
+            writer.cancel()
+            await asyncio.gather(writer, *self._tasks, return_exceptions=True)
+
+    async def _handle(self, data: Any) -> None:
+        try:
+            await self._replies.put(await self.evaluate(data))
+        finally:
+            self._slots.release()
+
+    async def evaluate(self, data: Any) -> Dict[str, Any]:
+        """
+        计算一条消息并生成回复。
+
+        Args:
+            data: 消息的原始文本或字节
+
+        Returns:
+            包含id和result（或error）的回复
+        """
+        try:
+            message = json.loads(data)
+        except ValueError:
+            return {"id": None, "error": "消息不是有效的JSON"}
+        message_id: Optional[Any] = (
+            message.get("id") if isinstance(message, dict) else None
+        )
+        try:
+            operation, args = parse_message(message)
+            if operation.big:
+                # 取消等待时，还在线程池中排队的运算随之取消
+                async with self._big_slots:
+                    loop = asyncio.get_running_loop()
+                    value = await loop.run_in_executor(
+                        _get_executor(), operation.func, *args
+                    )
+            else:
+                value = operation.func(*args)
+            return {"id": message_id, "result": _result(value, operation.big)}
+        except Exception as e:
+            return {"id": message_id, "error": str(e)}
+
+    async def _write(self) -> None:
+        while True:
+            reply = await self._replies.get()
+            try:
+                text = json.dumps(reply, separators=(",", ":"), allow_nan=False)
+            except ValueError:
+                # 消息的id中有inf或nan时，回复无法用标准JSON表示
+                text = json.dumps(
+                    {"id": None, "error": "消息的id必须是有效的JSON值"},
+                    separators=(",", ":"),
+                )
+            await self.websocket.send_text(text)
@@ -0,0 +1,327 @@
+"""
+访问日志测试模块。
+"""
+
+import asyncio
+import gc
+import io
+import json
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from calculator import accesslog, api
+from calculator import lambda_handler as lambda_module
+from calculator.accesslog import (
+    DEFAULT_SAMPLE_RATE,
+    FIELDS,
+    AccessLogMiddleware,
+    AccessLogWriter,
+    parse_route_rates,
+)
+from calculator.admission import WARMUP_SCOPE_KEY
+from calculator.lifecycle import request_event
+
+
+def _logged(sample_rate=1.0, **kwargs):
+    """用写入StringIO的写入器包装 calculator.api 的应用，默认全量记录"""
+    stream = io.StringIO()
+    app = AccessLogMiddleware(
+        api.app,
+        sample_rate=sample_rate,
+        log_writer=AccessLogWriter(stream),
+        enabled=True,
+        **kwargs,
+    )
+    return app, stream
+
+
+def _entries(app, stream):
+    app.writer.flush()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+async def _request(app, method, path, **kwargs):
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        return await client.request(method, path, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_entry_fields():
+    """测试日志字段：路由、运算、状态码、耗时和请求/响应大小"""
+    app, stream = _logged()
+    response = await _request(app, "POST", "/add", json={"a": 1, "b": 2})
+    [entry] = _entries(app, stream)
+    assert tuple(entry) == FIELDS
+    assert entry["method"] == "POST"
+    assert entry["path"] == entry["route"] == "/add"
+    assert entry["operation"] == "addition"
+    assert entry["status"] == 200
+    assert entry["latency_ms"] > 0
+    assert entry["request_bytes"] == len(response.request.content)
+    assert entry["response_bytes"] == len(response.content)
+    assert entry["cache"] is None
+
+
+@pytest.mark.asyncio
+async def test_entry_route_template_and_cache():
+    """测试记录路由模板，以及可缓存响应的缓存命中情况"""
+    app, stream = _logged()
+    first = await _request(app, "GET", "/sqrt", params={"value": 16})
+    await _request(
+        app,
+        "GET",
+        "/sqrt",
+        params={"value": 16},
+        headers={"If-None-Match": first.headers["etag"]},
+    )
+    await _request(app, "GET", "/jobs/unknown")
+    miss, hit, job = _entries(app, stream)
+    assert (miss["cache"], hit["cache"]) == ("miss", "hit")
+    assert hit["status"] == 304
+    assert job["route"] == "/jobs/{job_id}"
+    assert job["status"] == 404
+
+
+@pytest.mark.asyncio
+async def test_sampling_by_route():
+    """测试按路径的采样率，/health 默认不记录"""
+    app, stream = _logged(route_rates={"/add": 0.0})
+    await _request(app, "POST", "/add", json={"a": 1, "b": 2})
+    await _request(app, "GET", "/health")
+    await _request(app, "POST", "/subtract", json={"a": 1, "b": 2})
+    assert [entry["path"] for entry in _entries(app, stream)] == ["/subtract"]
+
+
+@pytest.mark.asyncio
+async def test_server_errors_are_always_logged():
+    """测试采样率为0时，5xx响应和处理异常的请求仍然记录"""
+    inner = FastAPI()
+    inner.get("/unavailable")(lambda: JSONResponse({"detail": "忙"}, status_code=503))
+
+    @inner.get("/broken")
+    def broken():
+        raise RuntimeError("broken")
+
+    stream = io.StringIO()
+    app = AccessLogMiddleware(
+        inner, sample_rate=0.0, log_writer=AccessLogWriter(stream), enabled=True
+    )
+    await _request(app, "GET", "/unavailable")
+    with pytest.raises(RuntimeError):
+        await _request(app, "GET", "/broken")
+    entries = _entries(app, stream)
+    assert [(entry["path"], entry["status"]) for entry in entries] == [
+        ("/unavailable", 503),
+        ("/broken", 500),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_warmup_requests_are_not_logged():
+    """测试预热请求不记录"""
+    app, stream = _logged()
+    scope = {"type": "http", "method": "GET", "path": "/health", WARMUP_SCOPE_KEY: True}
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    inner = AccessLogMiddleware(
+        lambda scope, receive, send: send({"type": "http.response.start"}),
+        log_writer=app.writer,
+        enabled=True,
+    )
+    await inner(scope, None, send)
+    assert sent and _entries(app, stream) == []
+
+
+def test_writer_drops_when_queue_is_full():
+    """测试队列已满时丢弃日志并计数"""
+    stream = io.StringIO()
+    writer = AccessLogWriter(stream, max_queue=1)
+    scope = {"method": "GET", "path": "/health", "headers": []}
+    for _ in range(3):
+        writer.write(0.0, 0.001, scope, [200, 2, []])
+    writer.flush()
+    assert len(stream.getvalue().splitlines()) == 1
+    assert writer.dropped == 2
+
+
+def test_writer_skips_malformed_entries():
+    """测试Content-Length不合法时请求大小记为0，无法格式化的记录跳过而不影响其他记录"""
+    stream = io.StringIO()
+    writer = AccessLogWriter(stream)
+    scope = {"method": "GET", "path": "/add", "headers": [(b"content-length", b"abc")]}
+    writer.write(0.0, 0.001, {"path": "/add", "headers": []}, [200, 2, []])
+    writer.write(0.0, 0.001, scope, [200, 2, []])
+    writer.flush()
+    [entry] = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert entry["request_bytes"] == 0
+
+
+def test_lambda_malformed_content_length(monkeypatch):
+    """测试Content-Length不合法的请求留在队列中时，Lambda调用结束写出访问日志不出错"""
+    stream = io.StringIO()
+    log_writer = AccessLogWriter(stream)
+    # 测试配置关闭了应用的访问日志，直接写入一条与该请求相同的记录
+    scope = {"method": "GET", "path": "/sqrt", "headers": [(b"content-length", b"abc")]}
+    log_writer.write(0.0, 0.001, scope, [200, 2, []])
+    monkeypatch.setattr(accesslog, "writer", log_writer)
+    monkeypatch.setattr(lambda_module, "FAST_PATH_ENABLED", False)
+    event = request_event("GET", "/sqrt", {"value": "16"})
+    event["headers"] = {"content-length": "abc"}
+    context = SimpleNamespace(
+        function_name="calculator",
+        memory_limit_in_mb=128,
+        invoked_function_arn="arn:aws:lambda:us-east-1:123456789012:function:calc",
+        aws_request_id="test",
+    )
+    assert lambda_module.lambda_handler(event, context)["statusCode"] == 200
+    assert json.loads(stream.getvalue())["request_bytes"] == 0
+
+
+def test_parse_route_rates():
+    """测试解析按路径的采样率配置"""
+    assert parse_route_rates("") == {}
+    assert parse_route_rates("/add=0.01, /health=0") == {"/add": 0.01, "/health": 0.0}
+    for value in ("add=0.1", "/add", "/add=2"):
+        with pytest.raises(ValueError):
+            parse_route_rates(value)
+
+
+def test_default_sample_rate(monkeypatch):
+    """测试未配置时按 DEFAULT_SAMPLE_RATE 采样"""
+    monkeypatch.delenv("CALCULATOR_ACCESS_LOG_SAMPLE", raising=False)
+    assert AccessLogMiddleware(api.app).sample_rate == DEFAULT_SAMPLE_RATE
+    monkeypatch.setenv("CALCULATOR_ACCESS_LOG_SAMPLE", "1")
+    assert AccessLogMiddleware(api.app).sample_rate == 1.0
+
+
+def test_disabled_by_env(monkeypatch):
+    """测试 CALCULATOR_ACCESS_LOG=0 时关闭访问日志"""
+    monkeypatch.setenv("CALCULATOR_ACCESS_LOG", "0")
+    monkeypatch.setenv("CALCULATOR_ACCESS_LOG_ROUTES", "/add=0.5")
+    middleware = AccessLogMiddleware(api.app)
+    assert middleware.enabled is False
+    assert middleware.route_rates["/add"] == 0.5
+
+
+# 性能测试：满载（并发请求）时关闭、全量记录和按10%（默认采样率）采样记录访问日志的耗时
+_BODY = json.dumps({"a": 1, "b": 2}).encode()
+_SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "POST",
+    "scheme": "http",
+    "path": "/add",
+    "raw_path": b"/add",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(_BODY)).encode()),
+    ],
+    "client": ("127.0.0.1", 50000),
+    "server": ("localhost", 80),
+}
+
+
+async def _call(app):
+    async def receive():
+        return {"type": "http.request", "body": _BODY, "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(dict(_SCOPE), receive, send)
+
+
+async def _load(app, concurrency=100):
+    await asyncio.gather(*(_call(app) for _ in range(concurrency)))
+
+
+@pytest.mark.benchmark(group="accesslog")
+@pytest.mark.parametrize("sample_rate", [None, 1.0, 0.1])
+def test_performance_access_log_overhead(benchmark, sample_rate):
+    """测试并发请求时访问日志的额外开销（None为关闭）"""
+    stream = io.StringIO()
+    app = AccessLogMiddleware(
+        api.app,
+        sample_rate=sample_rate or 0.0,
+        log_writer=AccessLogWriter(stream),
+        enabled=sample_rate is not None,
+    )
+    loop = asyncio.new_event_loop()
+
+    def run_load():
+        loop.run_until_complete(_load(app))
+
+    try:
+        benchmark(run_load)
+    finally:
+        loop.close()
+        app.writer.flush()
+
+
+# 默认配置相对关闭访问日志时的耗时比上限
+OVERHEAD_TARGET = 1.02
+
+
+async def _bare(scope, receive, send):
+    """只收发消息的最小应用，用于单独测量访问日志中间件的开销"""
+    await receive()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": b'{"result":3.0}'})
+
+
+def _request_times(apps, rounds, loads=5):
+    """
+    满载时各应用单个请求的最短耗时（秒），包括写出队列中的日志。
+
+    各应用交替运行，机器负载的波动对它们的影响相同。
+    """
+    loop = asyncio.new_event_loop()
+    best = [float("inf")] * len(apps)
+    try:
+        for _ in range(rounds):
+            for i, app in enumerate(apps):
+                gc.collect()
+                start = time.perf_counter()
+                for _ in range(loads):
+                    loop.run_until_complete(_load(app))
+                app.writer.flush()
+                best[i] = min(best[i], time.perf_counter() - start)
+    finally:
+        loop.close()
+    return [value / (loads * 100) for value in best]
+
+
+def test_default_overhead_within_target(monkeypatch):
+    """
+    测试满载时默认配置相对关闭访问日志的耗时比在2%以内。
+
+    一个请求约100微秒，2%只有约2微秒，小于整个应用多次测量之间的波动，
+    因此中间件的开销在只收发消息的最小应用上单独测量，再除以完整应用的请求耗时。
+    """
+    monkeypatch.delenv("CALCULATOR_ACCESS_LOG_SAMPLE", raising=False)
+    monkeypatch.delenv("CALCULATOR_ACCESS_LOG_ROUTES", raising=False)
+    [baseline] = _request_times([AccessLogMiddleware(api.app, enabled=False)], 10)
+    default = AccessLogMiddleware(
+        _bare, log_writer=AccessLogWriter(io.StringIO()), enabled=True
+    )
+    bare, logged = _request_times(
+        [AccessLogMiddleware(_bare, enabled=False), default], 50
+    )
+    assert 1 + (logged - bare) / baseline < OVERHEAD_TARGET
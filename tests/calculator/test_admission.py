@@ -0,0 +1,183 @@
+"""
+准入控制与自适应并发限制测试模块。
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from calculator.admission import AdmissionController, AdmissionMiddleware, AIMDLimit
+from calculator.api import app as api_app
+
+
+def test_limit_increases_when_saturated():
+    """测试耗时正常且并发接近上限时加性增加"""
+    limit = AIMDLimit(initial_limit=10)
+    for _ in range(100):
+        limit.update(0.01, inflight=10, now=0)
+    assert limit.limit > 10
+
+    idle = AIMDLimit(initial_limit=10)
+    for _ in range(100):
+        idle.update(0.01, inflight=1, now=0)
+    assert idle.limit == 10
+
+
+def test_limit_decreases_when_slow():
+    """测试耗时超过基线时乘性减少，每个基线耗时内最多减少一次"""
+    limit = AIMDLimit(initial_limit=100, min_limit=5)
+    limit.update(0.01, inflight=1, now=0)
+    limit.update(0.1, inflight=50, now=1.0)
+    assert limit.limit == 90
+    limit.update(0.1, inflight=50, now=1.0)
+    assert limit.limit == 90
+
+    for step in range(100):
+        limit.update(0.1, inflight=50, now=2.0 + step)
+    assert limit.limit == 5
+
+
+def test_limit_decreases_on_failure():
+    """测试请求异常结束时减少并发上限"""
+    limit = AIMDLimit(initial_limit=20)
+    limit.update(0.01, inflight=1, failed=True, now=0)
+    assert limit.limit == 18
+
+
+def _controller(limit=1, max_queue=2, queue_timeout=1.0):
+    return AdmissionController(
+        AIMDLimit(initial_limit=limit, min_limit=limit, max_limit=limit),
+        max_queue=max_queue,
+        queue_timeout=queue_timeout,
+    )
+
+
+@pytest.mark.asyncio
+async def test_queue_hands_over_in_order():
+    """测试释放许可时按排队顺序转交"""
+    controller = _controller()
+    assert await controller.acquire()
+
+    order = []
+
+    async def wait(name):
+        assert await controller.acquire()
+        order.append(name)
+
+    tasks = [asyncio.create_task(wait(name)) for name in ("first", "second")]
+    await asyncio.sleep(0)
+    assert controller.queue_depth == 2
+
+    controller.release(0.01, 1)
+    await asyncio.sleep(0.01)
+    assert order == ["first"]
+    controller.release(0.01, 1)
+    await asyncio.gather(*tasks)
+    assert order == ["first", "second"]
+    assert controller.inflight == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout_and_full_queue_shed():
+    """测试排队超时和队列已满时拒绝请求"""
+    controller = _controller(max_queue=1, queue_timeout=0.01)
+    assert await controller.acquire()
+
+    waiting = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+    assert not await controller.acquire()
+    assert not await waiting
+    assert controller.shed == 2
+    assert controller.queue_depth == 0
+    assert controller.inflight == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_queue():
+    """测试排队中的请求被取消时移出队列"""
+    controller = _controller()
+    assert await controller.acquire()
+    waiting = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert controller.queue_depth == 0
+    controller.release(0.01, 1)
+    assert controller.inflight == 0
+
+
+def _slow_app(controller, shed_status=503):
+    app = FastAPI()
+    app.add_middleware(
+        AdmissionMiddleware, controller=controller, shed_status=shed_status
+    )
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_middleware_sheds_excess_load():
+    """测试超出并发上限和队列的请求返回503和Retry-After"""
+    controller = _controller(limit=2, max_queue=1, queue_timeout=0.01)
+    app = _slow_app(controller)
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        responses = await asyncio.gather(*(client.get("/slow") for _ in range(6)))
+        health = await client.get("/health")
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200, 200, 503, 503, 503, 503]
+    shed = [response for response in responses if response.status_code == 503]
+    assert all(int(response.headers["retry-after"]) >= 1 for response in shed)
+    assert health.status_code == 200
+    assert controller.snapshot()["shed"] == 4
+    assert controller.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_middleware_shed_status_429():
+    """测试可以配置拒绝请求时返回429"""
+    controller = _controller(limit=1, max_queue=0)
+    app = _slow_app(controller, shed_status=429)
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        responses = await asyncio.gather(*(client.get("/slow") for _ in range(2)))
+    assert sorted(response.status_code for response in responses) == [200, 429]
+
+
+def test_metrics_endpoint():
+    """测试 /metrics 接口返回准入控制指标"""
+    client = TestClient(api_app)
+    client.post("/add", json={"a": 1, "b": 2})
+    admission = client.get("/metrics").json()["admission"]
+    assert admission["admitted"] >= 1
+    for key in ("limit", "inflight", "queue_depth", "queued", "shed"):
+        assert key in admission
+
+
+# 性能测试：准入控制中间件的额外开销
+_bare_app = FastAPI()
+_guarded_app = FastAPI()
+_guarded_app.add_middleware(AdmissionMiddleware)
+for _app in (_bare_app, _guarded_app):
+    _app.get("/ping")(lambda: {"ok": True})
+
+
+@pytest.mark.benchmark(group="admission")
+@pytest.mark.parametrize("guarded", [False, True])
+def test_performance_admission_overhead(benchmark, guarded):
+    """测试有无准入控制时单个请求的耗时"""
+    client = TestClient(_guarded_app if guarded else _bare_app)
+    with client:
+        benchmark(client.get, "/ping")
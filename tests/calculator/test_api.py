@@ -5,6 +5,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from calculator.api import app
+from calculator.core import OPERATIONS
 
 client = TestClient(app)
 
@@ -24,6 +25,15 @@ def test_health_check():
         ("/multiply", {"a": 4, "b": 3}, 12, "multiplication"),
         ("/divide", {"a": 6, "b": 2}, 3, "division"),
         ("/sqrt", {"value": 16}, 4, "square_root"),
+        ("/power", {"a": 2, "b": 10}, 1024, "power"),
+        ("/log", {"value": 8, "base": 2}, 3, "logarithm"),
+        ("/exp", {"value": 0}, 1, "exponential"),
+        ("/sin", {"value": 0}, 0, "sine"),
+        ("/cos", {"value": 0}, 1, "cosine"),
+        ("/tan", {"value": 0}, 0, "tangent"),
+        ("/gcd", {"a": 12, "b": 18}, 6, "gcd"),
+        ("/factorial", {"value": 20}, 2432902008176640000, "factorial"),
+        ("/modpow", {"base": 4, "exponent": 13, "modulus": 497}, 445, "modular_power"),
     ],
 )
 def test_calculation_endpoints(
@@ -52,6 +62,64 @@ def test_negative_sqrt():
     assert "当前输入值: -1" in response.json()["detail"]
 
 
+@pytest.mark.parametrize(
+    "endpoint,data,message",
+    [
+        ("/power", {"a": 0, "b": -1}, "0不能做负数次幂"),
+        ("/log", {"value": -1}, "不能计算非正数的对数"),
+        ("/exp", {"value": 1000}, "计算结果超出范围"),
+        ("/factorial", {"value": -3}, "不能计算负数的阶乘"),
+        ("/modpow", {"base": 2, "exponent": 3, "modulus": 0}, "模数不能为0"),
+        ("/modpow", {"base": 3, "exponent": 10**1000, "modulus": 7}, "输入过大"),
+    ],
+)
+def test_math_domain_errors(endpoint, data, message):
+    """测试扩展数学函数的定义域错误处理"""
+    response = client.post(endpoint, json=data)
+    assert response.status_code == 400
+    assert message in response.json()["detail"]
+
+
+def test_integer_endpoints():
+    """测试大整数接口以字符串返回精确结果"""
+    response = client.post("/int/factorial", json={"n": 30})
+    assert response.status_code == 200
+    assert response.json() == {
+        "result": "265252859812191058636308480000000",
+        "digits": 33,
+        "operation": "factorial",
+    }
+
+    response = client.post("/int/factorial", json={"n": "5000"})
+    assert response.json()["digits"] == 16326
+
+    response = client.post("/int/binomial", json={"n": 52, "k": 5})
+    assert response.json()["result"] == "2598960"
+
+    response = client.post(
+        "/int/powmod", json={"base": 3, "exponent": -1, "modulus": 7}
+    )
+    assert response.json()["result"] == "5"
+
+    response = client.post("/int/is_prime", json={"n": str(2**127 - 1)})
+    assert response.json() == {"result": True, "operation": "is_prime"}
+
+
+@pytest.mark.parametrize(
+    "endpoint,data,message",
+    [
+        ("/int/factorial", {"n": 10**6}, "计算结果过大"),
+        ("/int/factorial", {"n": "12a"}, "无效的整数"),
+        ("/int/powmod", {"base": 2, "exponent": -1, "modulus": 4}, "不可逆"),
+    ],
+)
+def test_integer_errors(endpoint, data, message):
+    """测试大整数接口的错误处理"""
+    response = client.post(endpoint, json=data)
+    assert response.status_code == 400
+    assert message in response.json()["detail"]
+
+
 @pytest.mark.parametrize(
     "endpoint,invalid_data",
     [
@@ -69,6 +137,15 @@ def test_invalid_input_handling(endpoint, invalid_data):
     assert response.status_code == 422
 
 
+@pytest.mark.parametrize("op", OPERATIONS.values(), ids=list(OPERATIONS))
+def test_registered_operation_routes(op):
+    """测试每个注册的运算都有POST和GET接口，结果与单次计算一致"""
+    params = dict(zip(op.params + op.optional, op.example))
+    expected = {"result": op.scalar(*op.example), "operation": op.label}
+    assert client.post(f"/{op.name}", json=params).json() == expected
+    assert client.get(f"/{op.name}", params=params).json() == expected
+
+
 @pytest.mark.asyncio
 async def test_concurrent_requests():
     """测试并发请求处理"""
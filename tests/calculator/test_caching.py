@@ -0,0 +1,139 @@
+"""
+HTTP缓存和条件请求测试模块。
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from calculator import api
+from calculator.api import app
+from calculator.caching import CACHE_CONTROL, etag_matches
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "path,params,body",
+    [
+        ("/add", {"a": 1, "b": 2}, {"a": 1, "b": 2}),
+        ("/divide", {"a": 6, "b": 4}, {"a": 6, "b": 4}),
+        ("/sqrt", {"value": 16}, {"value": 16}),
+        ("/log", {"value": 8, "base": 2}, {"value": 8, "base": 2}),
+        ("/gcd", {"a": 12, "b": 18}, {"a": 12, "b": 18}),
+        ("/modpow", {"base": 4, "exponent": 13, "modulus": 497}, None),
+    ],
+)
+def test_get_matches_post(path, params, body):
+    """测试GET接口与POST接口结果一致，并带有缓存头"""
+    response = client.get(path, params=params)
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == CACHE_CONTROL
+    assert response.headers["etag"].startswith('"')
+    post_body = body if body is not None else params
+    assert response.json() == client.post(path, json=post_body).json()
+
+
+def test_etag_depends_on_inputs():
+    """测试ETag只取决于运算和规范化后的输入"""
+    etag = client.get("/add?a=1&b=2").headers["etag"]
+    assert client.get("/add?a=1.0&b=2").headers["etag"] == etag
+    assert client.get("/add?b=2&a=1").headers["etag"] == etag
+    assert client.get("/add?a=1&b=3").headers["etag"] != etag
+    assert client.get("/subtract?a=1&b=2").headers["etag"] != etag
+
+
+def test_if_none_match_short_circuits(monkeypatch):
+    """测试If-None-Match匹配时返回304且不执行计算"""
+    etag = client.get("/multiply?a=3&b=4").headers["etag"]
+
+    def fail(a, b):
+        raise AssertionError("不应执行计算")
+
+    monkeypatch.setattr(api.OPERATIONS["multiply"], "scalar", fail)
+    response = client.get("/multiply?a=3&b=4", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert response.headers["cache-control"] == CACHE_CONTROL
+
+
+def test_if_none_match_mismatch():
+    """测试If-None-Match不匹配时正常计算"""
+    response = client.get("/add?a=1&b=2", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+    assert response.json()["result"] == 3
+
+
+def test_errors_not_cached():
+    """测试错误响应不带缓存头"""
+    response = client.get("/divide?a=1&b=0")
+    assert response.status_code == 400
+    assert "除数不能为0" in response.json()["detail"]
+    assert "etag" not in response.headers
+    assert "cache-control" not in response.headers
+
+
+@pytest.mark.parametrize(
+    "path,query,body,message",
+    [
+        ("/add", "a=inf&b=1", '{"a": Infinity, "b": 1}', "参数 a 必须是有限数值"),
+        ("/sqrt", "value=nan", '{"value": NaN}', "参数 value 必须是有限数值"),
+        ("/log", "value=8&base=-inf", '{"value": 8, "base": -Infinity}', "参数 base"),
+        ("/multiply", "a=1e200&b=1e200", '{"a": 1e200, "b": 1e200}', "计算结果超出范围"),
+    ],
+)
+def test_non_finite_rejected(path, query, body, message):
+    """测试输入或结果为inf、nan时GET和POST都返回400，错误响应不带缓存头"""
+    response = client.get(f"{path}?{query}")
+    assert response.status_code == 400
+    assert message in response.json()["detail"]
+    assert "etag" not in response.headers
+    headers = {"Content-Type": "application/json"}
+    response = client.post(path, content=body, headers=headers)
+    assert response.status_code == 400
+    assert message in response.json()["detail"]
+
+
+def test_unexpected_errors_not_client_errors(monkeypatch):
+    """测试运算声明之外的异常按服务端错误处理，不返回400"""
+
+    def broken(a, b):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(api.OPERATIONS["subtract"], "scalar", broken)
+    response = TestClient(app, raise_server_exceptions=False).get("/subtract?a=1&b=2")
+    assert response.status_code == 500
+    assert "etag" not in response.headers
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    [
+        (None, False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"x", "abc"', True),
+        ("*", True),
+        ('"abcd"', False),
+    ],
+)
+def test_etag_matches(header, expected):
+    """测试If-None-Match请求头解析"""
+    assert etag_matches(header, '"abc"') is expected
+
+
+# 性能测试：对比完整计算和条件请求命中
+@pytest.mark.benchmark(group="caching")
+def test_performance_get_full(benchmark):
+    """测试无缓存时GET请求的耗时"""
+    benchmark(client.get, "/power?a=2&b=0.5")
+
+
+@pytest.mark.benchmark(group="caching")
+def test_performance_get_not_modified(benchmark):
+    """测试If-None-Match命中时GET请求的耗时"""
+    etag = client.get("/power?a=2&b=0.5").headers["etag"]
+    response = benchmark(
+        client.get, "/power?a=2&b=0.5", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
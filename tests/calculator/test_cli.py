@@ -0,0 +1,96 @@
+"""
+离线批量计算命令行测试模块。
+"""
+
+import csv
+import io
+
+import pytest
+
+from calculator import cli
+
+
+def _write(tmp_path, text):
+    path = tmp_path / "input.csv"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def _run(path, **kwargs):
+    output = io.StringIO()
+    stats = cli.run(path, output, **kwargs)
+    return stats, list(csv.DictReader(io.StringIO(output.getvalue())))
+
+
+def test_run_results(tmp_path):
+    """测试各运算的计算结果"""
+    path = _write(
+        tmp_path,
+        "op,a,b\nadd,1,2\nsubtract,5,3\nmultiply,4,3\ndivide,6,2\nsqrt,16,\n",
+    )
+    stats, rows = _run(path)
+    assert stats.rows == 5
+    assert stats.errors == 0
+    assert [float(row["result"]) for row in rows] == [3, 2, 12, 3, 4]
+
+
+def test_run_row_errors(tmp_path):
+    """测试出错的行单独标记，不影响同组其他行"""
+    path = _write(
+        tmp_path,
+        "op,a,b\ndivide,1,0\ndivide,4,2\nsqrt,-1\npow,1,2\nadd,x,1\nadd,1,\n",
+    )
+    stats, rows = _run(path)
+    assert stats.errors == 5
+    assert "除数不能为0" in rows[0]["error"]
+    assert rows[1]["result"] == "2.0"
+    assert "当前输入值: -1" in rows[2]["error"]
+    assert "不支持的运算" in rows[3]["error"]
+    assert "无效的数值" in rows[4]["error"]
+    assert "操作数个数不正确" in rows[5]["error"]
+
+
+def test_run_keeps_order_across_chunks(tmp_path):
+    """测试分块处理时输出顺序与输入一致"""
+    lines = ["op,a,b"] + [
+        f"add,{i},1" if i % 2 else f"sqrt,{i * i}," for i in range(25)
+    ]
+    path = _write(tmp_path, "\n".join(lines) + "\n")
+    stats, rows = _run(path, chunk_size=4)
+    assert stats.rows == 25
+    assert [float(row["result"]) for row in rows] == [
+        i + 1 if i % 2 else i for i in range(25)
+    ]
+
+
+def test_missing_columns(tmp_path):
+    """测试缺少必要的列"""
+    path = _write(tmp_path, "op,x,y\nadd,1,2\n")
+    with pytest.raises(ValueError) as exc_info:
+        _run(path)
+    assert "缺少必要的列" in str(exc_info.value)
+
+
+def test_main_exit_codes(tmp_path, capsys):
+    """测试命令行退出码和输出文件"""
+    good = _write(tmp_path, "op,a,b\nadd,1,2\n")
+    output = tmp_path / "out.csv"
+    assert cli.main([good, "-o", str(output), "--quiet"]) == 0
+    assert "3.0" in output.read_text(encoding="utf-8")
+    assert "行/秒" in capsys.readouterr().err
+
+    bad = tmp_path / "bad.csv"
+    bad.write_text("op,a,b\ndivide,1,0\n", encoding="utf-8")
+    assert cli.main([str(bad), "-o", str(output), "--quiet"]) == 1
+    assert cli.main([str(tmp_path / "missing.csv"), "--quiet"]) == 2
+
+
+# 性能测试
+@pytest.mark.benchmark(group="cli")
+def test_performance_run(benchmark, tmp_path):
+    """测试批量处理吞吐量"""
+    operations = ["add", "subtract", "multiply", "divide"]
+    lines = ["op,a,b"] + [f"{operations[i % 4]},{i},{i % 7 + 1}" for i in range(20_000)]
+    path = _write(tmp_path, "\n".join(lines) + "\n")
+    stats = benchmark(cli.run, path, io.StringIO())
+    assert stats.rows == 20_000
@@ -0,0 +1,182 @@
+"""
+HTTP压缩中间件测试模块。
+"""
+
+import gzip
+import json
+import zlib
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from calculator.compression import CompressionMiddleware, choose_encoding
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=100, max_request_size=10_000)
+
+
+@app.get("/numbers/{count}")
+async def numbers(count: int):
+    return {"result": [i * 0.5 for i in range(count)]}
+
+
+@app.get("/etag")
+async def etag(request: Request):
+    from calculator.caching import cached_response
+
+    return cached_response(
+        request, lambda: {"result": list(range(200))}, 1, errors=(ValueError,)
+    )
+
+
+@app.post("/echo")
+async def echo(request: Request):
+    body = await request.body()
+    return {"size": len(body), "encoding": request.headers.get("content-encoding")}
+
+
+client = TestClient(app)
+
+
+def _get(path, encoding="gzip", **headers):
+    return client.get(path, headers={"Accept-Encoding": encoding, **headers})
+
+
+def test_large_response_compressed():
+    """测试超过阈值的响应被压缩"""
+    response = _get("/numbers/1000")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert len(response.json()["result"]) == 1000
+
+
+def test_small_response_not_compressed():
+    """测试小于阈值的响应不压缩"""
+    response = _get("/numbers/2")
+    assert "content-encoding" not in response.headers
+
+
+def test_identity_not_compressed():
+    """测试客户端不接受压缩时不压缩"""
+    response = _get("/numbers/1000", encoding="identity")
+    assert "content-encoding" not in response.headers
+    response = _get("/numbers/1000", encoding="gzip;q=0")
+    assert "content-encoding" not in response.headers
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    [
+        (None, None),
+        ("gzip", "gzip"),
+        ("deflate, gzip;q=0.5", "gzip"),
+        ("*", "gzip"),
+        ("gzip;q=0, *", None),
+        ("identity", None),
+    ],
+)
+def test_choose_encoding(header, expected, monkeypatch):
+    """测试Accept-Encoding协商"""
+    monkeypatch.setattr("calculator.compression.brotli", None)
+    assert choose_encoding(header) == expected
+
+
+def test_compressed_etag_roundtrip():
+    """测试压缩响应的ETag带编码后缀，条件请求仍能命中"""
+    plain = _get("/etag", encoding="identity").headers["etag"]
+    response = _get("/etag")
+    assert response.headers["etag"] == plain[:-1] + '-gzip"'
+
+    response = _get("/etag", **{"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+    assert response.headers["etag"] == plain[:-1] + '-gzip"'
+
+
+def test_request_decompression():
+    """测试gzip和deflate请求体被解压"""
+    payload = json.dumps({"a": list(range(500))}).encode()
+    for encoding, data in (
+        ("gzip", gzip.compress(payload)),
+        ("deflate", zlib.compress(payload)),
+    ):
+        response = client.post(
+            "/echo", content=data, headers={"Content-Encoding": encoding}
+        )
+        assert response.json() == {"size": len(payload), "encoding": None}
+
+
+@pytest.mark.parametrize(
+    "headers,content,status",
+    [
+        ({"Content-Encoding": "gzip"}, gzip.compress(b"0" * 20_000), 413),
+        ({"Content-Encoding": "gzip"}, b"not gzip", 400),
+        ({"Content-Encoding": "gzip"}, gzip.compress(b"x" * 500)[:-10], 400),
+        ({"Content-Encoding": "compress"}, b"data", 415),
+    ],
+)
+def test_request_decompression_errors(headers, content, status):
+    """测试压缩炸弹、损坏数据和不支持的编码"""
+    response = client.post("/echo", content=content, headers=headers)
+    assert response.status_code == status
+
+
+@pytest.mark.parametrize(
+    "payload,status",
+    [
+        (json.dumps({"a": list(range(500))}).encode(), 200),
+        (b"0" * (50 * 1024 * 1024), 413),
+    ],
+)
+def test_brotli_request_decompression(payload, status):
+    """测试br请求体被解压，压缩炸弹边解压边计数，超出上限时返回413"""
+    brotli = pytest.importorskip("brotli")
+    if not hasattr(brotli.Decompressor, "can_accept_more_data"):
+        pytest.skip("需要brotli 1.2及以上")
+    response = client.post(
+        "/echo", content=brotli.compress(payload), headers={"Content-Encoding": "br"}
+    )
+    assert response.status_code == status
+    if status == 200:
+        assert response.json() == {"size": len(payload), "encoding": None}
+
+
+def test_brotli_request_unsupported_without_output_limit(monkeypatch):
+    """测试brotli解压器无法限制输出（1.2之前）时br请求体返回415"""
+
+    class Decompressor:
+        pass
+
+    monkeypatch.setattr(
+        "calculator.compression.brotli",
+        type("brotli", (), {"Decompressor": Decompressor}),
+    )
+    response = client.post("/echo", content=b"data", headers={"Content-Encoding": "br"})
+    assert response.status_code == 415
+
+
+def test_api_compresses_large_responses():
+    """测试计算器API的大响应被压缩，小响应不压缩"""
+    from calculator.api import app as api_app
+
+    api_client = TestClient(api_app)
+    matrix = [[float(i + j) for j in range(40)] for i in range(40)]
+    response = api_client.post(
+        "/matrix/transpose", json={"a": matrix}, headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.headers["content-encoding"] == "gzip"
+
+    response = api_client.get("/add?a=1&b=2", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+# 性能测试：不同大小的响应压缩与不压缩的耗时，压缩后字节数记录在extra_info中
+@pytest.mark.benchmark(group="compression")
+@pytest.mark.parametrize("count", [10, 1_000, 100_000])
+@pytest.mark.parametrize("encoding", ["identity", "gzip"])
+def test_performance_compression(benchmark, count, encoding):
+    """测试响应压缩的CPU开销和传输字节数"""
+    response = benchmark(_get, f"/numbers/{count}", encoding)
+    benchmark.extra_info["body_bytes"] = len(response.content)
+    benchmark.extra_info["wire_bytes"] = int(response.headers["content-length"])
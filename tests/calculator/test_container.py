@@ -0,0 +1,110 @@
+"""
+容器镜像测试模块。
+
+需要本机可以使用docker，否则跳过。
+"""
+
+import http.client
+import os
+import shutil
+import socket
+import subprocess
+import time
+import uuid
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+IMAGE = "python-serverless-demo:test"
+
+
+def _docker_available() -> bool:
+    if shutil.which("docker") is None:
+        return False
+    result = subprocess.run(["docker", "info"], capture_output=True)
+    return result.returncode == 0
+
+
+pytestmark = pytest.mark.skipif(not _docker_available(), reason="需要docker")
+
+
+def _docker(*args, timeout=60) -> str:
+    result = subprocess.run(
+        ["docker", *args], capture_output=True, text=True, check=True, timeout=timeout
+    )
+    return result.stdout.strip()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _healthy(port: int) -> bool:
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+        conn.request("GET", "/health")
+        return conn.getresponse().status == 200
+    except OSError:
+        return False
+
+
+def _start(image: str, timeout: float = 30) -> str:
+    """启动容器并等待 /health 返回200，返回容器名"""
+    port = _free_port()
+    name = f"calculator-test-{uuid.uuid4().hex[:8]}"
+    _docker(
+        "run",
+        "-d",
+        "--rm",
+        "--name",
+        name,
+        "-e",
+        "CALCULATOR_WORKERS=1",
+        "-p",
+        f"127.0.0.1:{port}:8000",
+        image,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if _healthy(port):
+            return name
+        time.sleep(0.02)
+    _docker("rm", "-f", name)
+    raise TimeoutError("容器未能在规定时间内通过健康检查")
+
+
+@pytest.fixture(scope="module")
+def image():
+    """构建镜像"""
+    _docker("build", "-t", IMAGE, ROOT, timeout=1800)
+    return IMAGE
+
+
+def test_image_contents(image):
+    """测试运行镜像只包含运行依赖和预编译的应用代码，以非root用户运行"""
+    script = (
+        "import importlib.util, os, calculator.api;"
+        "print(importlib.util.find_spec('poetry') is None);"
+        "print(os.path.isdir('/opt/app/calculator/__pycache__'));"
+        "print(os.getuid() != 0)"
+    )
+    output = _docker("run", "--rm", image, "python", "-c", script)
+    assert output.split() == ["True", "True", "True"]
+
+
+# 性能测试：从启动容器到 /health 第一次返回200的耗时
+@pytest.mark.benchmark(group="container")
+def test_performance_container_start(benchmark, image):
+    """测试从docker run到第一次健康检查成功的耗时"""
+    containers = []
+
+    def start():
+        containers.append(_start(image))
+
+    try:
+        benchmark.pedantic(start, rounds=3, iterations=1)
+    finally:
+        for name in containers:
+            subprocess.run(["docker", "rm", "-f", name], capture_output=True)
@@ -4,7 +4,25 @@
 
 import sys
 import pytest
+import math
 from calculator import add, subtract, multiply, divide, sqrt
+from calculator import power, log, exp, sin, cos, tan, gcd, factorial, modpow
+from calculator.core import (
+    add_many,
+    subtract_many,
+    multiply_many,
+    divide_many,
+    sqrt_many,
+    power_many,
+    log_many,
+    exp_many,
+    sin_many,
+    gcd_many,
+    factorial_many,
+    modpow_many,
+    evaluate_many,
+    OPERATIONS,
+)
 
 
 # 基本功能测试
@@ -57,6 +75,185 @@ def test_sqrt():
     assert "当前输入值: -1" in str(exc_info.value)
 
 
+def test_power():
+    """测试乘方功能"""
+    assert power(2, 10) == 1024
+    assert power(-2, 3) == -8
+    assert power(4, 0.5) == 2
+    assert power(0, 0) == 1
+
+    with pytest.raises(ZeroDivisionError) as exc_info:
+        power(0, -1)
+    assert "底数=0, 指数=-1" in str(exc_info.value)
+    with pytest.raises(ValueError) as exc_info:
+        power(-8, 0.5)
+    assert "底数=-8, 指数=0.5" in str(exc_info.value)
+    with pytest.raises(OverflowError):
+        power(10, 400)
+
+
+def test_log_and_exp():
+    """测试对数和指数功能"""
+    assert log(math.e) == pytest.approx(1)
+    assert log(8, 2) == pytest.approx(3)
+    assert exp(0) == 1
+    assert exp(1) == pytest.approx(math.e)
+
+    with pytest.raises(ValueError) as exc_info:
+        log(0)
+    assert "当前输入值: 0" in str(exc_info.value)
+    with pytest.raises(ValueError) as exc_info:
+        log(8, 1)
+    assert "当前底数: 1" in str(exc_info.value)
+    with pytest.raises(OverflowError) as exc_info:
+        exp(1000)
+    assert "当前输入值: 1000" in str(exc_info.value)
+
+
+def test_trigonometry():
+    """测试三角函数功能"""
+    assert sin(0) == 0
+    assert cos(0) == 1
+    assert tan(math.pi / 4) == pytest.approx(1)
+    assert sin(math.pi / 2) == pytest.approx(1)
+
+    with pytest.raises(ValueError) as exc_info:
+        cos(float("inf"))
+    assert "当前输入值: inf" in str(exc_info.value)
+
+
+def test_integer_operations():
+    """测试整数运算功能"""
+    assert gcd(12, 18) == 6
+    assert gcd(12.0, -18) == 6
+    assert gcd(0, 0) == 0
+    assert factorial(0) == 1
+    assert factorial(5) == 120
+    assert factorial(20.0) == 2432902008176640000
+    assert modpow(4, 13, 497) == 445
+    assert modpow(2, 100, 1_000_000_007) == pow(2, 100, 1_000_000_007)
+
+    with pytest.raises(ValueError) as exc_info:
+        gcd(1.5, 3)
+    assert "当前输入值: 1.5" in str(exc_info.value)
+    with pytest.raises(ValueError) as exc_info:
+        factorial(-1)
+    assert "当前输入值: -1" in str(exc_info.value)
+    with pytest.raises(OverflowError):
+        factorial(171)
+    with pytest.raises(ZeroDivisionError) as exc_info:
+        modpow(2, 3, 0)
+    assert "模数=0" in str(exc_info.value)
+    with pytest.raises(ValueError) as exc_info:
+        modpow(2, -1, 3)
+    assert "指数=-1" in str(exc_info.value)
+    # 与大整数运算使用相同的输入位数上限
+    modpow(3, 10**999, 10**999 + 7)
+    with pytest.raises(OverflowError, match="输入过大"):
+        modpow(3, 10**4000, 10**4000 + 7)
+
+
+# 批量运算测试
+def test_many_operations():
+    """测试向量化运算与逐个计算结果一致"""
+    a = [1.0, -2.5, 3.0, 0.0]
+    b = [2.0, 4.0, -1.5, 7.0]
+    assert add_many(a, b) == [add(x, y) for x, y in zip(a, b)]
+    assert subtract_many(a, b) == [subtract(x, y) for x, y in zip(a, b)]
+    assert multiply_many(a, b) == [multiply(x, y) for x, y in zip(a, b)]
+    assert divide_many(a, b) == [divide(x, y) for x, y in zip(a, b)]
+    assert sqrt_many([0, 4, 2]) == [sqrt(x) for x in [0, 4, 2]]
+    assert sqrt_many([]) == []
+    exponents = [2, 3, 0, 1]
+    assert power_many(a, exponents) == [power(x, y) for x, y in zip(a, exponents)]
+    assert log_many([1, 2, 10]) == [log(x) for x in [1, 2, 10]]
+    assert exp_many([0, 1, -1]) == [exp(x) for x in [0, 1, -1]]
+    assert sin_many([0, 1, 2]) == [sin(x) for x in [0, 1, 2]]
+    assert gcd_many([12, 7.0], [18, 21]) == [6, 7]
+    assert factorial_many([0, 5, 3.0]) == [1, 120, 6]
+    assert modpow_many([4, 2], [13, 10], [497, 1000]) == [445, 24]
+
+
+def test_many_errors():
+    """测试批量运算的错误信息与单次运算一致"""
+    with pytest.raises(ZeroDivisionError) as exc_info:
+        divide_many([1, 2, 3], [1, 0, 0])
+    assert "被除数=2, 除数=0" in str(exc_info.value)
+
+    with pytest.raises(ValueError) as exc_info:
+        sqrt_many([4, -9, -1])
+    assert "当前输入值: -9" in str(exc_info.value)
+
+    with pytest.raises(ZeroDivisionError) as exc_info:
+        power_many([2, 0], [1, -2])
+    assert "底数=0, 指数=-2" in str(exc_info.value)
+
+    with pytest.raises(ValueError) as exc_info:
+        log_many([1, -3])
+    assert "当前输入值: -3" in str(exc_info.value)
+
+    with pytest.raises(OverflowError) as exc_info:
+        exp_many([1, 800])
+    assert "当前输入值: 800" in str(exc_info.value)
+
+    with pytest.raises(ValueError) as exc_info:
+        factorial_many([3, -2])
+    assert "当前输入值: -2" in str(exc_info.value)
+
+    with pytest.raises(ValueError) as exc_info:
+        modpow_many([2], [-1], [3])
+    assert "指数=-1" in str(exc_info.value)
+
+    with pytest.raises(OverflowError, match="输入过大"):
+        modpow_many([2, 3], [5, 10**4000], [7, 11])
+
+
+@pytest.mark.parametrize("name", ["sin", "cos", "tan"])
+@pytest.mark.parametrize("value", [math.nan, math.inf, -math.inf])
+def test_trig_many_rejects_non_finite(name, value):
+    """测试三角函数的批量计算与单次计算一样拒绝无穷大和NaN"""
+    op = OPERATIONS[name]
+    with pytest.raises(ValueError) as scalar_info:
+        op.scalar(value)
+    with pytest.raises(ValueError) as batch_info:
+        op.vectorized([0.5, value])
+    assert str(batch_info.value) == str(scalar_info.value)
+
+
+# 运算注册表测试
+@pytest.mark.parametrize("op", OPERATIONS.values(), ids=list(OPERATIONS))
+def test_operation_registry(op):
+    """测试每个注册的运算：示例参数可以计算，向量化实现与单次计算一致"""
+    assert len(op.example) == op.arity + len(op.optional)
+    expected = op.scalar(*op.example)
+    assert isinstance(expected, int if op.integer else float)
+    if op.vectorized is not None:
+        columns = [[value] * 3 for value in op.example[: op.arity]]
+        assert op.vectorized(*columns) == [op.scalar(*op.example[: op.arity])] * 3
+
+
+def test_add_many_length_mismatch():
+    """测试批量计算的操作数长度不一致时报错"""
+    with pytest.raises(ValueError) as exc_info:
+        add_many([1, 2], [1])
+    assert "操作数长度不一致" in str(exc_info.value)
+
+
+@pytest.mark.parametrize(
+    "operation,b,message",
+    [
+        ("modulo", [1], "不支持的运算"),
+        ("sqrt", [1], "只接受一个操作数"),
+        ("add", None, "需要两个操作数"),
+    ],
+)
+def test_evaluate_many_invalid(operation, b, message):
+    """测试按名称批量计算的参数检查"""
+    with pytest.raises(ValueError) as exc_info:
+        evaluate_many(operation, [1], b)
+    assert message in str(exc_info.value)
+
+
 # 边界值测试
 def test_boundary_values():
     """测试边界值情况"""
@@ -117,6 +314,67 @@ def run_sqrt():
     benchmark(run_sqrt)
 
 
+@pytest.mark.benchmark(
+    group="calculator",
+    min_rounds=100,
+    disable_gc=True,
+    warmup=True
+)
+def test_performance_math_functions(benchmark):
+    """测试扩展数学函数的性能"""
+
+    def run_functions():
+        for i in range(1, 1001):
+            power(i, 0.5)
+            log(i)
+            exp(i % 100)
+            sin(i)
+            cos(i)
+            tan(i)
+
+    benchmark(run_functions)
+
+
+@pytest.mark.benchmark(
+    group="calculator",
+    min_rounds=100,
+    disable_gc=True,
+    warmup=True
+)
+def test_performance_integer_functions(benchmark):
+    """测试整数运算的性能"""
+
+    def run_functions():
+        for i in range(1000):
+            gcd(i, 360)
+            factorial(i % 100)
+            modpow(i, 65537, 1_000_000_007)
+
+    benchmark(run_functions)
+
+
+# 批量运算性能测试：对比逐个计算和向量化计算
+_VALUES = [float(i) for i in range(1, 10001)]
+
+
+@pytest.mark.benchmark(group="math-batch")
+def test_performance_log_scalar(benchmark):
+    """测试逐个计算对数的性能"""
+    benchmark(lambda: [log(x) for x in _VALUES])
+
+
+@pytest.mark.benchmark(group="math-batch")
+def test_performance_log_many(benchmark):
+    """测试向量化计算对数的性能"""
+    benchmark(log_many, _VALUES)
+
+
+@pytest.mark.benchmark(group="math-batch")
+def test_performance_power_many(benchmark):
+    """测试向量化计算乘方的性能"""
+    benchmark(power_many, _VALUES, [0.5] * len(_VALUES))
+
+
 @pytest.mark.benchmark(
     group="calculator",
     min_rounds=100,
@@ -136,3 +394,10 @@ def run_operations():
 
     # 执行基准测试
     benchmark(run_operations)
+
+
+@pytest.mark.benchmark(group="registry")
+@pytest.mark.parametrize("op", OPERATIONS.values(), ids=list(OPERATIONS))
+def test_performance_registry_scalar(benchmark, op):
+    """测试每个注册运算的单次计算耗时"""
+    benchmark(op.scalar, *op.example)
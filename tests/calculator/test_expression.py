@@ -0,0 +1,103 @@
+"""
+按列表达式计算测试模块。
+"""
+
+import math
+import random
+
+import pytest
+
+from calculator.expression import compile_expression
+
+
+def test_evaluate_columns():
+    """测试在整列数据上计算表达式"""
+    compiled = compile_expression("sqrt(a*a + b*b) / c")
+    assert compiled.columns == ["a", "b", "c"]
+    result = compiled.evaluate({"a": [3.0, 6.0], "b": [4.0, 8.0], "c": [2.0, 5.0]})
+    assert result.values == [2.5, 2.0]
+    assert result.errors == {}
+
+
+def test_unary_and_constants():
+    """测试一元运算符和数值常量"""
+    result = compile_expression("-a / 2 + 1").evaluate({"a": [1, 2]})
+    assert result.values == [0.5, 0.0]
+
+
+def test_divide_by_zero_mask():
+    """测试除零的行被标记，错误信息与core一致，其他行正常计算"""
+    result = compile_expression("a / b").evaluate({"a": [1, 4, 6], "b": [1, 0, 3]})
+    assert result.mask == [False, True, False]
+    assert math.isnan(result.values[1])
+    assert result.values[0] == 1 and result.values[2] == 2
+    assert "除数不能为0" in result.errors[1]
+
+
+def test_negative_sqrt_mask():
+    """测试负数开平方的行被标记，错误信息与core一致"""
+    result = compile_expression("sqrt(a - 5)").evaluate({"a": [1, 9]})
+    assert result.mask == [True, False]
+    assert result.values[1] == 2.0
+    assert "不能计算负数的平方根" in result.errors[0]
+
+
+def test_interpret_matches_evaluate():
+    """测试逐行解释执行与编译执行结果一致"""
+    compiled = compile_expression("sqrt(a*a + b*b) / c")
+    data = {"a": [3, -1, 0], "b": [4, 2, 0], "c": [2, 0, 1]}
+    fused, naive = compiled.evaluate(data), compiled.interpret(data)
+    assert fused.errors == naive.errors
+    assert fused.values[::2] == naive.values[::2]
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        '__import__("os")',
+        "a.b",
+        "a ** 2",
+        "lambda: 1",
+        "'x'",
+        "_a + 1",
+        "sqrt(x=a)",
+        "a +",
+    ],
+)
+def test_rejects_invalid_expression(source):
+    """测试不支持的语法被拒绝"""
+    with pytest.raises(ValueError):
+        compile_expression(source)
+
+
+def test_missing_and_mismatched_columns():
+    """测试缺少列和列长度不一致"""
+    compiled = compile_expression("a + b")
+    with pytest.raises(ValueError, match="缺少表达式需要的列"):
+        compiled.evaluate({"a": [1]})
+    with pytest.raises(ValueError, match="各列长度不一致"):
+        compiled.evaluate({"a": [1], "b": [1, 2]})
+
+
+# 性能测试：对比编译后整列执行与逐行解释执行
+_SIZE = 100_000
+_DATA = {
+    "a": [random.uniform(-100, 100) for _ in range(_SIZE)],
+    "b": [random.uniform(-100, 100) for _ in range(_SIZE)],
+    "c": [random.uniform(1, 100) for _ in range(_SIZE)],
+}
+_EXPRESSION = compile_expression("sqrt(a*a + b*b) / c")
+
+
+@pytest.mark.benchmark(group="expression")
+def test_performance_fused(benchmark):
+    """测试编译后整列执行的性能"""
+    result = benchmark(_EXPRESSION.evaluate, _DATA)
+    assert not result.errors
+
+
+@pytest.mark.benchmark(group="expression")
+def test_performance_per_row(benchmark):
+    """测试逐行解释执行的性能"""
+    result = benchmark(_EXPRESSION.interpret, _DATA)
+    assert not result.errors
@@ -0,0 +1,141 @@
+"""
+任意精度整数运算测试模块。
+"""
+
+import math
+import sys
+
+import pytest
+
+from calculator import integer
+from calculator.integer import (
+    binomial,
+    factorial,
+    is_prime,
+    parse_integer,
+    pow_mod,
+    to_decimal_string,
+)
+
+
+def test_factorial():
+    """测试精确阶乘，包括查表范围内外的输入"""
+    assert factorial(0) == 1
+    assert factorial(20) == 2432902008176640000
+    assert factorial(1000) == math.factorial(1000)
+    assert factorial(5000) == math.factorial(5000)
+
+    with pytest.raises(ValueError) as exc_info:
+        factorial(-1)
+    assert "当前输入值: -1" in str(exc_info.value)
+
+
+def test_binomial():
+    """测试组合数"""
+    assert binomial(10, 3) == 120
+    assert binomial(10, 0) == 1
+    assert binomial(3, 5) == 0
+    assert binomial(5000, 2500) == math.comb(5000, 2500)
+    assert binomial(10**30, 2) == 10**30 * (10**30 - 1) // 2
+
+    with pytest.raises(ValueError):
+        binomial(-1, 2)
+
+
+def test_result_size_guard():
+    """测试结果位数超过上限时直接拒绝"""
+    with pytest.raises(OverflowError) as exc_info:
+        factorial(50_000)
+    assert "计算结果过大" in str(exc_info.value)
+    with pytest.raises(OverflowError):
+        factorial(10**100)
+    with pytest.raises(OverflowError):
+        binomial(10**900, 10**800)
+    with pytest.raises(OverflowError):
+        factorial(5000, max_digits=1000)
+    with pytest.raises(OverflowError):
+        is_prime(10**2000)
+
+
+def test_pow_mod():
+    """测试模幂和模逆元"""
+    assert pow_mod(4, 13, 497) == 445
+    assert pow_mod(3, -1, 7) == 5
+    assert pow_mod(2, 10**100, 10**9 + 7) == pow(2, 10**100, 10**9 + 7)
+
+    with pytest.raises(ZeroDivisionError):
+        pow_mod(2, 3, 0)
+    with pytest.raises(ValueError) as exc_info:
+        pow_mod(2, -1, 4)
+    assert "不可逆" in str(exc_info.value)
+
+
+def test_is_prime():
+    """测试素数判断"""
+    small = [n for n in range(30) if is_prime(n)]
+    assert small == [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    assert is_prime(2**61 - 1)
+    assert is_prime(2**127 - 1)
+    assert not is_prime(2**67 - 1)
+    # 卡迈克尔数和强伪素数
+    assert not is_prime(561 * 10007)
+    assert not is_prime(3_215_031_751)
+    assert not is_prime(-7)
+
+
+def test_decimal_string_roundtrip():
+    """测试超过4300位的整数与字符串互相转换"""
+    value = factorial(20_000)
+    text = to_decimal_string(value)
+    assert len(text) == 77338
+    assert parse_integer(text, max_digits=len(text)) == value
+    assert parse_integer("-" + text, max_digits=len(text)) == -value
+    assert to_decimal_string(-(10**9000)) == "-1" + "0" * 9000
+    if hasattr(sys, "get_int_max_str_digits"):
+        with pytest.raises(ValueError):
+            str(value)
+    # 输入最多 MAX_INPUT_DIGITS 位，低于解释器的整数转换位数限制
+    text = "9" * integer.MAX_INPUT_DIGITS
+    assert parse_integer(text) == 10**integer.MAX_INPUT_DIGITS - 1
+    with pytest.raises(OverflowError):
+        parse_integer(text + "9")
+
+
+@pytest.mark.parametrize("text", ["", "12a", "+-3", "1.5", "٣"])
+def test_parse_integer_invalid(text):
+    """测试无效的整数字符串"""
+    with pytest.raises(ValueError):
+        parse_integer(text)
+
+
+# 性能测试：对比逐个相乘和标准库的分治算法
+def _naive_factorial(n):
+    result = 1
+    for i in range(2, n + 1):
+        result *= i
+    return result
+
+
+@pytest.mark.benchmark(group="integer-factorial")
+def test_performance_factorial_naive(benchmark):
+    """测试逐个相乘计算阶乘的性能"""
+    benchmark(_naive_factorial, 20_000)
+
+
+@pytest.mark.benchmark(group="integer-factorial")
+def test_performance_factorial(benchmark):
+    """测试分治算法计算阶乘的性能"""
+    benchmark(factorial, 20_000)
+
+
+@pytest.mark.benchmark(group="integer-str")
+def test_performance_to_decimal_string(benchmark):
+    """测试大整数转换为字符串的性能"""
+    value = integer.factorial(20_000)
+    benchmark(to_decimal_string, value)
+
+
+@pytest.mark.benchmark(group="integer-prime")
+def test_performance_is_prime(benchmark):
+    """测试Miller–Rabin素数判断的性能"""
+    benchmark(is_prime, 2**521 - 1)
@@ -0,0 +1,257 @@
+"""
+异步批量计算任务测试模块。
+"""
+
+import dataclasses
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from calculator.api import app
+from calculator.core import evaluate_many
+from calculator.jobs import (
+    FAILED,
+    QUEUED,
+    SUCCEEDED,
+    Job,
+    JobLimitError,
+    JobManager,
+    JobQueue,
+    JobStore,
+    LocalJobQueue,
+    LocalJobStore,
+)
+
+client = TestClient(app)
+
+
+def test_job_runs_in_chunks():
+    """测试任务按块执行并逐步追加结果"""
+    manager = JobManager(chunk_size=3)
+    job = Job(id="j", operation="add", total=10, a=list(range(10)), b=[1] * 10)
+    manager.store.add(job)
+    assert manager.run(job.id) is job
+    assert manager.run(job.id) is None
+    assert job.status == SUCCEEDED
+    assert job.results == [i + 1 for i in range(10)]
+    assert job.a is None and job.b is None and job.done.is_set()
+
+    page = job.page(4, 4)
+    assert page["results"] == [5, 6, 7, 8] and page["next_offset"] == 8
+    assert job.page(8, 4)["next_offset"] is None
+
+
+def test_job_failure_keeps_completed_results():
+    """测试任务失败时保留已完成的结果并记录出错的区间"""
+    manager = JobManager(chunk_size=2)
+    job = Job(id="j", operation="divide", total=5, a=[1] * 5, b=[1, 1, 1, 0, 1])
+    manager.store.add(job)
+    manager.run(job.id)
+    assert job.status == FAILED
+    assert job.results == [1.0, 1.0]
+    assert job.error == "下标 2 到 3 之间的元素计算失败: 除数不能为0（当前: 被除数=1, 除数=0）"
+    assert job.page(0, 10)["next_offset"] is None
+
+
+def test_job_fails_on_non_finite_results():
+    """测试结果为inf或nan时任务失败，不返回无法用JSON表示的结果"""
+    manager = JobManager(chunk_size=2)
+    job = Job(id="j", operation="multiply", total=3, a=[1, 2, 1e200], b=[1, 3, 1e200])
+    manager.store.add(job)
+    manager.run(job.id)
+    assert job.status == FAILED
+    assert job.results == [1, 6]
+    assert job.error == "下标 2 到 2 之间的元素计算失败: 计算结果超出范围（下标 2 的结果: inf）"
+
+
+def test_page_while_running():
+    """测试运行中的任务可以读取已完成的部分"""
+    job = Job(id="j", operation="add", total=10, status="running")
+    job.results.extend([1.0, 2.0])
+    page = job.page(0, 5)
+    assert page["results"] == [1.0, 2.0] and page["next_offset"] == 2
+    assert job.page(2, 5)["next_offset"] == 2
+
+
+def test_submit_validation():
+    """测试提交时检查运算和操作数"""
+    manager = JobManager()
+    with pytest.raises(ValueError, match="不支持的运算"):
+        manager.submit("modulo", [1])
+    with pytest.raises(ValueError, match="只接受一个操作数"):
+        manager.submit("sqrt", [1], [2])
+    with pytest.raises(ValueError, match="需要两个操作数"):
+        manager.submit("add", [1])
+    with pytest.raises(ValueError, match="长度不一致"):
+        manager.submit("add", [1, 2], [1])
+    assert manager.snapshot()[QUEUED] == 0
+
+
+def test_custom_queue_and_job_limit():
+    """测试可以替换任务队列，以及任务数量上限"""
+
+    class RecordingQueue(LocalJobQueue):
+        def __init__(self):
+            super().__init__()
+            self.submitted = []
+
+        def put(self, job_id):
+            self.submitted.append(job_id)
+            super().put(job_id)
+
+    job_queue = RecordingQueue()
+    manager = JobManager(workers=1, job_queue=job_queue, max_jobs=2)
+    try:
+        first = manager.submit("sqrt", [4.0, 9.0])
+        second = manager.submit("sqrt", [16.0])
+        assert job_queue.submitted == [first.id, second.id]
+        assert manager.wait(first.id, 5) and manager.wait(second.id, 5)
+        assert first.results == [2.0, 3.0]
+        with pytest.raises(JobLimitError):
+            manager.submit("sqrt", [1.0])
+
+        # 过期的任务被清除后可以继续提交
+        manager.store.ttl = 0
+        first.finished_at = second.finished_at = time.time() - 1
+        manager.submit("sqrt", [1.0])
+        assert manager.get(first.id) is None
+    finally:
+        manager.shutdown(timeout=5)
+
+
+class CopyingJobStore(LocalJobStore):
+    """模拟共享存储：读取返回副本，不同实例之间不共享任务对象"""
+
+    @staticmethod
+    def _copy(job):
+        if job is None:
+            return None
+        return dataclasses.replace(
+            job, results=list(job.results), done=threading.Event()
+        )
+
+    def get(self, job_id):
+        return self._copy(super().get(job_id))
+
+    def claim(self, job_id):
+        return self._copy(super().claim(job_id))
+
+
+def test_shared_store_across_instances():
+    """测试提交任务和执行任务在不同实例中进行（Lambda部署的方式）"""
+    store, job_queue = CopyingJobStore(), LocalJobQueue()
+    api_instance = JobManager(workers=0, job_queue=job_queue, job_store=store)
+    worker_instance = JobManager(
+        workers=0, job_queue=job_queue, job_store=store, chunk_size=2
+    )
+    job = api_instance.submit("add", [1.0, 2.0, 3.0], [1.0, 1.0, 1.0])
+    assert api_instance.get(job.id).status == QUEUED
+
+    job_id = job_queue.get(timeout=1)
+    worker_instance.run(job_id)
+    # 重复投递的消息不会再次执行
+    assert worker_instance.run(job_id) is None
+
+    assert api_instance.wait(job.id, timeout=1)
+    finished = api_instance.get(job.id)
+    assert finished.status == SUCCEEDED
+    assert finished.page(0, 10)["results"] == [2.0, 3.0, 4.0]
+    assert api_instance.snapshot()[SUCCEEDED] == 1
+
+
+def test_interfaces_are_abstract():
+    """测试任务队列和存储接口不能直接实例化"""
+    for interface in (JobQueue, JobStore):
+        with pytest.raises(TypeError):
+            interface()
+
+
+def _wait_done(job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f"/jobs/{job_id}").json()
+        if status["status"] not in ("queued", "running"):
+            return status
+        time.sleep(0.01)
+    raise AssertionError("任务未在规定时间内完成")
+
+
+def test_job_api_submit_poll_fetch():
+    """测试提交任务、轮询状态并分页读取结果"""
+    a = [float(i) for i in range(25_000)]
+    response = client.post("/jobs", json={"operation": "multiply", "a": a, "b": a})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.headers["location"] == f"/jobs/{job_id}"
+
+    status = _wait_done(job_id)
+    assert status["status"] == "succeeded"
+    assert status["completed"] == status["total"] == 25_000
+    assert status["progress"] == 1.0
+
+    results = []
+    offset = 0
+    while offset is not None:
+        page = client.get(
+            f"/jobs/{job_id}/results", params={"offset": offset, "limit": 10_000}
+        ).json()
+        results.extend(page["results"])
+        offset = page["next_offset"]
+    assert results == evaluate_many("multiply", a, a)
+
+
+def test_job_api_integer_results_and_failure():
+    """测试整数结果保持整数，以及失败任务的状态"""
+    response = client.post("/jobs", json={"operation": "factorial", "a": [5, 6]})
+    job_id = response.json()["job_id"]
+    _wait_done(job_id)
+    assert client.get(f"/jobs/{job_id}/results").json()["results"] == [120, 720]
+
+    response = client.post("/jobs", json={"operation": "sqrt", "a": [4, -1]})
+    status = _wait_done(response.json()["job_id"])
+    assert status["status"] == "failed"
+    assert "不能计算负数的平方根" in status["error"]
+
+    response = client.post(
+        "/jobs", json={"operation": "multiply", "a": [1e200, 2], "b": [1e200, 3]}
+    )
+    status = _wait_done(response.json()["job_id"])
+    assert status["status"] == "failed"
+    assert "计算结果超出范围" in status["error"]
+    response = client.get(f"/jobs/{status['job_id']}/results")
+    assert response.status_code == 200
+    assert response.json()["results"] == []
+
+
+def test_job_api_errors():
+    """测试任务接口的错误响应"""
+    response = client.post("/jobs", json={"operation": "modulo", "a": [1]})
+    assert response.status_code == 400
+    assert client.get("/jobs/missing").status_code == 404
+    assert client.get("/jobs/missing/results").status_code == 404
+    response = client.post("/jobs", json={"operation": "sqrt", "a": [1]})
+    job_id = response.json()["job_id"]
+    response = client.get(f"/jobs/{job_id}/results", params={"limit": 10**6})
+    assert response.status_code == 422
+    assert "jobs" in client.get("/metrics").json()
+
+
+# 性能测试：后台任务的计算吞吐量
+@pytest.mark.benchmark(group="jobs")
+def test_performance_job_throughput(benchmark):
+    """测试20万个元素的任务从提交到完成的耗时"""
+    a = [float(i) for i in range(200_000)]
+    manager = JobManager(workers=1, ttl=0)
+
+    def run():
+        job = manager.submit("multiply", a, a)
+        assert manager.wait(job.id, 30)
+        return job
+
+    try:
+        job = benchmark(run)
+        assert job.status == SUCCEEDED
+    finally:
+        manager.shutdown(timeout=5)
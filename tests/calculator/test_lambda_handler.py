@@ -0,0 +1,147 @@
+"""
+AWS Lambda处理函数测试模块。
+"""
+
+import base64
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from calculator.api import handler
+from calculator.core import OPERATIONS
+from calculator import lambda_handler as lambda_module
+from calculator.lambda_handler import fast_path, lambda_handler
+
+context = SimpleNamespace(
+    function_name="calculator",
+    memory_limit_in_mb=128,
+    invoked_function_arn="arn:aws:lambda:us-east-1:123456789012:function:calculator",
+    aws_request_id="test",
+)
+
+
+def _event(path, body, method="POST"):
+    """构造API Gateway REST API格式的事件"""
+    return {
+        "resource": path,
+        "path": path,
+        "httpMethod": method,
+        "headers": {"content-type": "application/json"},
+        "multiValueHeaders": {},
+        "queryStringParameters": None,
+        "multiValueQueryStringParameters": None,
+        "requestContext": {
+            "resourcePath": path,
+            "httpMethod": method,
+            "path": path,
+            "identity": {"sourceIp": "127.0.0.1"},
+        },
+        "body": json.dumps(body),
+        "isBase64Encoded": False,
+    }
+
+
+@pytest.mark.parametrize("op", OPERATIONS.values(), ids=list(OPERATIONS))
+def test_fast_path_matches_api(op):
+    """测试快速路径的响应与经过Mangum和FastAPI的响应一致"""
+    event = _event(f"/{op.name}", dict(zip(op.params + op.optional, op.example)))
+    fast = fast_path(event)
+    slow = handler(event, context)
+    assert fast["statusCode"] == slow["statusCode"] == 200
+    assert json.loads(fast["body"]) == json.loads(slow["body"])
+
+
+@pytest.mark.parametrize(
+    "path,body,status",
+    [
+        ("/divide", {"a": 1, "b": 0}, 400),
+        ("/sqrt", {"value": -1}, 400),
+        ("/factorial", {"value": -1}, 400),
+    ],
+)
+def test_fast_path_errors_match_api(path, body, status):
+    """测试计算错误的响应与API一致"""
+    event = _event(path, body)
+    fast = fast_path(event)
+    assert fast["statusCode"] == handler(event, context)["statusCode"] == status
+    assert json.loads(fast["body"]) == json.loads(handler(event, context)["body"])
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        _event("/add", {"a": 1, "b": 2}, method="GET"),
+        _event("/health", {}),
+        _event("/batch", {"operation": "add", "a": [1], "b": [2]}),
+        _event("/add", {"a": 1}),
+        _event("/add", {"a": 1, "b": 2, "c": 3}),
+        _event("/add", {"a": "1", "b": 2}),
+        _event("/add", {"a": True, "b": 2}),
+        _event("/gcd", {"a": 12.0, "b": 18}),
+        _event("/add", [1, 2]),
+        dict(_event("/add", {}), body="not json"),
+        dict(_event("/add", {"a": 1, "b": 2}), headers={"Content-Type": "text/plain"}),
+        dict(
+            _event("/add", {"a": 1, "b": 2}),
+            headers={"content-type": "application/json", "content-encoding": "gzip"},
+        ),
+    ],
+)
+def test_fast_path_falls_back(event):
+    """测试快速路径无法确定结果的请求交给Mangum处理"""
+    assert fast_path(event) is None
+
+
+def test_http_api_event_and_base64_body():
+    """测试HTTP API格式的事件和Base64编码的请求体"""
+    event = {
+        "version": "2.0",
+        "rawPath": "/multiply",
+        "requestContext": {"http": {"method": "POST", "path": "/multiply"}},
+        "body": base64.b64encode(b'{"a": 3, "b": 4}').decode(),
+        "isBase64Encoded": True,
+    }
+    assert json.loads(fast_path(event)["body"]) == {
+        "result": 12.0,
+        "operation": "multiplication",
+    }
+
+
+def test_fast_path_content_type():
+    """测试快速路径与API一样接受JSON及+json的Content-Type"""
+    for content_type in ("application/json; charset=utf-8", "application/ld+json"):
+        event = dict(
+            _event("/add", {"a": 1, "b": 2}), headers={"Content-Type": content_type}
+        )
+        assert fast_path(event)["statusCode"] == 200
+
+
+def test_fast_path_disabled_by_default():
+    """测试快速路径默认关闭：不经过中间件，会绕过限流和访问日志"""
+    assert lambda_module.FAST_PATH_ENABLED is False
+
+
+@pytest.mark.parametrize("enabled", [False, True])
+def test_lambda_handler(monkeypatch, enabled):
+    """测试处理函数在快速路径开启和关闭时都返回正确的响应"""
+    monkeypatch.setattr(lambda_module, "FAST_PATH_ENABLED", enabled)
+    response = lambda_handler(_event("/add", {"a": 1, "b": 2}), context)
+    assert json.loads(response["body"]) == {"result": 3.0, "operation": "addition"}
+    response = lambda_handler(_event("/add", {"a": "x", "b": 2}), context)
+    assert response["statusCode"] == 422
+
+
+# 性能测试：快速路径与经过Mangum和FastAPI处理的对比
+@pytest.mark.benchmark(group="lambda")
+def test_performance_fast_path(benchmark):
+    """测试快速路径处理一次加法请求的耗时"""
+    event = _event("/add", {"a": 1.5, "b": 2.5})
+    assert benchmark(fast_path, event)["statusCode"] == 200
+
+
+@pytest.mark.benchmark(group="lambda")
+def test_performance_mangum(benchmark):
+    """测试经过Mangum和FastAPI处理一次加法请求的耗时"""
+    event = _event("/add", {"a": 1.5, "b": 2.5})
+    assert benchmark(handler, event, context)["statusCode"] == 200
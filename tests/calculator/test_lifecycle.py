@@ -0,0 +1,68 @@
+"""
+初始化阶段与快照钩子测试模块。
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from calculator import lifecycle
+from calculator.api import app
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+
+
+def test_hooks_run_in_registration_order(monkeypatch):
+    """测试快照前和恢复后的钩子按注册顺序执行"""
+    calls = []
+    monkeypatch.setattr(lifecycle, "_before_snapshot", [])
+    monkeypatch.setattr(lifecycle, "_after_restore", [])
+    lifecycle.register_before_snapshot(lambda: calls.append("snapshot-1"))
+    lifecycle.register_before_snapshot(lambda: calls.append("snapshot-2"))
+
+    @lifecycle.register_after_restore
+    def restore():
+        calls.append("restore")
+
+    lifecycle.before_snapshot()
+    lifecycle.after_restore()
+    assert calls == ["snapshot-1", "snapshot-2", "restore"]
+
+
+def test_initialize_phases():
+    """测试初始化按阶段记录耗时，重复调用不重复执行，预热后中间件栈已构建"""
+    phases = lifecycle.initialize()
+    assert tuple(phases) == lifecycle.PHASES
+    assert all(value >= 0 for value in phases.values())
+    assert lifecycle.initialize() == phases
+    assert app.middleware_stack is not None
+    assert app.openapi_schema is not None
+
+
+def test_initialize_survives_warm_failure(monkeypatch, caplog):
+    """测试预热失败时只记录警告，初始化照常完成"""
+
+    def warm(app):
+        raise RuntimeError("预热请求失败: /add")
+
+    monkeypatch.setattr(lifecycle, "_timings", {})
+    monkeypatch.setattr(lifecycle, "warm", warm)
+    phases = lifecycle.initialize()
+    assert tuple(phases) == lifecycle.PHASES
+    assert "预热失败" in caplog.text
+
+
+def test_simulate_restore():
+    """测试模拟恢复：恢复后处理第一次请求的总耗时远小于冷启动"""
+    result = subprocess.run(
+        [sys.executable, "-m", "calculator.lifecycle", "--runs", "1", "--json"],
+        env=dict(os.environ, PYTHONPATH=SRC_DIR),
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=120,
+    )
+    report = json.loads(result.stdout)
+    assert set(report["phases"]) == set(lifecycle.PHASES)
+    assert report["restored_total"] < report["cold_total"]
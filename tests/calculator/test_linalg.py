@@ -0,0 +1,230 @@
+"""
+矩阵与线性代数模块测试。
+"""
+
+import random
+import struct
+
+import pytest
+from fastapi.testclient import TestClient
+
+from calculator import linalg
+from calculator.api import app
+from calculator.linalg import det, matmul, pack_matrix, solve, transpose
+
+client = TestClient(app)
+
+BINARY = {"Content-Type": "application/octet-stream"}
+
+
+def _random_matrix(rows, cols):
+    return [[random.uniform(-1, 1) for _ in range(cols)] for _ in range(rows)]
+
+
+def test_matmul():
+    """测试矩阵乘法"""
+    a = [[1, 2, 3], [4, 5, 6]]
+    b = [[7, 8], [9, 10], [11, 12]]
+    assert matmul(a, b) == [[58, 64], [139, 154]]
+
+    with pytest.raises(ValueError) as exc_info:
+        matmul(a, a)
+    assert "a: 2x3, b: 2x3" in str(exc_info.value)
+
+
+def test_transpose():
+    """测试矩阵转置"""
+    assert transpose([[1, 2, 3], [4, 5, 6]]) == [[1, 4], [2, 5], [3, 6]]
+
+
+def test_det():
+    """测试行列式，包括需要换行的矩阵和奇异矩阵"""
+    assert det([[2]]) == 2
+    assert det([[1, 2], [3, 4]]) == pytest.approx(-2)
+    assert det([[0, 1], [1, 0]]) == pytest.approx(-1)
+    assert det([[2, 0, 1], [1, 3, 2], [1, 1, 2]]) == pytest.approx(6)
+    assert det([[1, 2], [2, 4]]) == 0
+
+    with pytest.raises(ValueError) as exc_info:
+        det([[1, 2, 3], [4, 5, 6]])
+    assert "2x3" in str(exc_info.value)
+
+
+def test_solve():
+    """测试线性方程组求解"""
+    x = solve([[2, 1], [1, 3]], [3, 5])
+    assert x == pytest.approx([0.8, 1.4])
+
+    a = _random_matrix(20, 20)
+    expected = [random.uniform(-1, 1) for _ in range(20)]
+    b = [sum(x * y for x, y in zip(row, expected)) for row in a]
+    assert solve(a, b) == pytest.approx(expected)
+
+    with pytest.raises(ValueError) as exc_info:
+        solve([[1, 2], [2, 4]], [1, 2])
+    assert "奇异矩阵" in str(exc_info.value)
+    with pytest.raises(ValueError):
+        solve([[1, 0], [0, 1]], [1, 2, 3])
+
+
+@pytest.mark.parametrize(
+    "matrix,message",
+    [
+        ([], "不能为空"),
+        ([[1, 2], [3]], "每一行长度必须相同"),
+        ([[0.0] * 1000] * 1000, "过大"),
+    ],
+)
+def test_invalid_matrix(matrix, message):
+    """测试矩阵格式检查"""
+    with pytest.raises(ValueError) as exc_info:
+        transpose(matrix)
+    assert message in str(exc_info.value)
+
+
+def test_binary_roundtrip():
+    """测试二进制格式编码和解码"""
+    a = [[1.5, -2.0, 3.25], [4.0, 5.0, 6.0]]
+    b = [[1.0]]
+    assert linalg.unpack_matrices(pack_matrix(a) + pack_matrix(b)) == [a, b]
+
+    with pytest.raises(ValueError):
+        linalg.unpack_matrices(pack_matrix(a)[:-1])
+
+
+@pytest.mark.parametrize(
+    "rows, cols, message",
+    [(20_000_000, 0, "不能为空"), (0, 5, "不能为空"), (2**32 - 1, 0, "不能为空")]
+    + [(2**32 - 1, 1, "过大"), (1, linalg.MAX_ELEMENTS + 1, "过大")],
+)
+def test_binary_header_dimensions(rows, cols, message):
+    """测试二进制头部的行列数在分配内存之前检查"""
+    data = struct.pack("<II", rows, cols)
+    with pytest.raises(ValueError) as exc_info:
+        linalg.unpack_matrices(data)
+    assert message in str(exc_info.value)
+
+
+def test_api_json():
+    """测试矩阵接口的JSON请求"""
+    response = client.post(
+        "/matrix/multiply", json={"a": [[1, 2], [3, 4]], "b": [[5], [6]]}
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "result": [[17.0], [39.0]],
+        "operation": "matrix_multiplication",
+    }
+
+    response = client.post("/matrix/det", json={"a": [[1, 2], [3, 4]]})
+    assert response.json()["result"] == pytest.approx(-2)
+
+    response = client.post("/matrix/solve", json={"a": [[2, 1], [1, 3]], "b": [3, 5]})
+    assert response.json()["result"] == pytest.approx([0.8, 1.4])
+
+    response = client.post("/matrix/transpose", json={"a": [[1, 2]]})
+    assert response.json()["result"] == [[1.0], [2.0]]
+
+
+def test_api_binary():
+    """测试矩阵接口的二进制请求和响应"""
+    body = pack_matrix([[1, 2], [3, 4]]) + pack_matrix([[5], [6]])
+    response = client.post("/matrix/multiply", content=body, headers=BINARY)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert linalg.unpack_matrices(response.content) == [[[17.0], [39.0]]]
+
+    body = pack_matrix([[2, 1], [1, 3]]) + pack_matrix([[3], [5]])
+    response = client.post("/matrix/solve", content=body, headers=BINARY)
+    (x,) = linalg.unpack_matrices(response.content)
+    assert [row[0] for row in x] == pytest.approx([0.8, 1.4])
+
+
+def test_api_errors():
+    """测试矩阵接口的错误处理"""
+    response = client.post("/matrix/det", json={"a": [[1, 2, 3]]})
+    assert response.status_code == 400
+    assert "方阵" in response.json()["detail"]
+
+    response = client.post("/matrix/det", json={"a": "invalid"})
+    assert response.status_code == 422
+
+    response = client.post(
+        "/matrix/multiply", content=pack_matrix([[1]]), headers=BINARY
+    )
+    assert response.status_code == 400
+    assert "需要 2 个矩阵" in response.json()["detail"]
+
+
+@pytest.mark.parametrize(
+    "path, body, message",
+    [
+        ("/matrix/multiply", {"a": [[1e308]], "b": [[10]]}, "计算结果超出范围"),
+        ("/matrix/det", {"a": [[1e200, 0], [0, 1e200]]}, "计算结果超出范围"),
+        ("/matrix/transpose", {"a": [[1, float("nan")]]}, "参数 a 必须是有限数值"),
+        ("/matrix/solve", {"a": [[1]], "b": [float("inf")]}, "参数 b 必须是有限数值"),
+    ],
+)
+def test_api_non_finite(path, body, message):
+    """测试输入或结果为inf、nan时返回400，JSON和二进制请求一致"""
+    response = client.post(path, json=body)
+    assert response.status_code == 400
+    assert message in response.json()["detail"]
+
+    matrices = [
+        value if isinstance(value[0], list) else [value] for value in body.values()
+    ]
+    content = b"".join(pack_matrix(matrix) for matrix in matrices)
+    response = client.post(path, content=content, headers=BINARY)
+    assert response.status_code == 400
+    assert message in response.json()["detail"]
+
+
+def test_matmul_result_size_limit():
+    """测试输入不超过上限、乘积矩阵超过上限时在计算之前拒绝"""
+    rows = linalg.MAX_ELEMENTS // 500 + 1
+    column = [[1.0]] * rows
+    row = [[1.0] * 500]
+    with pytest.raises(ValueError, match="乘积矩阵过大"):
+        matmul(column, row)
+    assert len(matmul(column[:-1], row)) == rows - 1
+
+    response = client.post("/matrix/multiply", json={"a": column, "b": row})
+    assert response.status_code == 400
+    assert "乘积矩阵过大" in response.json()["detail"]
+    big = [[1.0]] * linalg.MAX_ELEMENTS
+    body = pack_matrix(big) + pack_matrix(transpose(big))
+    response = client.post("/matrix/multiply", content=body, headers=BINARY)
+    assert response.status_code == 400
+    assert "乘积矩阵过大" in response.json()["detail"]
+
+
+# 性能测试：不同规模矩阵的计算耗时
+@pytest.mark.benchmark(group="linalg-matmul")
+@pytest.mark.parametrize("size", [10, 50, 100])
+def test_performance_matmul(benchmark, size):
+    """测试矩阵乘法的性能"""
+    a, b = _random_matrix(size, size), _random_matrix(size, size)
+    benchmark(matmul, a, b)
+
+
+@pytest.mark.benchmark(group="linalg-solve")
+@pytest.mark.parametrize("size", [10, 50, 100])
+def test_performance_solve(benchmark, size):
+    """测试线性方程组求解的性能"""
+    a = _random_matrix(size, size)
+    b = [random.uniform(-1, 1) for _ in range(size)]
+    benchmark(solve, a, b)
+
+
+@pytest.mark.benchmark(group="linalg-transport")
+@pytest.mark.parametrize("encoding", ["json", "binary"])
+def test_performance_api_encoding(benchmark, encoding):
+    """测试JSON和二进制请求格式的接口耗时"""
+    a, b = _random_matrix(50, 50), _random_matrix(50, 50)
+    if encoding == "json":
+        kwargs = {"json": {"a": a, "b": b}}
+    else:
+        kwargs = {"content": pack_matrix(a) + pack_matrix(b), "headers": BINARY}
+    response = benchmark(client.post, "/matrix/multiply", **kwargs)
+    assert response.status_code == 200
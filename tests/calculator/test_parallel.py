@@ -0,0 +1,95 @@
+"""
+多进程批量计算测试模块。
+"""
+
+import random
+
+import pytest
+
+from calculator import parallel
+from calculator.core import evaluate_many
+
+
+@pytest.fixture(autouse=True)
+def small_shards(monkeypatch):
+    """缩小分片大小，让小数据量也能切成多个分片"""
+    monkeypatch.setattr(parallel, "MIN_SHARD_SIZE", 10)
+
+
+@pytest.mark.parametrize("operation", ["add", "subtract", "multiply", "divide"])
+def test_parallel_matches_serial(operation):
+    """测试并行结果与串行结果一致"""
+    a = [random.uniform(-100, 100) for _ in range(1000)]
+    b = [random.uniform(1, 100) for _ in range(1000)]
+    expected = evaluate_many(operation, a, b)
+    assert parallel.evaluate_parallel(operation, a, b, workers=2) == expected
+
+
+def test_parallel_sqrt():
+    """测试单操作数运算"""
+    values = list(range(500))
+    assert parallel.evaluate_parallel("sqrt", values, workers=2) == evaluate_many(
+        "sqrt", values
+    )
+
+
+def test_parallel_reports_first_error():
+    """测试多个分片出错时抛出下标最小的错误"""
+    a = list(range(100))
+    b = [1] * 100
+    b[35] = 0
+    b[80] = 0
+    with pytest.raises(ZeroDivisionError) as exc_info:
+        parallel.evaluate_parallel("divide", a, b, workers=4)
+    assert "被除数=35.0" in str(exc_info.value)
+
+
+def test_parallel_empty():
+    """测试空输入"""
+    assert parallel.evaluate_parallel("add", [], [], workers=2) == []
+
+
+def test_auto_selects_serial(monkeypatch):
+    """测试数据量低于阈值时不启动进程池"""
+
+    def fail(*args, **kwargs):
+        raise AssertionError("不应使用多进程")
+
+    monkeypatch.setattr(parallel, "evaluate_parallel", fail)
+    assert parallel.evaluate("add", [1, 2], [3, 4], workers=4) == [4, 6]
+    assert parallel.evaluate("add", [1] * 100, [1] * 100, workers=1) == [2] * 100
+    # 整数运算不论数据量都串行计算，结果保持为精确的整数
+    values = list(range(171)) * 2
+    result = parallel.evaluate("factorial", values, workers=4, threshold=10)
+    assert result == evaluate_many("factorial", values)
+    assert all(type(x) is int for x in result)
+
+
+def test_parallel_rejects_integer_operations():
+    """测试整数运算不能直接使用多进程计算"""
+    with pytest.raises(ValueError, match="不支持多进程计算"):
+        parallel.evaluate_parallel("gcd", [12] * 100, [18] * 100, workers=2)
+
+
+def test_auto_selects_parallel():
+    """测试数据量达到阈值时使用多进程"""
+    a = list(range(200))
+    result = parallel.evaluate("multiply", a, a, workers=2, threshold=100)
+    assert result == [float(x * x) for x in a]
+
+
+# 性能测试：对比串行与多进程
+@pytest.mark.benchmark(group="parallel")
+@pytest.mark.parametrize("workers", [1, 2])
+def test_performance_batch(benchmark, workers, monkeypatch):
+    """测试大批量运算在不同进程数下的性能"""
+    monkeypatch.setattr(parallel, "MIN_SHARD_SIZE", 50_000)
+    a = [float(i) for i in range(1, 500_001)]
+    benchmark.pedantic(
+        parallel.evaluate,
+        args=("divide", a, a),
+        kwargs={"workers": workers, "threshold": 1},
+        rounds=5,
+        iterations=1,
+        warmup_rounds=1,
+    )
@@ -0,0 +1,222 @@
+"""
+按客户端限流测试模块。
+"""
+
+import asyncio
+import math
+
+import httpx
+import pytest
+from fakeredis import FakeAsyncRedis
+from fastapi import FastAPI
+
+from calculator.ratelimit import (
+    MemoryStore,
+    RateLimitMiddleware,
+    RateLimitStore,
+    RedisStore,
+    take_tokens,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_take_tokens():
+    """测试令牌补充、消耗和等待时间"""
+    assert take_tokens(1, 0, 0, rate=2, capacity=5, cost=1) == (True, 0, 0)
+    allowed, tokens, wait = take_tokens(0, 0, 0.25, rate=2, capacity=5, cost=1)
+    assert not allowed and tokens == 0.5 and wait == 0.25
+    # 令牌不超过容量，时钟回拨不扣减令牌
+    assert take_tokens(0, 0, 100, rate=2, capacity=5, cost=1)[1] == 4
+    assert take_tokens(3, 10, 5, rate=2, capacity=5, cost=1)[1] == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+async def test_store_burst_and_refill(backend):
+    """测试两种存储的突发额度、补充速率和按客户端隔离"""
+    clock = FakeClock()
+    if backend == "memory":
+        store = MemoryStore(clock=clock)
+    else:
+        # fakeredis用Lua解释器执行 RedisStore.script，与真实Redis相同
+        store = RedisStore(FakeAsyncRedis(), clock=clock)
+
+    results = [(await store.take("a", rate=10, capacity=3))[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+    allowed, wait = await store.take("a", rate=10, capacity=3)
+    assert not allowed and wait == pytest.approx(0.1)
+    assert (await store.take("b", rate=10, capacity=3))[0]
+
+    clock.now += 0.1
+    assert (await store.take("a", rate=10, capacity=3))[0]
+    assert not (await store.take("a", rate=10, capacity=3))[0]
+
+
+@pytest.mark.asyncio
+async def test_redis_store_shared_between_instances():
+    """测试多个实例通过共享存储共用同一个客户端的额度"""
+    clock = FakeClock()
+    redis = FakeAsyncRedis()
+    first = RedisStore(redis, clock=clock)
+    second = RedisStore(redis, clock=clock)
+    assert (await first.take("a", rate=1, capacity=2))[0]
+    assert (await second.take("a", rate=1, capacity=2))[0]
+    assert not (await first.take("a", rate=1, capacity=2))[0]
+    assert await redis.keys() == [b"ratelimit:a"]
+
+
+@pytest.mark.asyncio
+async def test_redis_script_state_and_expiry():
+    """测试Lua脚本保存的令牌桶状态、返回的等待时间和键的过期时间"""
+    clock = FakeClock()
+    redis = FakeAsyncRedis()
+    store = RedisStore(redis, clock=clock)
+    for _ in range(3):
+        await store.take("a", rate=4, capacity=3)
+    assert await redis.hgetall("ratelimit:a") == {
+        b"tokens": b"0",
+        b"updated": b"1000",
+    }
+    # 等待时间不足1秒时不会被截断为整数
+    assert await store.take("a", rate=4, capacity=3) == (False, 0.25)
+    assert 0 < await redis.pttl("ratelimit:a") <= math.ceil(3 / 4 * 1000)
+
+
+@pytest.mark.asyncio
+async def test_memory_store_evicts_idle_clients():
+    """测试空闲到令牌补满的客户端被清除，且不影响限流结果"""
+    clock = FakeClock()
+    store = MemoryStore(clock=clock)
+    for i in range(1000):
+        await store.take(f"client-{i}", rate=10, capacity=20)
+    assert len(store) == 1000
+
+    clock.now += 1.0
+    await store.take("client-0", rate=10, capacity=20)
+    assert len(store) == 1000
+    clock.now += 2.0
+    await store.take("client-0", rate=10, capacity=20)
+    # 只剩刚访问的客户端；其他客户端的令牌已经补满，清除后等价于满桶
+    assert len(store) == 1
+
+
+@pytest.mark.asyncio
+async def test_memory_store_max_keys():
+    """测试客户端数量超过上限时清除最久未访问的客户端"""
+    store = MemoryStore(max_keys=10, clock=FakeClock())
+    for i in range(100):
+        await store.take(f"client-{i}", rate=1, capacity=1)
+    assert len(store) <= 11
+
+
+def test_store_interface_is_abstract():
+    """测试存储接口不能直接实例化"""
+    with pytest.raises(TypeError):
+        RateLimitStore()
+
+
+class _BrokenStore(RateLimitStore):
+    async def take(self, key, rate, capacity, cost=1.0):
+        raise ConnectionError("redis unavailable")
+
+
+def _limited_app(**kwargs):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, **kwargs)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    return app
+
+
+async def _get(app, path, headers=None, client=("10.0.0.1", 1234)):
+    transport = httpx.ASGITransport(app=app, client=client)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        return await c.get(path, headers=headers)
+
+
+@pytest.mark.asyncio
+async def test_middleware_limits_per_client():
+    """测试超额请求返回429，不同IP和API密钥分别计数"""
+    app = _limited_app(rate=1, burst=2)
+    statuses = [(await _get(app, "/ping")).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+
+    response = await _get(app, "/ping")
+    assert response.json() == {"detail": "请求过于频繁，请稍后重试"}
+    assert response.headers["retry-after"] == "1"
+
+    assert (await _get(app, "/ping", client=("10.0.0.2", 1234))).status_code == 200
+    # 带API密钥时按密钥计数，与IP无关
+    for ip in ("10.0.0.1", "10.0.0.3"):
+        response = await _get(app, "/ping", {"X-API-Key": "k1"}, (ip, 1))
+        assert response.status_code == 200
+    assert (await _get(app, "/ping", {"X-API-Key": "k1"})).status_code == 429
+    assert (await _get(app, "/health")).status_code == 200
+
+
+def test_client_key():
+    """测试客户端标识：API密钥只保存摘要，X-Forwarded-For仅在信任代理时使用"""
+    plain = RateLimitMiddleware(None)
+    proxied = RateLimitMiddleware(None, trust_forwarded=True)
+    scope = {
+        "type": "http",
+        "client": ("10.0.0.1", 1),
+        "headers": [(b"x-forwarded-for", b"1.2.3.4, 10.0.0.9")],
+    }
+    assert plain.client_key(scope) == "ip:10.0.0.1"
+    assert proxied.client_key(scope) == "ip:1.2.3.4"
+
+    scope["headers"].append((b"x-api-key", b"secret"))
+    key = plain.client_key(scope)
+    assert key.startswith("key:") and "secret" not in key
+    assert plain.client_key({"type": "http", "headers": []}) == "ip:unknown"
+
+
+def test_middleware_env_config(monkeypatch):
+    """测试默认限额可以通过环境变量配置"""
+    monkeypatch.setenv("CALCULATOR_RATE_LIMIT", "5")
+    monkeypatch.setenv("CALCULATOR_RATE_BURST", "7")
+    middleware = RateLimitMiddleware(None)
+    assert (middleware.rate, middleware.burst) == (5.0, 7.0)
+    assert RateLimitMiddleware(None, rate=2, burst=3).rate == 2
+
+
+@pytest.mark.asyncio
+async def test_middleware_fails_open():
+    """测试存储不可用时放行请求"""
+    app = _limited_app(rate=1, burst=1, store=_BrokenStore())
+    responses = await asyncio.gather(*(_get(app, "/ping") for _ in range(3)))
+    assert [response.status_code for response in responses] == [200, 200, 200]
+
+
+# 性能测试：大量活跃客户端时每次限流判断的耗时
+@pytest.mark.benchmark(group="ratelimit")
+def test_performance_memory_store(benchmark):
+    """测试10万个活跃客户端时进程内存储的限流判断耗时"""
+    store = MemoryStore()
+    keys = [f"ip:10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(100_000)]
+    loop = asyncio.new_event_loop()
+
+    async def run():
+        for key in keys:
+            await store.take(key, rate=100, capacity=200)
+
+    try:
+        benchmark.pedantic(loop.run_until_complete, args=(run(),), rounds=1)
+        assert len(store) == len(keys)
+    finally:
+        loop.close()
@@ -0,0 +1,276 @@
+"""
+二进制RPC接口测试模块。
+"""
+
+import asyncio
+import http.client
+import json
+import math
+import os
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import time
+
+import pytest
+
+from calculator import rpc
+from calculator.rpc import RpcClient, RpcError
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+
+
+@pytest.mark.parametrize(
+    "value", [1.5, -0.0, 42, -(2**63), 2**63, math.factorial(30)]
+)
+def test_value_roundtrip(value):
+    """测试结果值编码：浮点数、int64和超出int64范围的整数"""
+    decoded = rpc.decode_value(rpc.encode_value(value))
+    assert decoded == value and type(decoded) is type(value)
+
+
+def test_frame_codecs():
+    """测试调用帧和数据帧的编解码"""
+    assert rpc.decode_call(rpc.encode_call("log", [8.0, 2.0])) == ("log", (8.0, 2.0))
+    columns = [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]
+    assert rpc.decode_columns(rpc.encode_columns(columns)) == columns
+    with pytest.raises(ValueError, match="数据帧过大"):
+        rpc.decode_columns(rpc.encode_columns(columns), max_count=2)
+    with pytest.raises(ValueError):
+        rpc.decode_columns(rpc.encode_columns(columns)[:-1])
+    with pytest.raises(ValueError):
+        rpc.decode_call(b"\x05ab")
+
+
+async def _connect():
+    server = await rpc.start_server("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, await RpcClient.connect("127.0.0.1", port)
+
+
+@pytest.mark.asyncio
+async def test_unary_calls():
+    """测试单次调用，以及并发调用在同一连接上流水线执行"""
+    server, client = await _connect()
+    try:
+        assert await client.call("add", 1, 2) == 3.0
+        assert await client.call("log", 8, 2) == pytest.approx(3.0)
+        assert await client.call("log", 1) == 0.0
+        assert await client.call("gcd", 12, 18) == 6
+        assert await client.call("factorial", 25) == math.factorial(25)
+        assert await client.call("modpow", 4, 13, 497) == 445
+
+        results = await asyncio.gather(
+            *(client.call("sqrt", i * i) for i in range(100))
+        )
+        assert results == [float(i) for i in range(100)]
+    finally:
+        await client.close()
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_unary_errors():
+    """测试计算错误、未知运算和参数个数错误返回RpcError"""
+    server, client = await _connect()
+    try:
+        with pytest.raises(RpcError, match="除数不能为0"):
+            await client.call("divide", 1, 0)
+        with pytest.raises(RpcError, match="不支持的运算: modulo"):
+            await client.call("modulo", 1, 2)
+        with pytest.raises(RpcError, match="需要 2 个参数"):
+            await client.call("add", 1)
+        # 出错后连接仍可继续使用
+        assert await client.call("subtract", 5, 3) == 2.0
+    finally:
+        await client.close()
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_bidirectional_stream():
+    """测试批量计算流：连续发送多块操作数，按顺序接收结果"""
+    server, client = await _connect()
+    try:
+        stream = await client.stream("multiply")
+        chunks = [[float(i) for i in range(start, start + 50)] for start in (0, 50)]
+        for chunk in chunks:
+            await stream.send(chunk, [2.0] * len(chunk))
+        for chunk in chunks:
+            assert await stream.receive() == [x * 2 for x in chunk]
+        await stream.close()
+
+        roots = await client.stream("sqrt")
+        await roots.send([4.0, -1.0])
+        await roots.send([9.0])
+        with pytest.raises(RpcError, match="不能计算负数的平方根"):
+            await roots.receive()
+        assert await roots.receive() == [3.0]
+        await roots.close()
+
+        # 超过单帧元素上限时该块返回错误，流仍可继续使用
+        large = await client.stream("sqrt")
+        await large.send([1.0] * (rpc.MAX_STREAM_ELEMENTS + 1))
+        await large.send([1.0])
+        with pytest.raises(RpcError, match="数据帧过大"):
+            await large.receive()
+        assert await large.receive() == [1.0]
+        await large.close()
+
+        bad = await client.stream("modulo")
+        await bad.send([1.0])
+        with pytest.raises(RpcError, match="不支持的运算"):
+            await bad.receive()
+    finally:
+        await client.close()
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_protocol_error_closes_connection():
+    """测试帧长度无效时服务端返回错误并关闭连接"""
+    server = await rpc.start_server("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(struct.pack("<IBI", rpc.MAX_FRAME_SIZE + 1, rpc.CALL, 1))
+        kind, _, payload = await rpc.read_frame(reader)
+        assert kind == rpc.ERROR and "帧长度无效" in payload.decode()
+        assert await reader.read() == b""
+    finally:
+        writer.close()
+        await writer.wait_closed()
+        server.close()
+        await server.wait_closed()
+
+
+# 性能测试：对比REST接口与RPC接口的单次调用延迟和吞吐量
+_CALLS = 200
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start(args, ready):
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    process = subprocess.Popen(
+        [sys.executable, "-m", *args, "--host", "127.0.0.1", "--port", str(port)],
+        env=env,
+    )
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        try:
+            if ready(port):
+                return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise TimeoutError("服务未能在规定时间内启动")
+
+
+def _rest_ready(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+    conn.request("GET", "/health")
+    return conn.getresponse().status == 200
+
+
+def _rpc_ready(port):
+    socket.create_connection(("127.0.0.1", port), timeout=1).close()
+    return True
+
+
+@pytest.fixture(scope="module")
+def servers():
+    """以子进程方式启动REST服务（单进程）和RPC服务"""
+    rest, rest_port = _start(
+        [
+            "calculator.server",
+            "--workers",
+            "1",
+            "--no-access-log",
+            "--log-level",
+            "warning",
+        ],
+        _rest_ready,
+    )
+    try:
+        rpc_process, rpc_port = _start(["calculator.rpc"], _rpc_ready)
+    except TimeoutError:
+        rest.terminate()
+        raise
+    yield {"rest": rest_port, "rpc": rpc_port}
+    for process in (rest, rpc_process):
+        process.send_signal(signal.SIGTERM)
+        process.wait(30)
+
+
+@pytest.mark.benchmark(group="rpc")
+def test_performance_rest_sequential(benchmark, servers):
+    """测试REST接口逐个调用200次的耗时"""
+    conn = http.client.HTTPConnection("127.0.0.1", servers["rest"], timeout=10)
+    headers = {"Content-Type": "application/json"}
+
+    def run():
+        for i in range(_CALLS):
+            conn.request("POST", "/add", json.dumps({"a": i, "b": 1}), headers)
+            response = conn.getresponse()
+            response.read()
+            assert response.status == 200
+
+    benchmark(run)
+    conn.close()
+
+
+def _run_rpc(benchmark, port, scenario):
+    loop = asyncio.new_event_loop()
+    client = loop.run_until_complete(RpcClient.connect("127.0.0.1", port))
+    try:
+        benchmark(lambda: loop.run_until_complete(scenario(client)))
+    finally:
+        loop.run_until_complete(client.close())
+        loop.close()
+
+
+@pytest.mark.benchmark(group="rpc")
+def test_performance_rpc_sequential(benchmark, servers):
+    """测试RPC接口逐个调用200次的耗时"""
+
+    async def scenario(client):
+        for i in range(_CALLS):
+            await client.call("add", i, 1)
+
+    _run_rpc(benchmark, servers["rpc"], scenario)
+
+
+@pytest.mark.benchmark(group="rpc")
+def test_performance_rpc_pipelined(benchmark, servers):
+    """测试RPC接口并发调用200次（同一连接流水线）的耗时"""
+
+    async def scenario(client):
+        await asyncio.gather(*(client.call("add", i, 1) for i in range(_CALLS)))
+
+    _run_rpc(benchmark, servers["rpc"], scenario)
+
+
+@pytest.mark.benchmark(group="rpc")
+def test_performance_rpc_stream(benchmark, servers):
+    """测试通过批量计算流完成200次计算的耗时"""
+    a = [float(i) for i in range(_CALLS)]
+    b = [1.0] * _CALLS
+
+    async def scenario(client):
+        stream = await client.stream("add")
+        await stream.send(a, b)
+        assert len(await stream.receive()) == _CALLS
+        await stream.close()
+
+    _run_rpc(benchmark, servers["rpc"], scenario)
@@ -0,0 +1,172 @@
+"""
+服务入口测试模块。
+"""
+
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from calculator import server
+from calculator.server import ServerSettings, parse_args
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+
+
+def test_settings_from_env(monkeypatch):
+    """测试从环境变量读取运行参数"""
+    monkeypatch.setenv("CALCULATOR_WORKERS", "3")
+    monkeypatch.setenv("CALCULATOR_KEEP_ALIVE", "15")
+    monkeypatch.setenv("CALCULATOR_BACKLOG", "512")
+    settings = ServerSettings()
+    assert settings.workers == 3
+    assert settings.keep_alive == 15
+    assert settings.backlog == 512
+
+
+def test_cli_overrides_env(monkeypatch):
+    """测试命令行参数优先于环境变量"""
+    monkeypatch.setenv("CALCULATOR_WORKERS", "3")
+    settings = parse_args(["--workers", "5", "--port", "9000", "--no-access-log"])
+    assert settings.workers == 5
+    assert settings.port == 9000
+    assert settings.access_log is False
+
+
+def test_default_workers_match_cpus(monkeypatch):
+    """测试默认工作进程数等于可用CPU数"""
+    monkeypatch.delenv("CALCULATOR_WORKERS", raising=False)
+    assert ServerSettings().workers == server.available_cpus() >= 1
+
+
+def test_build_config_tunables():
+    """测试keep-alive和backlog传递给uvicorn"""
+    config = server.build_config(ServerSettings(keep_alive=30, backlog=100))
+    assert config.timeout_keep_alive == 30
+    assert config.backlog == 100
+    assert config.loop in ("uvloop", "asyncio")
+    assert config.http in ("httptools", "h11")
+
+
+def _crash(config, sock):
+    sys.exit(3)
+
+
+def test_supervisor_stops_crash_loop(monkeypatch):
+    """测试工作进程反复退出时停止重启并抛出CrashLoopError"""
+    monkeypatch.setattr(server, "_serve", _crash)
+    monkeypatch.setattr(server, "CHECK_INTERVAL", 0.01)
+    monkeypatch.setattr(server.signal, "signal", lambda *args: None)
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    supervisor = server.Supervisor(None, sock, 2, max_restarts=3, restart_window=60)
+    with pytest.raises(server.CrashLoopError):
+        supervisor.run()
+    assert len(supervisor._restarts) == 4
+    assert all(not process.is_alive() for process in supervisor.processes)
+    assert sock.fileno() == -1
+
+
+def test_main_exits_nonzero_on_crash_loop(monkeypatch):
+    """测试工作进程反复退出时命令行以非零退出码结束"""
+
+    def crash_loop(settings):
+        raise server.CrashLoopError("工作进程反复退出")
+
+    monkeypatch.setattr(server, "run", crash_loop)
+    with pytest.raises(SystemExit) as exc_info:
+        server.main([])
+    assert exc_info.value.code == 1
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_healthy(port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError("服务未能在规定时间内启动")
+
+
+@pytest.fixture
+def running_server(request):
+    """以子进程方式启动服务"""
+    workers = request.param
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "calculator.server",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--no-access-log",
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+    try:
+        _wait_until_healthy(port)
+        yield port
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(30)
+
+
+def _send_requests(port: int, count: int) -> None:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    body = json.dumps({"a": 1, "b": 2})
+    headers = {"Content-Type": "application/json"}
+    for _ in range(count):
+        conn.request("POST", "/add", body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 200
+    conn.close()
+
+
+# 性能测试：对比单进程和多进程的吞吐量
+@pytest.mark.benchmark(group="server")
+@pytest.mark.parametrize(
+    "running_server", [1, max(2, server.available_cpus())], indirect=True
+)
+def test_performance_workers(benchmark, running_server):
+    """测试不同工作进程数量下的吞吐量"""
+    clients, per_client = 8, 50
+
+    def run_load():
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            for future in [
+                pool.submit(_send_requests, running_server, per_client)
+                for _ in range(clients)
+            ]:
+                future.result()
+
+    benchmark.pedantic(run_load, rounds=3, iterations=1, warmup_rounds=1)
+    if benchmark.stats:
+        benchmark.extra_info["requests_per_second"] = (
+            clients * per_client / benchmark.stats.stats.mean
+        )
@@ -0,0 +1,219 @@
+"""
+分布式追踪测试模块。
+"""
+
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from calculator import lambda_handler as lambda_module
+from calculator import tracing
+from calculator.api import app
+from calculator.jobs import JobManager
+from calculator.lifecycle import request_event
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+TRACEPARENT = f"00-{TRACE_ID}-{PARENT_ID}-01"
+
+context = SimpleNamespace(
+    function_name="calculator",
+    memory_limit_in_mb=128,
+    invoked_function_arn="arn:aws:lambda:us-east-1:123456789012:function:calculator",
+    aws_request_id="test",
+)
+
+
+@pytest.fixture
+def exporter():
+    """把span导出到内存"""
+    memory = tracing.InMemorySpanExporter()
+    previous = tracing.set_exporter(memory)
+    yield memory
+    tracing.set_exporter(previous)
+
+
+def _by_name(spans):
+    return {span.name: span for span in spans}
+
+
+def test_parse_traceparent():
+    """测试解析traceparent，格式不合法时忽略"""
+    context = tracing.parse_traceparent(TRACEPARENT)
+    assert (context.trace_id, context.span_id, context.sampled) == (
+        TRACE_ID,
+        PARENT_ID,
+        True,
+    )
+    assert context.traceparent == TRACEPARENT
+    assert (
+        tracing.parse_traceparent(f"01-{TRACE_ID}-{PARENT_ID}-00-extra").sampled
+        is False
+    )
+    for value in (
+        None,
+        "",
+        f"00-{TRACE_ID}-{PARENT_ID}",
+        f"00-{TRACE_ID}-{PARENT_ID}-01-extra",
+        f"ff-{TRACE_ID}-{PARENT_ID}-01",
+        f"00-{'0' * 32}-{PARENT_ID}-01",
+        f"00-{TRACE_ID}-{'0' * 16}-01",
+        f"00-{TRACE_ID}-0x{PARENT_ID[2:]}-01",
+    ):
+        assert tracing.parse_traceparent(value) is None
+
+
+def test_noop_without_exporter():
+    """测试未配置导出器时不创建span"""
+    assert tracing.get_exporter() is None
+    with tracing.start_span("noop") as span:
+        assert span is tracing.NOOP_SPAN
+        assert tracing.current_span() is None
+    assert tracing.inject({}) == {}
+
+
+def test_nested_spans_and_inject(exporter):
+    """测试嵌套span的父子关系和向下游传播"""
+    parent = tracing.parse_traceparent(TRACEPARENT)
+    with tracing.start_span("outer", parent=parent) as outer:
+        with tracing.start_span("inner") as inner:
+            headers = tracing.inject({})
+        with pytest.raises(ValueError), tracing.start_span("failed"):
+            raise ValueError("boom")
+    spans = _by_name(exporter.get_finished_spans())
+    assert outer.context.trace_id == inner.context.trace_id == TRACE_ID
+    assert outer.parent_span_id == PARENT_ID
+    assert inner.parent_span_id == outer.context.span_id
+    assert headers == {"traceparent": inner.context.traceparent}
+    failed = spans["failed"]
+    assert failed.status == tracing.ERROR
+    assert failed.events[0]["attributes"]["exception.type"] == "ValueError"
+    assert list(spans) == ["inner", "failed", "outer"]
+
+
+def test_unsampled_parent_is_not_exported(exporter):
+    """测试上游未采样时不导出，但仍然传播追踪ID"""
+    parent = tracing.parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00")
+    with tracing.start_span("outer", parent=parent):
+        with tracing.start_span("inner") as inner:
+            assert inner.context.trace_id == TRACE_ID
+    assert exporter.get_finished_spans() == []
+
+
+def test_http_request_spans(exporter):
+    """测试HTTP请求的server span延续traceparent，路由处理为其子span"""
+    client = TestClient(app)
+    response = client.post(
+        "/add", json={"a": 1, "b": 2}, headers={"traceparent": TRACEPARENT}
+    )
+    assert response.status_code == 200
+    spans = _by_name(exporter.get_finished_spans())
+    server, route = spans["POST /add"], spans["route /add"]
+    assert server.kind == tracing.SERVER
+    assert server.context.trace_id == route.context.trace_id == TRACE_ID
+    assert server.parent_span_id == PARENT_ID
+    assert route.parent_span_id == server.context.span_id
+    assert server.attributes["http.route"] == "/add"
+    assert server.attributes["http.status_code"] == 200
+
+
+def test_validation_error_is_not_span_error(exporter):
+    """测试参数校验失败记录为事件，不把span标记为出错"""
+    client = TestClient(app)
+    response = client.post("/add", json={"a": "x"})
+    assert response.status_code == 422
+    spans = _by_name(exporter.get_finished_spans())
+    route = spans["route /add"]
+    assert route.status == tracing.UNSET
+    assert route.attributes["http.status_code"] == 422
+    assert route.events[0]["attributes"]["exception.type"] == "RequestValidationError"
+    assert spans["POST /add"].attributes["http.status_code"] == 422
+
+
+def test_lambda_handler_spans(exporter, monkeypatch):
+    """测试Lambda调用、Mangum转换和路由处理的span属于同一追踪"""
+    monkeypatch.setattr(lambda_module, "FAST_PATH_ENABLED", False)
+    event = request_event("GET", "/sqrt", {"value": "16"})
+    event["headers"] = {"Traceparent": TRACEPARENT}
+    response = lambda_module.lambda_handler(event, context)
+    assert response["statusCode"] == 200
+    spans = _by_name(exporter.get_finished_spans())
+    invocation = spans["lambda_handler"]
+    chain = [invocation, spans["mangum"], spans["GET /sqrt"], spans["route /sqrt"]]
+    assert invocation.parent_span_id == PARENT_ID
+    for parent, child in zip(chain, chain[1:]):
+        assert child.parent_span_id == parent.context.span_id
+        assert child.context.trace_id == TRACE_ID
+    assert invocation.attributes["faas.invocation_id"] == "test"
+    assert invocation.attributes["calculator.fast_path"] is False
+
+
+def test_lambda_fast_path_span(exporter, monkeypatch):
+    """测试快速路径只创建Lambda调用的span"""
+    monkeypatch.setattr(lambda_module, "FAST_PATH_ENABLED", True)
+    event = request_event("POST", "/add")
+    event["body"] = json.dumps({"a": 1, "b": 2})
+    response = lambda_module.lambda_handler(event, context)
+    assert response["statusCode"] == 200
+    [span] = exporter.get_finished_spans()
+    assert span.name == "lambda_handler"
+    assert span.attributes["calculator.fast_path"] is True
+    assert span.attributes["http.status_code"] == 200
+
+
+def test_job_spans_continue_submitting_trace(exporter):
+    """测试批量任务在工作线程中延续提交请求的追踪，每次批量计算一个span"""
+    manager = JobManager(chunk_size=2)
+    with tracing.start_span("submit") as submit:
+        job = manager.submit("add", [1.0, 2.0, 3.0], [4.0, 5.0, 6.0])
+    assert manager.wait(job.id, timeout=5)
+    manager.shutdown()
+    spans = exporter.get_finished_spans()
+    [job_span] = [span for span in spans if span.name == "job"]
+    chunks = [
+        span
+        for span in spans
+        if span.name == "evaluate_many"
+        and span.parent_span_id == job_span.context.span_id
+    ]
+    assert job_span.parent_span_id == submit.context.span_id
+    assert job_span.context.trace_id == submit.context.trace_id
+    assert [span.attributes["calculator.count"] for span in chunks] == [2, 1]
+
+
+def test_console_exporter():
+    """测试控制台导出器每个span输出一行JSON"""
+    stream = io.StringIO()
+    previous = tracing.set_exporter(tracing.ConsoleSpanExporter(stream))
+    try:
+        with tracing.start_span("console", {"key": "值"}):
+            pass
+    finally:
+        tracing.set_exporter(previous)
+    record = json.loads(stream.getvalue())
+    assert record["name"] == "console"
+    assert record["attributes"] == {"key": "值"}
+    assert len(record["trace_id"]) == 32 and len(record["span_id"]) == 16
+
+
+# 性能测试：未配置导出器（空操作）和导出到内存时单个请求的耗时
+@pytest.mark.benchmark(group="tracing")
+@pytest.mark.parametrize("enabled", [False, True])
+def test_performance_tracing_overhead(benchmark, enabled):
+    """测试有无追踪时单个请求的耗时"""
+    memory = tracing.InMemorySpanExporter() if enabled else None
+    previous = tracing.set_exporter(memory)
+    client = TestClient(app)
+
+    def request():
+        client.post("/add", json={"a": 1, "b": 2})
+        if memory is not None:
+            memory.clear()
+
+    try:
+        benchmark(request)
+    finally:
+        tracing.set_exporter(previous)
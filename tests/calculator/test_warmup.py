@@ -0,0 +1,93 @@
+"""
+预热程序测试模块。
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from calculator import api, lifecycle, warmup
+from calculator.lambda_handler import lambda_handler
+from calculator.ratelimit import RateLimitMiddleware
+from calculator.server import parse_args
+
+
+def _rate_limiter():
+    if api.app.middleware_stack is None:
+        api.app.middleware_stack = api.app.build_middleware_stack()
+    layer = api.app.middleware_stack
+    while not isinstance(layer, RateLimitMiddleware):
+        layer = layer.app
+    return layer
+
+
+def test_every_route_has_a_warmup_request():
+    """测试除提交任务外的每个HTTP路由都有预热请求"""
+    requests, missing = warmup.build_requests(api.app)
+    assert missing == []
+    names = {(request.method, request.path) for request in requests}
+    for op in api.OPERATIONS.values():
+        assert ("POST", f"/{op.name}") in names and ("GET", f"/{op.name}") in names
+    assert ("POST", "/jobs") not in names
+
+
+def test_warm_up_is_excluded_from_metrics():
+    """测试预热请求全部成功，且不计入准入控制指标、不消耗限流配额"""
+    store = _rate_limiter().store
+    admitted = api.admission.snapshot()["admitted"]
+    clients = len(store)
+
+    report = warmup.run_warm_up()
+    assert report["failed"] == [] and report["missing"] == []
+    assert report["requests"] == len(report["routes"])
+    assert report["duration_ms"] > 0
+
+    assert api.admission.snapshot()["admitted"] == admitted
+    assert len(store) == clients
+    assert api.job_manager.snapshot()["queued"] == 0
+
+
+@pytest.mark.parametrize(
+    "event,expected",
+    [
+        ({"warmup": True}, True),
+        ({"source": "serverless-plugin-warmup"}, True),
+        ({"warmup": "true"}, False),
+        ({"httpMethod": "GET", "path": "/health"}, False),
+        ([], False),
+    ],
+)
+def test_is_warmup_event(event, expected):
+    """测试Lambda预热事件的识别"""
+    assert warmup.is_warmup_event(event) is expected
+
+
+def test_lambda_warmup_event():
+    """测试Lambda处理函数收到预热事件时返回预热报告"""
+    context = SimpleNamespace(
+        function_name="calculator",
+        memory_limit_in_mb=128,
+        invoked_function_arn="arn:aws:lambda:us-east-1:123456789012:function:calc",
+        aws_request_id="warmup",
+    )
+    report = lambda_handler({"warmup": True}, context)
+    assert report["failed"] == [] and report["requests"] > 0
+    # 预热之后仍能通过Mangum处理请求
+    response = lambda_handler(lifecycle.request_event("GET", "/health"), context)
+    assert response["statusCode"] == 200
+
+
+def test_server_warmup_option(monkeypatch):
+    """测试服务启动预热可以通过环境变量或命令行关闭"""
+    assert parse_args([]).warmup is True
+    assert parse_args(["--no-warmup"]).warmup is False
+    monkeypatch.setenv("CALCULATOR_WARMUP", "0")
+    assert parse_args([]).warmup is False
+
+
+# 性能测试：预热程序请求全部路由的耗时
+@pytest.mark.benchmark(group="warmup")
+def test_performance_warm_up(benchmark):
+    """测试预热程序请求全部路由一遍的耗时"""
+    report = benchmark(warmup.run_warm_up)
+    assert report["failed"] == []
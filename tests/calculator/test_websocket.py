@@ -0,0 +1,206 @@
+"""
+WebSocket计算接口测试模块。
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from calculator.api import app
+from calculator.websocket import OPERATIONS, CalculationSession, _Operation
+
+client = TestClient(app)
+
+
+def _receive_all(websocket, count):
+    replies = [websocket.receive_json() for _ in range(count)]
+    return {reply["id"]: reply for reply in replies}
+
+
+def test_pipelined_messages():
+    """测试连续发送多条消息后按id取回全部结果"""
+    with client.websocket_connect("/ws") as websocket:
+        for i in range(100):
+            websocket.send_json({"id": i, "operation": "multiply", "a": i, "b": 2})
+        websocket.send_json({"id": "log", "operation": "log", "value": 8, "base": 2})
+        websocket.send_json({"id": "ln", "operation": "log", "value": 1})
+        websocket.send_json(
+            {
+                "id": "mp",
+                "operation": "modpow",
+                "base": 4,
+                "exponent": 13,
+                "modulus": 497,
+            }
+        )
+        replies = _receive_all(websocket, 103)
+    assert [replies[i]["result"] for i in range(100)] == [i * 2 for i in range(100)]
+    assert replies["log"]["result"] == pytest.approx(3.0)
+    assert replies["ln"]["result"] == 0.0
+    assert replies["mp"]["result"] == 445
+
+
+def test_big_integer_operations():
+    """测试大整数运算接受字符串参数并以字符串返回结果"""
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"id": 1, "operation": "int/factorial", "n": 25})
+        websocket.send_json({"id": 2, "operation": "int/binomial", "n": "50", "k": 3})
+        websocket.send_json({"id": 3, "operation": "int/is_prime", "n": 97})
+        replies = _receive_all(websocket, 3)
+    assert replies[1]["result"] == "15511210043330985984000000"
+    assert replies[2]["result"] == "19600"
+    assert replies[3]["result"] is True
+
+
+@pytest.mark.parametrize(
+    "message,error",
+    [
+        ("not json", "消息不是有效的JSON"),
+        ("[1, 2]", "消息必须是JSON对象"),
+        ('{"id": 1, "operation": "modulo"}', "不支持的运算: modulo"),
+        ('{"id": 1, "operation": "add", "a": 1}', "缺少参数: b"),
+        ('{"id": 1, "operation": "add", "a": "1", "b": 2}', "参数 a 必须是数值"),
+        ('{"id": 1, "operation": "int/factorial", "n": 1.5}', "参数 n 必须是整数"),
+        ('{"id": 1, "operation": "sqrt", "value": -1}', "不能计算负数的平方根"),
+        ('{"id": 1, "operation": "sqrt", "value": NaN}', "参数 value 必须是有限数值"),
+        ('{"id": 1, "operation": "add", "a": Infinity, "b": 1}', "参数 a 必须是有限数值"),
+        ('{"id": 1, "operation": "add", "a": 1, "b": 1e400}', "参数 b 必须是有限数值"),
+        (
+            '{"id": 1, "operation": "multiply", "a": 1e200, "b": 1e200}',
+            "计算结果超出范围",
+        ),
+        ('{"id": NaN, "operation": "add", "a": 1, "b": 1}', "消息的id必须是有效的JSON值"),
+    ],
+)
+def test_error_replies(message, error):
+    """测试出错的消息得到错误回复，连接保持可用"""
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_text(message)
+        reply = websocket.receive_json()
+        assert error in reply["error"]
+        websocket.send_json({"id": 2, "operation": "add", "a": 1, "b": 1})
+        assert websocket.receive_json() == {"id": 2, "result": 2}
+
+
+def test_replies_out_of_order(monkeypatch):
+    """测试耗时较长的运算不阻塞后续消息，回复按完成顺序发送"""
+    gate = threading.Event()
+    slow = _Operation(lambda n: gate.wait(5) and n, ("n",), big=True)
+    monkeypatch.setitem(OPERATIONS, "slow", slow)
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"id": 1, "operation": "slow", "n": 7})
+        websocket.send_json({"id": 2, "operation": "add", "a": 1, "b": 2})
+        assert websocket.receive_json() == {"id": 2, "result": 3}
+        gate.set()
+        assert websocket.receive_json() == {"id": 1, "result": "7"}
+
+
+class FakeWebSocket:
+    """只在放行后才发送回复的WebSocket，模拟不读取回复的客户端"""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.received = 0
+        self.sent = []
+        self.send_gate = asyncio.Event()
+        self.closed = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        if self.received < len(self.messages):
+            self.received += 1
+            return {
+                "type": "websocket.receive",
+                "text": self.messages[self.received - 1],
+            }
+        await self.closed.wait()
+        return {"type": "websocket.disconnect", "code": 1000}
+
+    async def send_text(self, text):
+        await self.send_gate.wait()
+        self.sent.append(json.loads(text))
+
+
+@pytest.mark.asyncio
+async def test_backpressure_stops_reading():
+    """测试客户端不读取回复时，服务端停止读取新消息"""
+    messages = [
+        json.dumps({"id": i, "operation": "add", "a": i, "b": 0}) for i in range(20)
+    ]
+    websocket = FakeWebSocket(messages)
+    session = CalculationSession(websocket, max_inflight=2, max_pending_replies=2)
+    task = asyncio.create_task(session.run())
+    await asyncio.sleep(0.05)
+    # 1条正在发送，2条在待发送队列中，2条处理完等待入队
+    assert websocket.received == 5
+
+    websocket.send_gate.set()
+    for _ in range(100):
+        if len(websocket.sent) == 20:
+            break
+        await asyncio.sleep(0.01)
+    assert sorted(reply["id"] for reply in websocket.sent) == list(range(20))
+    websocket.closed.set()
+    await asyncio.wait_for(task, 1)
+
+
+@pytest.mark.asyncio
+async def test_big_operations_bounded(monkeypatch):
+    """测试每个连接同时执行的大整数运算有上限，断开后排队的运算不再执行"""
+    gate = threading.Event()
+    started = []
+
+    def slow(n):
+        started.append(n)
+        gate.wait(5)
+        return n
+
+    monkeypatch.setitem(OPERATIONS, "slow", _Operation(slow, ("n",), big=True))
+    messages = [json.dumps({"id": i, "operation": "slow", "n": i}) for i in range(3)]
+    websocket = FakeWebSocket(messages)
+    websocket.send_gate.set()
+    session = CalculationSession(websocket, max_big_inflight=1)
+    task = asyncio.create_task(session.run())
+    await asyncio.sleep(0.05)
+    assert websocket.received == 3 and started == [0]
+
+    websocket.closed.set()
+    await asyncio.wait_for(task, 1)
+    gate.set()
+    await asyncio.sleep(0.05)
+    assert started == [0] and websocket.sent == []
+
+
+# 性能测试：同一连接流水线计算与逐个HTTP请求的对比
+_COUNT = 200
+
+
+@pytest.mark.benchmark(group="websocket")
+def test_performance_websocket_pipeline(benchmark):
+    """测试一个WebSocket连接上流水线完成200次计算的耗时"""
+    messages = [
+        json.dumps({"id": i, "operation": "add", "a": i, "b": 1}) for i in range(_COUNT)
+    ]
+    with client.websocket_connect("/ws") as websocket:
+
+        def run():
+            for message in messages:
+                websocket.send_text(message)
+            return [websocket.receive_text() for _ in range(_COUNT)]
+
+        assert len(benchmark(run)) == _COUNT
+
+
+@pytest.mark.benchmark(group="websocket")
+def test_performance_http_requests(benchmark):
+    """测试逐个HTTP请求完成200次计算的耗时"""
+
+    def run():
+        return [client.post("/add", json={"a": i, "b": 1}) for i in range(_COUNT)]
+
+    assert len(benchmark(run)) == _COUNT
@@ -0,0 +1,12 @@
+"""
+测试公共配置。
+"""
+
+import os
+
+# 性能测试会以远超默认限额的速率请求同一个应用，测试中放宽按客户端限流；
+# 限流本身在 test_ratelimit.py 中用独立配置的应用测试
+os.environ.setdefault("CALCULATOR_RATE_LIMIT", "1e9")
+os.environ.setdefault("CALCULATOR_RATE_BURST", "1e9")
+# 访问日志写到标准输出，测试中关闭；访问日志本身在 test_accesslog.py 中用独立的写入器测试
+os.environ.setdefault("CALCULATOR_ACCESS_LOG", "0")
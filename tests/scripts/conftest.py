@@ -0,0 +1,11 @@
+"""
+运维脚本测试的公共配置。
+
+scripts 目录下的脚本以 `python scripts/<name>.py` 方式运行，互相之间按模块名导入，
+测试中把该目录加入模块搜索路径。
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "scripts"))
@@ -0,0 +1,136 @@
+"""
+Lambda部署包构建脚本测试模块。
+"""
+
+import os
+
+import pytest
+from build_lambda import export_requirements
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+
+PYPROJECT = """
+[tool.poetry.dependencies]
+python = ">=3.8"
+app = "^1.0"
+skipped = "^1.0"
+"""
+
+LOCK = """
+[[package]]
+name = "app"
+version = "1.0"
+files = [{file = "app-1.0.whl", hash = "sha256:aaa"}]
+
+[package.dependencies]
+backport = {version = "*", markers = "python_version < \\"3.11\\""}
+plugin = {version = "*", optional = true}
+shared = "*"
+Web_Server = {version = "*", extras = ["fast"]}
+
+[package.extras]
+plugin = ["plugin (>=1)"]
+
+[[package]]
+name = "backport"
+version = "2.0"
+files = [{file = "backport-2.0.whl", hash = "sha256:bbb"}]
+
+[package.dependencies]
+compat = {version = "*", markers = "sys_platform == \\"win32\\""}
+
+[[package]]
+name = "compat"
+version = "3.0"
+files = [{file = "compat-3.0.whl", hash = "sha256:ccc"}]
+
+[[package]]
+name = "plugin"
+version = "4.0"
+files = [{file = "plugin-4.0.whl", hash = "sha256:ddd"}]
+
+[[package]]
+name = "shared"
+version = "5.0"
+files = [
+    {file = "shared-5.0.whl", hash = "sha256:eee"},
+    {file = "shared-5.0.tar.gz", hash = "sha256:fff"},
+]
+
+[[package]]
+name = "skipped"
+version = "6.0"
+files = [{file = "skipped-6.0.whl", hash = "sha256:ggg"}]
+
+[package.dependencies]
+shared = "*"
+only-skipped = "*"
+
+[[package]]
+name = "only-skipped"
+version = "7.0"
+files = [{file = "only_skipped-7.0.whl", hash = "sha256:hhh"}]
+
+[[package]]
+name = "web-server"
+version = "8.0"
+files = [{file = "web_server-8.0.whl", hash = "sha256:iii"}]
+
+[package.dependencies]
+speedups = {version = "*", optional = true}
+
+[package.extras]
+fast = ["speedups (>=1)"]
+
+[[package]]
+name = "speedups"
+version = "9.0"
+files = [{file = "speedups-9.0.whl", hash = "sha256:jjj"}]
+"""
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "pyproject.toml").write_text(PYPROJECT)
+    (tmp_path / "poetry.lock").write_text(LOCK)
+    return str(tmp_path / "pyproject.toml"), str(tmp_path / "poetry.lock")
+
+
+def test_export_requirements(project):
+    """测试导出主依赖的传递依赖，合并环境标记，排除的依赖不导出"""
+    requirements = export_requirements(*project, excluded={"skipped"})
+    assert requirements == [
+        "app==1.0 --hash=sha256:aaa",
+        'backport==2.0 ; python_version < "3.11" --hash=sha256:bbb',
+        'compat==3.0 ; (python_version < "3.11") and (sys_platform == "win32")'
+        " --hash=sha256:ccc",
+        "shared==5.0 --hash=sha256:eee --hash=sha256:fff",
+        "speedups==9.0 --hash=sha256:jjj",
+        "web-server==8.0 --hash=sha256:iii",
+    ]
+
+
+def test_export_requires_locked_hashes(project, tmp_path):
+    """测试poetry.lock中缺少依赖或文件哈希时构建失败"""
+    lock = tmp_path / "poetry.lock"
+    lock.write_text(
+        LOCK.replace('files = [{file = "app-1.0.whl", hash = "sha256:aaa"}]', "")
+    )
+    with pytest.raises(RuntimeError, match="缺少 app 的文件哈希"):
+        export_requirements(*project, excluded={"skipped"})
+    lock.write_text(LOCK.replace('name = "compat"', 'name = "other"'))
+    with pytest.raises(RuntimeError, match="缺少依赖 compat"):
+        export_requirements(*project, excluded={"skipped"})
+
+
+def test_export_project_lock():
+    """测试项目的poetry.lock：只导出Lambda需要的依赖，每个依赖都带文件哈希"""
+    requirements = export_requirements(
+        os.path.join(ROOT, "pyproject.toml"), os.path.join(ROOT, "poetry.lock")
+    )
+    names = {line.split("==", 1)[0] for line in requirements}
+    assert {"fastapi", "starlette", "pydantic-core", "mangum"} <= names
+    assert "aws-lambda-powertools" in names
+    for excluded in ("boto3", "botocore", "requests", "paramiko", "uvicorn"):
+        assert excluded not in names
+    assert all("--hash=sha256:" in line for line in requirements)
@@ -0,0 +1,49 @@
+"""
+工作流失败日志扫描测试模块。
+"""
+
+from check_workflow_errors import (
+    WINDOW_TRUNCATED_MARKER,
+    FailureScanner,
+    iter_log_lines,
+)
+
+
+def test_failure_window_context():
+    """测试失败片段带上前后的上下文，并去掉时间戳"""
+    scanner = FailureScanner(context_before=1, context_after=1)
+    for line in ["a", "b", "2024-01-28T10:00:00.1234567Z FAILED tests/x.py", "c", "d"]:
+        scanner.feed(line)
+    assert scanner.windows == [["b", "FAILED tests/x.py", "c"]]
+    assert scanner.line_count == 5
+
+
+def test_failure_window_line_cap():
+    """测试连续命中失败特征时单个片段的行数有上限，并记录截断标记"""
+    scanner = FailureScanner(context_before=0, context_after=0, max_window_lines=3)
+    for i in range(1000):
+        scanner.feed(f"E   assert {i}")
+    [window] = scanner.windows
+    assert window == ["E   assert 0", "E   assert 1", "E   assert 2"] + [
+        WINDOW_TRUNCATED_MARKER
+    ]
+
+
+def test_window_count_cap():
+    """测试失败片段数量超过上限时丢弃后续片段"""
+    scanner = FailureScanner(context_before=0, context_after=0, max_windows=1)
+    for line in ["FAILED a", "ok", "FAILED b"]:
+        scanner.feed(line)
+    assert scanner.windows == [["FAILED a"]]
+    assert scanner.truncated
+
+
+def test_iter_log_lines():
+    """测试跨块切分行、多字节字符和超长行截断"""
+    data = "第一行\r\n第二行\n".encode() + b"x" * 10
+    chunks = [data[i : i + 4] for i in range(0, len(data), 4)]
+    assert list(iter_log_lines(chunks, max_line_length=5)) == [
+        "第一行",
+        "第二行",
+        "xxxxx",
+    ]
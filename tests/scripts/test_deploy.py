@@ -0,0 +1,87 @@
+"""
+滚动部署脚本测试模块。
+"""
+
+import pytest
+from deploy import (
+    DEFAULT_DEPLOY_CONFIG,
+    DeployError,
+    HostDeployment,
+    rollback_host,
+    rolling_deploy,
+)
+from ssh_session import CommandResult, SSHSessionManager
+
+IMAGE = "python-serverless-demo:new"
+SETTINGS = dict(DEFAULT_DEPLOY_CONFIG, health_timeout=0, health_interval=0)
+
+
+class _FakeDocker(SSHSessionManager):
+    """
+    按主机模拟docker和健康检查的会话管理器。
+
+    Args:
+        running: 主机名到部署前容器镜像ID的映射，没有容器的主机不在其中
+        unhealthy: 部署新镜像后健康检查失败的主机
+    """
+
+    def __init__(self, running, unhealthy=()):
+        super().__init__()
+        self.images = dict(running)
+        self.unhealthy = set(unhealthy)
+        self.commands = []
+
+    def run(self, host, command, check_error=True, timeout=None):
+        name = host["host"]
+        self.commands.append((name, command))
+        stdout, exit_status = "", 0
+        if command.startswith("docker inspect"):
+            assert "{{.Image}}" in command
+            stdout = self.images.get(name, "")
+            exit_status = 0 if stdout else 1
+        elif command.startswith("curl"):
+            if self.images.get(name) == IMAGE and name in self.unhealthy:
+                exit_status = 7
+            else:
+                stdout = '{"status": "healthy"}'
+        elif " docker run " in command:
+            self.images[name] = command.split()[-1]
+        elif command.startswith("docker stop"):
+            self.images.pop(name, None)
+        return CommandResult(name, command, exit_status, stdout, "", 0.0)
+
+
+def _deployments(*names):
+    return [HostDeployment({"host": name}) for name in names]
+
+
+def test_successful_deploy():
+    """测试全部主机健康时不回滚"""
+    sessions = _FakeDocker({"a": "sha256:aaa", "b": "sha256:bbb"})
+    rolling_deploy(sessions, _deployments("a", "b"), IMAGE, SETTINGS)
+    assert sessions.images == {"a": IMAGE, "b": IMAGE}
+
+
+def test_rollback_to_previous_image_id():
+    """测试失败时已替换的主机按镜像ID回滚，未替换的主机保持不变"""
+    running = {"a": "sha256:aaa", "b": "sha256:bbb", "c": "sha256:ccc"}
+    sessions = _FakeDocker(running, unhealthy={"b"})
+    deployments = _deployments("a", "b", "c")
+    with pytest.raises(DeployError):
+        rolling_deploy(sessions, deployments, IMAGE, SETTINGS)
+    assert sessions.images == running
+    assert [d.previous_image for d in deployments] == list(running.values())
+    assert "健康检查超时" in deployments[1].error
+    assert not any(
+        name == "c" and "docker run" in command for name, command in sessions.commands
+    )
+
+
+def test_rollback_without_previous_container():
+    """测试部署前没有容器时，回滚只停止新容器"""
+    sessions = _FakeDocker({})
+    [deployment] = _deployments("a")
+    rolling_deploy(sessions, [deployment], IMAGE, SETTINGS)
+    rollback_host(sessions, deployment, SETTINGS)
+    assert deployment.previous_image is None
+    assert sessions.images == {}
@@ -0,0 +1,44 @@
+"""
+Docker安装脚本测试模块。
+"""
+
+from setup_docker import install_docker
+from ssh_session import CommandResult
+
+
+class _RecordingSessions:
+    """记录执行的命令，未安装时 docker --version 返回非零退出码"""
+
+    def __init__(self, installed=False):
+        self.installed = installed
+        self.calls = []
+
+    def run(self, host, command, check_error=True):
+        self.calls.append(("run", command.strip()))
+        missing = command == "docker --version" and not self.installed
+        return CommandResult(host["host"], command, int(missing), "", "", 0.0)
+
+    def run_parallel(self, host, commands, check_error=True):
+        self.calls.append(("run_parallel", tuple(commands)))
+        return [
+            CommandResult(host["host"], command, 0, "", "", 0.0) for command in commands
+        ]
+
+
+def test_systemctl_commands_are_sequential():
+    """测试启动和开机自启Docker服务按顺序执行，不并发"""
+    sessions = _RecordingSessions()
+    install_docker(sessions, {"host": "server"})
+    start = sessions.calls.index(("run", "sudo systemctl start docker"))
+    enable = sessions.calls.index(("run", "sudo systemctl enable docker"))
+    assert start < enable
+    for kind, commands in sessions.calls:
+        if kind == "run_parallel":
+            assert not any("systemctl" in command for command in commands)
+
+
+def test_skips_when_installed():
+    """测试已安装Docker时跳过安装"""
+    sessions = _RecordingSessions(installed=True)
+    install_docker(sessions, {"host": "server"})
+    assert sessions.calls == [("run", "docker --version")]
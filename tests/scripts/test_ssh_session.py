@@ -0,0 +1,239 @@
+"""
+SSH会话管理测试模块。
+
+用paramiko的ServerInterface在本机启动一个进程内的SSH服务端，命令按预设的
+输出和退出码返回，测试真实的连接、channel和按行读取流程。
+"""
+
+import socket
+import threading
+import time
+
+import paramiko
+import pytest
+from ssh_session import MAX_OUTPUT_LINES, CommandError, SSHSessionManager
+
+HOST_KEY = paramiko.RSAKey.generate(1024)
+USERNAME = "deploy"
+PASSWORD = "secret"
+
+
+class _Server(paramiko.ServerInterface):
+    """只接受密码认证和exec请求的SSH服务端"""
+
+    def __init__(self, commands):
+        self.commands = commands
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        if (username, password) == (USERNAME, PASSWORD):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        handler = self.commands.get(command.decode())
+        if handler is None:
+            return False
+        threading.Thread(target=handler, args=(channel,), daemon=True).start()
+        return True
+
+
+def _reply(stdout=b"", stderr=b"", exit_status=0, delay=0.0):
+    """按预设输出应答的命令"""
+
+    def handler(channel):
+        # 服务端在check_channel_exec_request返回后才确认exec请求，确认之前关闭
+        # channel会让客户端的exec_command失败，先稍等片刻
+        time.sleep(0.05 + delay)
+        channel.sendall(stdout)
+        channel.sendall_stderr(stderr)
+        channel.send_exit_status(exit_status)
+        channel.close()
+
+    return handler
+
+
+def _hang(channel):
+    """一直不退出的命令"""
+    time.sleep(5)
+
+
+@pytest.fixture
+def ssh_server():
+    """在本机随机端口启动SSH服务端，返回主机配置和服务端记录"""
+    commands = {
+        "echo": _reply(b"first\r\nsecond\n\xe4\xb8\xad\xe6\x96\x87"),
+        "fail": _reply(b"partial\n", b"boom\n", exit_status=3),
+        "slow": _reply(b"slow\n", delay=0.3),
+        "many": _reply(
+            "".join(f"line {i}\n" for i in range(MAX_OUTPUT_LINES + 50)).encode()
+        ),
+        "hang": _hang,
+    }
+    state = {"connections": 0}
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    transports = []
+
+    def accept():
+        while True:
+            try:
+                sock, _ = listener.accept()
+            except OSError:
+                return
+            state["connections"] += 1
+            transport = paramiko.Transport(sock)
+            transport.add_server_key(HOST_KEY)
+            transport.start_server(server=_Server(commands))
+            transports.append(transport)
+
+    threading.Thread(target=accept, daemon=True).start()
+    host = {
+        "host": "127.0.0.1",
+        "port": listener.getsockname()[1],
+        "username": USERNAME,
+        "password": PASSWORD,
+    }
+    yield host, state
+    listener.close()
+    for transport in transports:
+        transport.close()
+
+
+@pytest.fixture
+def sessions():
+    manager = SSHSessionManager(connect_timeout=5)
+    yield manager
+    manager.close()
+
+
+def test_run_streams_lines(ssh_server, sessions, caplog):
+    """测试按行读取输出，处理CRLF、末尾无换行的行和多字节字符"""
+    host, _ = ssh_server
+    caplog.set_level("INFO", logger="ssh_session")
+    result = sessions.run(host, "echo")
+    assert result.exit_status == 0
+    assert result.stdout == "first\nsecond\n中文"
+    assert result.stderr == ""
+    assert "[127.0.0.1] 输出: 中文" in caplog.text
+
+
+def test_run_failure(ssh_server, sessions):
+    """测试退出码非零时抛出CommandError，check_error=False时返回结果"""
+    host, _ = ssh_server
+    with pytest.raises(CommandError) as info:
+        sessions.run(host, "fail")
+    assert info.value.result.exit_status == 3
+    assert info.value.result.stderr == "boom"
+    result = sessions.run(host, "fail", check_error=False)
+    assert (result.stdout, result.exit_status) == ("partial", 3)
+
+
+def test_output_keeps_last_lines(ssh_server, sessions):
+    """测试只保留最后 MAX_OUTPUT_LINES 行输出"""
+    host, _ = ssh_server
+    lines = sessions.run(host, "many").stdout.splitlines()
+    assert len(lines) == MAX_OUTPUT_LINES
+    assert lines[-1] == f"line {MAX_OUTPUT_LINES + 49}"
+
+
+def test_run_timeout(ssh_server, sessions):
+    """测试命令超时时抛出TimeoutError"""
+    host, _ = ssh_server
+    with pytest.raises(TimeoutError):
+        sessions.run(host, "hang", timeout=0.3)
+
+
+def test_connection_reused(ssh_server, sessions):
+    """测试多次执行和并发执行复用同一个连接，并发结果与命令顺序一致"""
+    host, state = ssh_server
+    sessions.run(host, "echo")
+    start = time.monotonic()
+    slow, echo, again = sessions.run_parallel(host, ["slow", "echo", "slow"])
+    assert time.monotonic() - start < 0.6
+    assert (slow.stdout, echo.stdout.splitlines()[0], again.stdout) == (
+        "slow",
+        "first",
+        "slow",
+    )
+    assert state["connections"] == 1
+
+
+def test_reconnect_after_close(ssh_server, sessions):
+    """测试连接断开后重新连接"""
+    host, state = ssh_server
+    sessions.run(host, "echo")
+    sessions.get_client(host).close()
+    sessions.run(host, "echo")
+    assert state["connections"] == 2
+
+
+def test_fan_out_collects_errors(ssh_server, sessions):
+    """测试多主机任务中单台主机失败时，结果中记录对应的异常"""
+    host, _ = ssh_server
+    rejected = {**host, "host": "localhost", "password": "wrong"}
+    results = sessions.fan_out(
+        [host, rejected], lambda h: sessions.run(h, "echo").stdout
+    )
+    assert results["127.0.0.1"].startswith("first")
+    assert isinstance(results["localhost"], Exception)
+
+
+class _BarrierClient:
+    """连接时等待其他主机的连接同时开始的SSH客户端替身"""
+
+    def __init__(self, barrier):
+        self.barrier = barrier
+
+    def set_missing_host_key_policy(self, policy):
+        pass
+
+    def connect(self, **kwargs):
+        self.barrier.wait()
+
+    def get_transport(self):
+        return _BarrierTransport()
+
+    def close(self):
+        pass
+
+
+class _BarrierTransport:
+    def set_keepalive(self, interval):
+        pass
+
+    def is_active(self):
+        return True
+
+
+def test_fan_out_connects_concurrently():
+    """测试不同主机的连接同时建立，不互相等待"""
+    barrier = threading.Barrier(2, timeout=2)
+    manager = SSHSessionManager(client_factory=lambda: _BarrierClient(barrier))
+    hosts = [{"host": name, "username": USERNAME} for name in ("a", "b")]
+    results = manager.fan_out(hosts, manager.get_client)
+    assert all(isinstance(client, _BarrierClient) for client in results.values())
+
+
+def test_failed_connect_closes_client(ssh_server):
+    """测试连接失败时关闭客户端，不留下未关闭的连接"""
+    host, _ = ssh_server
+    clients = []
+
+    def factory():
+        clients.append(paramiko.SSHClient())
+        return clients[-1]
+
+    manager = SSHSessionManager(connect_timeout=5, client_factory=factory)
+    with pytest.raises(paramiko.AuthenticationException):
+        manager.get_client({**host, "password": "wrong"})
+    [client] = clients
+    assert client.get_transport() is None
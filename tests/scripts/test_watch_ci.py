@@ -0,0 +1,128 @@
+"""
+工作流运行监听脚本测试模块。
+"""
+
+import json
+import threading
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+import watch_ci
+from watch_ci import (
+    DEFAULT_RATE_LIMIT_WAIT,
+    MAX_RATE_LIMIT_RETRIES,
+    ConditionalClient,
+    parse_retry_after,
+)
+
+CONFIG = {"github": {"repository": "owner/repo", "token": "token"}}
+
+
+def _response(status, headers=None, body=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = json.dumps(body).encode() if body is not None else b""
+    response.url = "https://api.github.com/repos/owner/repo/actions/runs"
+    return response
+
+
+class _FakeSession:
+    """按顺序返回预设响应，并记录请求头"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.requests.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """记录测试线程中的等待，不真正等待；其他测试遗留的后台线程照常等待"""
+    calls = []
+    sleep = time.sleep
+    test_thread = threading.get_ident()
+
+    def fake_sleep(seconds):
+        if threading.get_ident() == test_thread:
+            calls.append(seconds)
+        else:
+            sleep(seconds)
+
+    monkeypatch.setattr(watch_ci.time, "sleep", fake_sleep)
+    return calls
+
+
+def _client(*responses):
+    client = ConditionalClient(CONFIG)
+    client.session = _FakeSession(*responses)
+    return client
+
+
+def test_parse_retry_after():
+    """测试解析秒数和HTTP日期格式的Retry-After"""
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("-5") == 0.0
+    assert 25 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert parse_retry_after(formatdate(time.time() - 30, usegmt=True)) == 0.0
+    assert parse_retry_after("soon") == 0.0
+
+
+@pytest.mark.parametrize(
+    "status,headers,wait",
+    [
+        (429, {"Retry-After": "7"}, 7.0),
+        (403, {"Retry-After": "3"}, 3.0),
+        (429, {}, DEFAULT_RATE_LIMIT_WAIT),
+    ],
+)
+def test_retry_after_rate_limit(sleeps, status, headers, wait):
+    """测试被限流时先等待再重试，而不是直接抛出异常"""
+    client = _client(_response(status, headers), _response(200, body={"id": 1}))
+    assert client.get("actions/runs/1") == ({"id": 1}, True)
+    assert sleeps == [wait]
+
+
+def test_retry_until_rate_limit_reset(sleeps, monkeypatch):
+    """测试配额用尽的403按X-RateLimit-Reset等待"""
+    monkeypatch.setattr(watch_ci.time, "time", lambda: 1000.0)
+    limited = _response(
+        403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1042"}
+    )
+    client = _client(limited, _response(200, body={"id": 1}))
+    client.get("actions/runs/1")
+    assert sleeps == [42.0]
+
+
+def test_rate_limit_retries_are_bounded(sleeps):
+    """测试重试次数用尽后抛出HTTPError"""
+    responses = [_response(429, {"Retry-After": "1"})] * (MAX_RATE_LIMIT_RETRIES + 1)
+    client = _client(*responses)
+    with pytest.raises(requests.HTTPError):
+        client.get("actions/runs/1")
+    assert len(sleeps) == MAX_RATE_LIMIT_RETRIES
+
+
+def test_forbidden_is_not_retried(sleeps):
+    """测试没有限流响应头的403（权限不足）直接抛出"""
+    client = _client(_response(403, {"X-Poll-Interval": "5"}))
+    with pytest.raises(requests.HTTPError):
+        client.get("actions/runs/1")
+    assert sleeps == []
+
+
+def test_conditional_request_uses_cache(sleeps):
+    """测试带ETag的条件请求，304时返回缓存数据"""
+    client = _client(
+        _response(200, {"ETag": '"v1"', "X-Poll-Interval": "10"}, {"id": 1}),
+        _response(304),
+    )
+    assert client.get("actions/runs/1") == ({"id": 1}, True)
+    assert client.wait_hint == 10.0
+    assert client.get("actions/runs/1") == ({"id": 1}, False)
+    assert client.session.requests[1] == {"If-None-Match": '"v1"'}